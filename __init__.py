@@ -16,6 +16,12 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+from .backends import Backends
+from .document import Document
 from .instance import Instance, KanjiReading, WordReading
-from .problem import Problem, Problems
+from .problem import Problem, Problems, ProblemCallback
+from .problemstore import ProblemStore
+from .rendering import render_tags, render_ruby
+from .resultcache import ResultCache
+from .stats import Stats
 from .utils import is_kanji, has_kanji, all_kanji
@@ -0,0 +1,117 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import threading
+
+
+class Backends:
+	"""
+	The libraries used to find readings. Every library is only imported and created when it is used for the first time.
+	Can be shared by many instances, so the libraries are only created once.
+	"""
+	def __init__(self, kakasi = None, mecabtagger = None, jamdict = None, usemecab: bool = False, usejamdict: bool = False):
+		"""
+		Creates a new set of backends.
+		:param kakasi: Optional, a pykakasi.kakasi() to use. Otherwise, one is created when needed.
+		:param mecabtagger: Optional, a MeCab.Tagger() to use.
+		:param jamdict: Optional, a Jamdict() to use.
+		:param usemecab: When True and no tagger was given, a MeCab.Tagger() is created when needed.
+		:param usejamdict: When True and no Jamdict was given, a Jamdict() is created when needed.
+		"""
+		self.usemecab = usemecab or mecabtagger is not None
+		self.usejamdict = usejamdict or jamdict is not None
+
+		self._kakasi = kakasi
+		self._mecab = mecabtagger
+		self._jam = jamdict
+		self._mecabchecked = False
+
+		# used to create the libraries only once
+		self._createlock = threading.Lock()
+
+		# MeCab and jamdict cannot be used by multiple threads at the same time, so any use of them must hold this lock
+		self.lock = threading.Lock()
+
+	@staticmethod
+	def _check_unidic(required: bool) -> None:
+		"""
+		Checks if the data for unidic has been downloaded, as MeCab does not work without it.
+		:param required: When False, a missing unidic package is fine, as the tagger given uses another dictionary.
+		:return:
+		"""
+		try:
+			import unidic
+		except ImportError:
+			if required:
+				raise
+			return
+
+		matrixpath = os.path.join(unidic.DICDIR, "matrix.bin")
+		if not os.path.isfile(matrixpath):
+			raise Exception("Could not find \"" + matrixpath + "\". Did you run \"python -m unidic download\"? Might require admin rights.")
+
+	@property
+	def kakasi(self):
+		"""
+		:return: Returns the pykakasi.kakasi() instance.
+		"""
+		if self._kakasi is None:
+			with self._createlock:
+				if self._kakasi is None:
+					import pykakasi
+					self._kakasi = pykakasi.kakasi()
+
+		return self._kakasi
+
+	@property
+	def mecab(self):
+		"""
+		:return: Returns the MeCab.Tagger() instance or None, when MeCab is not used.
+		"""
+		if not self.usemecab:
+			return None
+
+		if not self._mecabchecked:
+			with self._createlock:
+				if not self._mecabchecked:
+					Backends._check_unidic(self._mecab is None)
+
+					if self._mecab is None:
+						import MeCab
+						self._mecab = MeCab.Tagger()
+
+					self._mecabchecked = True
+
+		return self._mecab
+
+	@property
+	def jam(self):
+		"""
+		:return: Returns the Jamdict() instance or None, when jamdict is not used.
+		"""
+		if not self.usejamdict:
+			return None
+
+		if self._jam is None:
+			with self._createlock:
+				if self._jam is None:
+					from jamdict import Jamdict
+					self._jam = Jamdict()
+
+		return self._jam
@@ -0,0 +1,138 @@
+"""
+furiganamaker benchmark
+Copyright (C) 2022  Daniel Kollmann
+
+Use of this source code is governed by an MIT-style
+license that can be found in the LICENSE file or at
+https://opensource.org/licenses/MIT.
+"""
+
+# generates deterministic Japanese text for the benchmarks, so every run measures the same input
+import random
+
+nouns = ("学校", "先生", "電車", "東京", "大阪", "天気", "会社", "仕事", "友達", "映画", "音楽", "日本語", "勉強", "料理",
+		 "時間", "図書館", "新聞", "写真", "旅行", "病院", "自転車", "動物", "子供", "家族", "季節", "駅", "公園", "部屋",
+		 "手紙", "雨", "花", "山", "川", "海", "空", "猫", "犬", "魚", "肉", "水", "本", "車", "店", "道", "町", "国",
+		 "世界", "問題", "意見", "経済", "政治", "社会", "文化", "歴史", "自然", "生活", "百科事典", "行灯")
+
+verbs = ("食べました", "行きます", "見ました", "読んだ", "書いています", "話しました", "買った", "飲みます", "歩いた",
+		 "走りました", "待っています", "考えた", "作りました", "使っている", "教えてくれた", "住んでいる", "入って")
+
+adjectives = ("新しい", "古い", "高い", "安い", "大きな", "小さな", "美しい", "楽しい", "難しい", "面白い", "静かな", "有名な")
+
+katakana = ("コーヒー", "ラーメン", "スーパー", "パソコン", "テレビ", "ニュース", "メール", "ゲーム", "ナイトシティ")
+
+times = ("今日", "明日", "昨日", "今朝", "毎日", "週末", "去年", "来月", "午後")
+
+persons = ("私", "彼", "彼女", "母", "父", "兄", "姉", "田中さん", "山田さん")
+
+counters = ("本", "匹", "人", "枚", "個", "円", "回", "台", "冊", "歳", "つ", "階")
+
+kanjinumbers = ("三百", "二千五百", "十", "八百", "一万", "六十")
+
+urls = ("https://example.com/", "http://www.example.jp/news?id=", "https://furigana.example.org/docs/")
+
+templates = (
+	"{time}、{person}は{noun}で{noun}を{verb}。",
+	"{adjective}{noun}の{noun}は{katakana}より{adjective}です。",
+	"{person}と{number}{counter}の{noun}を{verb}。",
+	"{katakana}を{kanjinumber}円で{verb}。{url}",
+	"「{noun}」は{adjective}{noun}だと{person}は{verb}。",
+	"{time}は{noun}が{adjective}ので、{katakana}で{noun}を{verb}。",
+	"ひらがなだけのぶんしょうもあります。",
+	"{katakana}と{katakana}のニュースです。",
+)
+
+
+def realistic(lines: int, seed: int = 1) -> list[str]:
+	"""
+	Generates sentences from templates and a fixed vocabulary, so words repeat like in real text.
+	:param lines: The number of lines to generate.
+	:param seed: The seed of the random generator.
+	:return: The generated lines, each ending with a new line.
+	"""
+	rnd = random.Random(seed)
+
+	fill = {
+		"noun": nouns, "verb": verbs, "adjective": adjectives, "katakana": katakana, "time": times,
+		"person": persons, "counter": counters, "kanjinumber": kanjinumbers, "url": urls
+	}
+
+	result = []
+	for i in range(lines):
+		template = rnd.choice(templates)
+
+		# every placeholder gets its own word, even when it is used twice
+		parts = template.split("{")
+		line = parts[0]
+		for part in parts[1:]:
+			name, rest = part.split("}", 1)
+
+			if name == "number":
+				word = str(rnd.choice((1, 2, 3, 5, 8, 10, 12, 25, 300, 1999)))
+			elif name == "url":
+				word = " " + rnd.choice(urls) + str(rnd.randrange(1000)) + " "
+			else:
+				word = rnd.choice(fill[name])
+
+			line += word + rest
+
+		result.append(line + "\n")
+
+	return result
+
+
+def synthetic(lines: int, seed: int = 1, length: int = 60) -> list[str]:
+	"""
+	Generates random mixes of kanji words, kana, ASCII, numbers and URLs. Used to find worst cases rather than typical ones.
+	:param lines: The number of lines to generate.
+	:param seed: The seed of the random generator.
+	:param length: The average number of pieces per line.
+	:return: The generated lines, each ending with a new line.
+	"""
+	rnd = random.Random(seed)
+
+	hiragana = [chr(c) for c in range(ord("ぁ"), ord("ゖ") + 1)]
+	ascii = "abcdefghijklmnopqrstuvwxyz0123456789 "
+
+	result = []
+	for i in range(lines):
+		pieces = []
+		for p in range(rnd.randint(length // 2, length + length // 2)):
+			kind = rnd.random()
+
+			if kind < 0.35:
+				pieces.append(rnd.choice(nouns))
+			elif kind < 0.6:
+				pieces.append("".join(rnd.choice(hiragana) for k in range(rnd.randint(1, 4))))
+			elif kind < 0.7:
+				pieces.append(rnd.choice(katakana))
+			elif kind < 0.8:
+				pieces.append("".join(rnd.choice(ascii) for k in range(rnd.randint(1, 8))))
+			elif kind < 0.9:
+				pieces.append(str(rnd.randrange(100)) + rnd.choice(counters))
+			elif kind < 0.95:
+				pieces.append(rnd.choice(verbs))
+			else:
+				pieces.append(" " + rnd.choice(urls) + str(rnd.randrange(1000)) + " ")
+
+		result.append("".join(pieces) + "\n")
+
+	return result
+
+
+def generate(kind: str, lines: int, seed: int = 1) -> list[str]:
+	"""
+	Generates a corpus.
+	:param kind: Either "realistic" or "synthetic".
+	:param lines: The number of lines to generate.
+	:param seed: The seed of the random generator.
+	:return: The generated lines.
+	"""
+	if kind == "realistic":
+		return realistic(lines, seed)
+
+	if kind == "synthetic":
+		return synthetic(lines, seed)
+
+	raise Exception("Unknown corpus \"" + kind + "\".")
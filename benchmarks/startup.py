@@ -0,0 +1,87 @@
+"""
+furiganamaker benchmark
+Copyright (C) 2022  Daniel Kollmann
+
+Use of this source code is governed by an MIT-style
+license that can be found in the LICENSE file or at
+https://opensource.org/licenses/MIT.
+"""
+
+# measures the cost of importing the library, creating instances and the first call to process()
+# run with "python benchmarks/startup.py [--repeat N] [--output file.json]"
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# hack only for this benchmark, like in the examples
+parentdir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(parentdir)
+
+# runs in a fresh interpreter, so nothing has been imported or created yet
+coldstart = """
+import sys, time, json
+sys.path.append(%r)
+t0 = time.perf_counter()
+import furiganamaker
+t1 = time.perf_counter()
+maker = furiganamaker.Instance("[", "]")
+t2 = time.perf_counter()
+maker.process("日本語の文章に振り仮名を付けます。", [])
+t3 = time.perf_counter()
+maker.process("東京の天気は晴れでした。", [])
+t4 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "instance": t2 - t1, "firstcall": t3 - t2, "secondcall": t4 - t3}))
+""" % parentdir
+
+
+def measure_coldstart(repeat: int) -> dict:
+	runs = []
+	for i in range(repeat):
+		out = subprocess.run([sys.executable, "-c", coldstart], capture_output=True, text=True, check=True).stdout
+		runs.append(json.loads(out))
+
+	return {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+
+
+def measure_instances(count: int) -> dict:
+	import furiganamaker
+
+	t0 = time.perf_counter()
+	for i in range(count):
+		furiganamaker.Instance("[", "]")
+	t1 = time.perf_counter()
+
+	backends = furiganamaker.Backends()
+	for i in range(count):
+		furiganamaker.Instance("<" + str(i), ">", backends=backends)
+	t2 = time.perf_counter()
+
+	return {"instance": (t1 - t0) / count, "instance_sharedbackends": (t2 - t1) / count}
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Measures the startup cost of furiganamaker.")
+	parser.add_argument("--repeat", type=int, default=5, help="The number of fresh interpreters to start.")
+	parser.add_argument("--output", help="Writes the results as JSON to this file.")
+	args = parser.parse_args()
+
+	results = {
+		"python": sys.version.split()[0],
+		"coldstart": measure_coldstart(args.repeat),
+		"warm": measure_instances(1000)
+	}
+
+	text = json.dumps(results, indent=2)
+	print(text)
+
+	if args.output:
+		with open(args.output, "w", encoding="utf8") as f:
+			f.write(text + "\n")
+
+
+if __name__ == "__main__":
+	main()
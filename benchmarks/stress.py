@@ -0,0 +1,167 @@
+"""
+furiganamaker benchmark
+Copyright (C) 2022  Daniel Kollmann
+
+Use of this source code is governed by an MIT-style
+license that can be found in the LICENSE file or at
+https://opensource.org/licenses/MIT.
+"""
+
+# uses a single instance from many threads at the same time and checks that every result is the same as when processing alone
+# run with "python benchmarks/stress.py [--threads N] [--lines N] [--rounds N] [--stubs]", fails with exit code 1 when a result differs
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# hack only for this benchmark, like in the examples
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import pykakasi
+import furiganamaker
+
+import corpus
+import stubs
+from suite import wordreadings
+
+
+def create(usestubs: bool) -> furiganamaker.Instance:
+	"""
+	Creates an instance with an empty readings cache.
+	"""
+	mecab = stubs.StubTagger() if usestubs else None
+	jam = stubs.StubJamdict() if usestubs else None
+
+	maker = furiganamaker.Instance("[", "]", backends=furiganamaker.Backends(pykakasi.kakasi(), mecab, jam))
+	maker.add_wordreadings(wordreadings)
+
+	return maker
+
+
+def expected_results(lines: list[str], usestubs: bool) -> dict[str, tuple]:
+	"""
+	Processes every line alone, which is the result every thread must get.
+	"""
+	maker = create(usestubs)
+
+	results = {}
+	for line in lines:
+		problems = []
+		hasfurigana, text = maker.process(line, problems)
+		results[line] = (hasfurigana, text, [p.description for p in problems])
+
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Uses a single instance of furiganamaker from many threads and checks the results.")
+	parser.add_argument("--corpus", choices=("realistic", "synthetic"), default="realistic", help="The kind of text to process.")
+	parser.add_argument("--lines", type=int, default=500, help="The number of lines to process.")
+	parser.add_argument("--seed", type=int, default=1, help="The seed used to generate the corpus.")
+	parser.add_argument("--threads", type=int, default=8, help="The number of threads processing at the same time.")
+	parser.add_argument("--rounds", type=int, default=3, help="How often every thread processes the corpus.")
+	parser.add_argument("--stubs", action="store_true", help="Uses the stub MeCab and jamdict backends as well.")
+	args = parser.parse_args()
+
+	lines = corpus.generate(args.corpus, args.lines, args.seed)
+	expected = expected_results(lines, args.stubs)
+
+	# switch threads very often, so more of them run into each other
+	sys.setswitchinterval(1e-6)
+
+	maker = create(args.stubs)
+	stats = furiganamaker.Stats()
+	maker.set_stats(stats)
+
+	errors = []
+	errorslock = threading.Lock()
+
+	def check(line: str, hasfurigana: bool, text: str, problems: list) -> None:
+		result = (hasfurigana, text, [p.description for p in problems])
+		if result != expected[line]:
+			with errorslock:
+				errors.append((line, expected[line], result))
+
+	def worker(index: int) -> None:
+		rng = random.Random(args.seed + index)
+
+		for r in range(args.rounds):
+			order = list(lines)
+			rng.shuffle(order)
+
+			# mix single texts, batches and views, which share the readings cache
+			if index % 3 == 0:
+				for line in order:
+					problems = []
+					hasfurigana, text = maker.process(line, problems)
+					check(line, hasfurigana, text, problems)
+			elif index % 3 == 1:
+				for line, (hasfurigana, text, problems) in zip(order, maker.process_many(order)):
+					check(line, hasfurigana, text, problems)
+			else:
+				view = maker.create_view()
+				for line in order:
+					problems = []
+					hasfurigana, text = view.process(line, problems)
+					check(line, hasfurigana, text, problems)
+
+	# saving the cache copies it while the other threads add readings
+	stop = threading.Event()
+
+	def saver() -> None:
+		with tempfile.TemporaryDirectory() as tmp:
+			path = os.path.join(tmp, "cache.bin")
+			while not stop.is_set():
+				maker.save_cache(path)
+
+	t = time.perf_counter()
+
+	threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+	threads.append(threading.Thread(target=saver))
+	for thread in threads:
+		thread.start()
+
+	for thread in threads[:-1]:
+		thread.join()
+
+	stop.set()
+	threads[-1].join()
+
+	# the pool mode must give the same results as well
+	for line, (hasfurigana, text, problems) in zip(lines, maker.process_many_threads(lines, workers=args.threads, batchsize=16)):
+		check(line, hasfurigana, text, problems)
+
+	duration = time.perf_counter() - t
+
+	counts = stats.snapshot()["counts"]
+	kanji = len(maker.readingscache)
+	misses = counts.get("cache_misses", 0)
+
+	print("threads: " + str(args.threads) + ", lines: " + str(len(lines)) + ", rounds: " + str(args.rounds) + ", seconds: " + str(round(duration, 2)))
+	print("kanji cached: " + str(kanji) + ", lookups: " + str(misses) + ", coalesced: " + str(counts.get("cache_coalesced", 0)))
+
+	failed = False
+
+	if misses != kanji:
+		print("Every kanji should be looked up once, but there were " + str(misses) + " lookups for " + str(kanji) + " kanji.")
+		failed = True
+
+	if len(errors) > 0:
+		print(str(len(errors)) + " results differ, e.g.:")
+		for line, exp, result in errors[:5]:
+			print("  " + line.strip())
+			print("    expected " + repr(exp))
+			print("    got      " + repr(result))
+		failed = True
+
+	if failed:
+		sys.exit(1)
+
+	print("OK")
+
+
+if __name__ == "__main__":
+	main()
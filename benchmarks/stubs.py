@@ -0,0 +1,196 @@
+"""
+furiganamaker benchmark
+Copyright (C) 2022  Daniel Kollmann
+
+Use of this source code is governed by an MIT-style
+license that can be found in the LICENSE file or at
+https://opensource.org/licenses/MIT.
+"""
+
+# stand-ins for MeCab and jamdict, so the benchmarks run offline without their data packages
+# both only implement what furiganamaker uses and always return the same results
+import pykakasi
+
+""" Readings for the kanji of the benchmark corpus, as (on readings in katakana, kun readings in hiragana). """
+kanjireadings = {
+	"一": ("イチ", "イツ"), "万": ("マン", "バン"), "三": ("サン",), "世": ("セイ", "セ"), "中": ("チュウ",), "事": ("ジ", "ズ"),
+	"二": ("ニ",), "五": ("ゴ",), "京": ("キョウ", "ケイ"), "人": ("ジン", "ニン"), "今": ("コン", "キン"), "仕": ("シ", "ジ"),
+	"会": ("カイ", "エ"), "住": ("ジュウ",), "作": ("サク", "サ"), "使": ("シ",), "供": ("キョウ", "ク"), "個": ("コ",),
+	"兄": ("ケイ", "キョウ"), "先": ("セン",), "入": ("ニュウ",), "八": ("ハチ",), "公": ("コウ", "ク"), "六": ("ロク",),
+	"典": ("テン",), "円": ("エン",), "冊": ("サツ",), "写": ("シャ",), "勉": ("ベン",), "動": ("ドウ",), "化": ("カ", "ケ"),
+	"匹": ("ヒツ",), "十": ("ジュウ", "ジッ"), "千": ("セン",), "午": ("ゴ",), "去": ("キョ", "コ"), "友": ("ユウ",),
+	"古": ("コ",), "台": ("ダイ", "タイ"), "史": ("シ",), "名": ("メイ", "ミョウ"), "問": ("モン",), "回": ("カイ",),
+	"図": ("ズ", "ト"), "国": ("コク",), "園": ("エン",), "大": ("ダイ", "タイ"), "天": ("テン",), "女": ("ジョ", "ニョ"),
+	"姉": ("シ",), "子": ("シ", "ス"), "季": ("キ",), "学": ("ガク",), "安": ("アン",), "家": ("カ", "ケ"), "小": ("ショウ",),
+	"屋": ("オク",), "山": ("サン", "セン"), "川": ("セン",), "年": ("ネン",), "店": ("テン",), "強": ("キョウ", "ゴウ"),
+	"彼": ("ヒ",), "待": ("タイ",), "後": ("ゴ", "コウ"), "意": ("イ",), "手": ("シュ",), "政": ("セイ", "ショウ"),
+	"教": ("キョウ",), "文": ("ブン", "モン"), "料": ("リョウ",), "新": ("シン",), "旅": ("リョ",), "族": ("ゾク",),
+	"日": ("ニチ", "ジツ"), "明": ("メイ", "ミョウ"), "映": ("エイ",), "昨": ("サク",), "時": ("ジ",), "書": ("ショ",),
+	"月": ("ゲツ", "ガツ"), "有": ("ユウ", "ウ"), "朝": ("チョウ",), "末": ("マツ", "バツ"), "本": ("ホン",), "来": ("ライ",),
+	"東": ("トウ",), "枚": ("マイ",), "校": ("コウ",), "楽": ("ガク", "ラク"), "歩": ("ホ", "ブ"), "歳": ("サイ", "セイ"),
+	"歴": ("レキ",), "母": ("ボ",), "毎": ("マイ",), "気": ("キ", "ケ"), "水": ("スイ",), "治": ("ジ", "チ"),
+	"活": ("カツ",), "海": ("カイ",), "済": ("サイ",), "灯": ("トウ",), "然": ("ゼン", "ネン"), "父": ("フ",), "物": ("ブツ", "モツ"),
+	"犬": ("ケン",), "猫": ("ビョウ",), "理": ("リ",), "生": ("セイ", "ショウ"), "田": ("デン",), "町": ("チョウ",),
+	"画": ("ガ", "カク"), "界": ("カイ",), "病": ("ビョウ",), "白": ("ハク",), "百": ("ヒャク",), "真": ("シン",),
+	"社": ("シャ",), "私": ("シ",), "科": ("カ",), "空": ("クウ",), "節": ("セツ",), "紙": ("シ",), "経": ("ケイ", "キョウ"),
+	"美": ("ビ",), "考": ("コウ",), "聞": ("ブン", "モン"), "肉": ("ニク",), "自": ("ジ", "シ"), "花": ("カ",), "行": ("コウ", "ギョウ"),
+	"見": ("ケン",), "話": ("ワ",), "語": ("ゴ",), "読": ("ドク", "トク"), "買": ("バイ",), "走": ("ソウ",), "車": ("シャ",),
+	"転": ("テン",), "週": ("シュウ",), "道": ("ドウ",), "達": ("タツ",), "部": ("ブ",), "間": ("カン", "ケン"), "阪": ("ハン",),
+	"院": ("イン",), "階": ("カイ",), "難": ("ナン",), "雨": ("ウ",), "電": ("デン",), "静": ("セイ",), "面": ("メン",),
+	"音": ("オン",), "題": ("ダイ",), "食": ("ショク",), "飲": ("イン",), "館": ("カン",), "駅": ("エキ",), "高": ("コウ",), "魚": ("ギョ",)
+}
+
+""" Kun readings in the format of jamdict, where the okurigana follows a '.'. """
+kunreadings = {
+	"一": ("ひと",), "二": ("ふた",), "三": ("み",), "世": ("よ",), "中": ("なか",), "事": ("こと",), "人": ("ひと",), "今": ("いま",),
+	"仕": ("つか.える",), "会": ("あ.う",), "住": ("す.む",), "作": ("つく.る",), "使": ("つか.う",), "供": ("とも", "そな.える"),
+	"兄": ("あに",), "先": ("さき",), "入": ("い.る", "はい.る"), "八": ("や",), "六": ("む",), "写": ("うつ.す",), "動": ("うご.く",),
+	"化": ("ば.ける",), "匹": ("ひき",), "十": ("とお",), "千": ("ち",), "去": ("さ.る",), "友": ("とも",), "古": ("ふる.い",),
+	"名": ("な",), "問": ("と.う",), "回": ("まわ.る",), "図": ("はか.る",), "国": ("くに",), "大": ("おお.きい",), "天": ("あま",),
+	"女": ("おんな",), "姉": ("あね",), "子": ("こ",), "学": ("まな.ぶ",), "安": ("やす.い",), "家": ("いえ", "や"), "小": ("ちい.さい", "こ"),
+	"屋": ("や",), "山": ("やま",), "川": ("かわ",), "年": ("とし",), "店": ("みせ",), "強": ("つよ.い",), "彼": ("かれ", "かの"),
+	"待": ("ま.つ",), "後": ("あと", "うし.ろ"), "手": ("て",), "教": ("おし.える",), "文": ("ふみ",), "新": ("あたら.しい",),
+	"旅": ("たび",), "日": ("ひ", "か"), "明": ("あ.かり", "あか.るい"), "映": ("うつ.る",), "時": ("とき",), "書": ("か.く",),
+	"月": ("つき",), "有": ("あ.る",), "朝": ("あさ",), "末": ("すえ",), "本": ("もと",), "来": ("く.る",), "東": ("ひがし",),
+	"楽": ("たの.しい",), "歩": ("ある.く",), "母": ("はは",), "気": ("いき",), "水": ("みず",), "治": ("おさ.める",), "海": ("うみ",),
+	"灯": ("ひ",), "父": ("ちち",), "物": ("もの",), "犬": ("いぬ",), "猫": ("ねこ",), "生": ("い.きる", "う.まれる"), "田": ("た",),
+	"町": ("まち",), "白": ("しろ",), "百": ("もも",), "真": ("ま",), "社": ("やしろ",), "私": ("わたし",), "空": ("そら",),
+	"節": ("ふし",), "紙": ("かみ",), "経": ("へ.る",), "美": ("うつく.しい",), "考": ("かんが.える",), "聞": ("き.く",),
+	"自": ("みずか.ら",), "花": ("はな",), "行": ("い.く", "おこな.う"), "見": ("み.る",), "話": ("はな.す", "はなし"),
+	"語": ("かた.る",), "読": ("よ.む",), "買": ("か.う",), "走": ("はし.る",), "車": ("くるま",), "転": ("ころ.ぶ",),
+	"道": ("みち",), "部": ("へ",), "間": ("あいだ", "ま"), "難": ("むずか.しい",), "雨": ("あめ",), "電": (), "静": ("しず.か",),
+	"面": ("おも",), "音": ("おと",), "食": ("た.べる",), "飲": ("の.む",), "高": ("たか.い",), "魚": ("さかな",)
+}
+
+
+class _Reading:
+	"""
+	A reading as returned by jamdict.
+	"""
+	def __init__(self, value: str):
+		self.value = value
+
+
+class _ReadingMeaningGroup:
+	"""
+	The readings of a kanji as returned by jamdict.
+	"""
+	def __init__(self, on: tuple, kun: tuple):
+		self.on_readings = [_Reading(r) for r in on]
+		self.kun_readings = [_Reading(r) for r in kun]
+
+
+class _Character:
+	"""
+	A kanji as returned by jamdict.
+	"""
+	def __init__(self, kanji: str):
+		self.literal = kanji
+		self.rm_groups = [_ReadingMeaningGroup(kanjireadings.get(kanji, ()), kunreadings.get(kanji, ()))]
+
+
+class _LookupResult:
+	"""
+	The result of Jamdict.lookup().
+	"""
+	def __init__(self, chars: list):
+		self.chars = chars
+		self.entries = []
+
+
+class StubJamdict:
+	"""
+	Replaces Jamdict(), using the readings in kanjireadings and kunreadings.
+	"""
+	def __init__(self):
+		self.lookups = 0
+
+	def lookup(self, query: str, strict_lookup: bool = False, lookup_ne: bool = True) -> _LookupResult:
+		self.lookups += 1
+
+		if len(query) == 1 and (query in kanjireadings or query in kunreadings):
+			return _LookupResult([_Character(query)])
+
+		return _LookupResult([])
+
+
+class _Node:
+	"""
+	A node as returned by MeCab.Tagger.parseToNode().
+	"""
+	def __init__(self, surface: str, feature: str):
+		self.surface = surface
+		self.feature = feature
+		self.next = None
+		self.bnext = None
+
+
+def _feature(orig: str, kana: str) -> str:
+	"""
+	Creates the features of a word in the layout of unidic.
+	:param orig: The word.
+	:param kana: The reading of the word in katakana.
+	:return: The comma separated features.
+	"""
+	# pos1, pos2, pos3, pos4, cType, cForm, lForm, lemma, orth, pron, orthBase, pronBase, goshu, iType, iForm, fType, fForm,
+	# iConType, fConType, type, kana, kanaBase, form, formBase, aType, aConType, aModType, lid, lemma_id
+	return ",".join(("名詞", "普通名詞", "一般", "*", "*", "*", kana, orig, orig, kana, orig, kana, "漢", "*", "*", "*", "*",
+					 "*", "*", "体", kana, kana, kana, kana, "0", "C2", "*", "0", "0"))
+
+
+def _feature_lite(orig: str, kana: str) -> str:
+	"""
+	Creates the features of a word in the layout of unidic-lite.
+	:param orig: The word.
+	:param kana: The reading of the word in katakana.
+	:return: The comma separated features.
+	"""
+	# pos1, pos2, pos3, pos4, cType, cForm, lForm, lemma, orth, pron, orthBase, pronBase, goshu, iType, iForm, fType, fForm,
+	# kana, kanaBase, form, formBase, iConType, fConType, aType, aConType, aModType
+	return ",".join(("名詞", "普通名詞", "一般", "*", "*", "*", kana, orig, orig, kana, orig, kana, "漢", "*", "*", "*", "*",
+					 kana, kana, kana, kana, "*", "*", "0", "C2", "*"))
+
+
+""" Creates the features of a word for every layout of StubTagger. """
+_layouts = {"unidic": _feature, "unidic-lite": _feature_lite}
+
+
+class StubTagger:
+	"""
+	Replaces MeCab.Tagger(). Splits the text into words using kakasi.
+	"""
+	def __init__(self, layout: str = "unidic"):
+		"""
+		:param layout: The layout of the features, "unidic" for unidic 3 with 29 features, "unidic-lite" for unidic 2 builds with 26.
+		"""
+		assert layout in _layouts, "Unknown layout"
+
+		self.parses = 0
+		self.layout = layout
+		self._kakasi = pykakasi.kakasi()
+
+	def parseToNode(self, text: str) -> _Node:
+		self.parses += 1
+
+		bos = _Node("", "BOS/EOS,*,*,*,*,*,*,*,*")
+		node = bos
+
+		for c in self._kakasi.convert(text):
+			orig = c["orig"]
+			kana = c["kana"]
+
+			if len(orig) < 1 or orig.isspace():
+				continue
+
+			# words without a reading are unknown to the dictionary and have less features
+			if len(kana) < 1:
+				feature = "名詞,普通名詞,一般,*,*,*"
+			else:
+				feature = _layouts[self.layout](orig, kana)
+
+			node.next = _Node(orig, feature)
+			node = node.next
+
+		node.next = _Node("", "BOS/EOS,*,*,*,*,*,*,*,*")
+
+		return bos
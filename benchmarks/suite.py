@@ -0,0 +1,308 @@
+"""
+furiganamaker benchmark
+Copyright (C) 2022  Daniel Kollmann
+
+Use of this source code is governed by an MIT-style
+license that can be found in the LICENSE file or at
+https://opensource.org/licenses/MIT.
+"""
+
+# measures the throughput and latency of every processing stage, with a cold and a warm readings cache and with the words aligned before
+# run with "python benchmarks/suite.py [--lines N] [--corpus realistic|synthetic] [--output file.json] [--compare old.json]"
+import argparse
+import json
+import os
+import sys
+import time
+
+# hack only for this benchmark, like in the examples
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import pykakasi
+import furiganamaker
+from furiganamaker.instancedata import InstanceData
+from furiganamaker.instanceprv import InstancePrv
+from furiganamaker.wordmatcher import WordMatcher
+
+import corpus
+import stubs
+
+""" The stages which are measured, as (name, class, function). Stages calling other stages include their time. """
+stages = (
+	("split_numbers", InstancePrv, "_split_numbers"),
+	("wordreadings", WordMatcher, "split"),
+	("split_protected", InstancePrv, "_split_protected"),
+	("find_reading", InstancePrv, "_find_reading"),
+	("get_kanjireading", InstancePrv, "_get_kanjireading"),
+	("lookup_kanjireading", InstancePrv, "_lookup_kanjireading"),
+	("split_kanji", InstancePrv, "_split_kanji"),
+	("split_hiragana", InstancePrv, "_split_hiragana"),
+	("split_katakana", InstancePrv, "_split_katakana"),
+	("process_textpart", InstancePrv, "_process_textpart"),
+)
+
+""" The word readings of example_textfile.py, so the custom reading pass has something to find. """
+wordreadings = [
+	furiganamaker.WordReading(("行", "灯"), ("あん", "どん")),
+	furiganamaker.WordReading(("神", "秘", "性"), ("しん", "ぴ", "せい")),
+	furiganamaker.WordReading(("入", "って"), ("はい", "って")),
+	furiganamaker.WordReading(("百", "科", "事", "典"), ("ひゃっ", "か", "じ", "てん")),
+]
+
+
+class Recorder:
+	"""
+	Collects the duration of every call to a stage.
+	"""
+	def __init__(self):
+		self.durations: dict[str, list[int]] = {}
+
+	def wrap(self, name: str, func):
+		durations = self.durations.setdefault(name, [])
+		clock = time.perf_counter_ns
+
+		def timed(*args, **kwargs):
+			t = clock()
+			try:
+				return func(*args, **kwargs)
+			finally:
+				durations.append(clock() - t)
+
+		return timed
+
+	def reset(self) -> None:
+		for name in self.durations:
+			self.durations[name].clear()
+
+
+class TimedKakasi:
+	"""
+	Wraps kakasi to measure kakasi.convert().
+	"""
+	def __init__(self, kakasi, recorder: Recorder):
+		self.convert = recorder.wrap("kakasi_convert", kakasi.convert)
+
+
+def instrument(recorder: Recorder) -> list:
+	"""
+	Replaces the functions of all stages with timed versions.
+	:return: The original functions, see restore().
+	"""
+	originals = []
+	for name, cls, attr in stages:
+		raw = cls.__dict__[attr]
+		originals.append((cls, attr, raw))
+
+		if isinstance(raw, staticmethod):
+			setattr(cls, attr, staticmethod(recorder.wrap(name, raw.__func__)))
+		else:
+			setattr(cls, attr, recorder.wrap(name, raw))
+
+	return originals
+
+
+def restore(originals: list) -> None:
+	for cls, attr, raw in originals:
+		setattr(cls, attr, raw)
+
+
+def summarize(durations: list[int], chars: int = 0) -> dict:
+	"""
+	Calculates the statistics of a stage.
+	:param durations: The duration of every call in nanoseconds.
+	:param chars: The number of characters processed, when it makes sense for the stage.
+	:return: A dictionary with the statistics.
+	"""
+	if len(durations) < 1:
+		return {"calls": 0}
+
+	s = sorted(durations)
+	total = sum(s)
+
+	def percentile(p: float) -> float:
+		return s[min(len(s) - 1, int(p * len(s)))] / 1000.0
+
+	result = {
+		"calls": len(s),
+		"total_ms": total / 1e6,
+		"calls_per_s": len(s) / (total / 1e9) if total > 0 else 0.0,
+		"p50_us": percentile(0.5),
+		"p90_us": percentile(0.9),
+		"p99_us": percentile(0.99),
+		"max_us": s[-1] / 1000.0
+	}
+
+	if chars > 0:
+		result["chars_per_s"] = chars / (total / 1e9) if total > 0 else 0.0
+
+	return result
+
+
+def run_pass(maker: furiganamaker.Instance, lines: list[str], recorder: Recorder) -> dict:
+	"""
+	Processes all lines once and collects the statistics of all stages.
+	"""
+	recorder.reset()
+
+	# counts how often the readings of a word were aligned with the full search and how often it still failed
+	stats = furiganamaker.Stats()
+	maker.set_stats(stats)
+
+	problems = []
+	linetimes = []
+	try:
+		for i in range(len(lines)):
+			t = time.perf_counter_ns()
+			maker.process(lines[i], problems, i)
+			linetimes.append(time.perf_counter_ns() - t)
+	finally:
+		maker.set_stats(None)
+
+	chars = sum(len(line) for line in lines)
+	counts = stats.snapshot()["counts"]
+
+	result = {
+		"total": summarize(linetimes, chars),
+		"problems": len(problems),
+		"counts": {name: counts.get(name, 0) for name in ("alignment_searches", "fallbacks", "reading_variants", "alignment_hits")},
+		"stages": {}
+	}
+
+	result["total"]["lines_per_s"] = result["total"]["calls_per_s"]
+
+	for name in sorted(recorder.durations):
+		result["stages"][name] = summarize(recorder.durations[name])
+
+	return result
+
+
+def run_batch(maker: furiganamaker.Instance, lines: list[str]) -> dict:
+	"""
+	Processes all lines with process_many() and measures the total time.
+	"""
+	t = time.perf_counter_ns()
+	results = maker.process_many(lines)
+	duration = time.perf_counter_ns() - t
+
+	return {
+		"total_ms": duration / 1e6,
+		"lines_per_s": len(lines) / (duration / 1e9),
+		"problems": sum(len(r[2]) for r in results)
+	}
+
+
+def run_scenarios(lines: list[str]) -> dict:
+	"""
+	Runs every combination of backends with a cold and a warm readings cache.
+	These passes align every word, so every stage is measured. The "warm-memo" pass measures the words aligned before, see Instance.set_maxalignments().
+	"""
+	kakasi = pykakasi.kakasi()
+
+	results = {}
+	for backendname, usestubs, segmenter in (("kakasi", False, "kakasi"), ("stubs", True, "kakasi"), ("stubs-mecabsegmenter", True, "mecab")):
+		recorder = Recorder()
+
+		mecab = stubs.StubTagger() if usestubs else None
+		jam = stubs.StubJamdict() if usestubs else None
+		backends = furiganamaker.Backends(TimedKakasi(kakasi, recorder), mecab, jam)
+
+		maker = furiganamaker.Instance("[", "]", backends=backends)
+		maker.set_segmenter(segmenter)
+		maker.add_wordreadings(wordreadings)
+		maker.set_maxalignments(0)
+
+		originals = instrument(recorder)
+		try:
+			results[backendname + "/cold"] = run_pass(maker, lines, recorder)
+			results[backendname + "/warm"] = run_pass(maker, lines, recorder)
+
+			# the first pass with the memo aligns every word once
+			maker.set_maxalignments(InstanceData._maxalignments)
+			run_pass(maker, lines, recorder)
+			results[backendname + "/warm-memo"] = run_pass(maker, lines, recorder)
+			maker.set_maxalignments(0)
+		finally:
+			restore(originals)
+
+		results[backendname + "/batch"] = run_batch(maker, lines)
+
+	return results
+
+
+def compare(old: dict, new: dict, threshold: float) -> list[str]:
+	"""
+	Compares two results and lists everything which became slower.
+	:param old: The results of a previous run.
+	:param new: The results of this run.
+	:param threshold: How much slower something has to be, e.g. 0.2 for 20%.
+	:return: A list of messages, one for every regression.
+	"""
+	regressions = []
+
+	for scenario in new["scenarios"]:
+		if scenario not in old["scenarios"]:
+			continue
+
+		o = old["scenarios"][scenario]
+		n = new["scenarios"][scenario]
+
+		if "lines_per_s" in n and "lines_per_s" in o:
+			if n["lines_per_s"] < o["lines_per_s"] / (1.0 + threshold):
+				regressions.append(scenario + ": " + str(round(o["lines_per_s"])) + " -> " + str(round(n["lines_per_s"])) + " lines/s")
+
+		for stage in n.get("stages", {}):
+			ns = n["stages"][stage]
+			os_ = o.get("stages", {}).get(stage)
+			if os_ is None or ns["calls"] < 1 or os_["calls"] < 1:
+				continue
+
+			if ns["p50_us"] > os_["p50_us"] * (1.0 + threshold):
+				regressions.append(scenario + "/" + stage + ": p50 " + str(os_["p50_us"]) + "us -> " + str(ns["p50_us"]) + "us")
+
+	return regressions
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Measures the throughput of every processing stage of furiganamaker.")
+	parser.add_argument("--corpus", choices=("realistic", "synthetic"), default="realistic", help="The kind of text to process.")
+	parser.add_argument("--lines", type=int, default=2000, help="The number of lines to process.")
+	parser.add_argument("--seed", type=int, default=1, help="The seed used to generate the corpus.")
+	parser.add_argument("--output", help="Writes the results as JSON to this file.")
+	parser.add_argument("--compare", help="Compares the results with a previous output and fails when something became slower.")
+	parser.add_argument("--threshold", type=float, default=0.2, help="How much slower something can become before --compare fails.")
+	args = parser.parse_args()
+
+	lines = corpus.generate(args.corpus, args.lines, args.seed)
+
+	results = {
+		"meta": {
+			"python": sys.version.split()[0],
+			"corpus": args.corpus,
+			"lines": args.lines,
+			"seed": args.seed,
+			"chars": sum(len(line) for line in lines)
+		},
+		"scenarios": run_scenarios(lines)
+	}
+
+	text = json.dumps(results, indent=2, sort_keys=True, ensure_ascii=False)
+	print(text)
+
+	if args.output:
+		with open(args.output, "w", encoding="utf8") as f:
+			f.write(text + "\n")
+
+	if args.compare:
+		with open(args.compare, "r", encoding="utf8") as f:
+			old = json.load(f)
+
+		regressions = compare(old, results, args.threshold)
+		for r in regressions:
+			print("Regression: " + r, file=sys.stderr)
+
+		if len(regressions) > 0:
+			sys.exit(1)
+
+
+if __name__ == "__main__":
+	main()
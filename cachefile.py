@@ -0,0 +1,88 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import struct
+import tempfile
+import zlib
+
+
+""" Identifies a snapshot file. """
+_magic = b"FMCACHE\0"
+
+""" The version of the file format. Snapshots with a different version are rejected. """
+_formatversion = 1
+
+""" The header of a snapshot: the magic, the format version and the fingerprint. """
+_header = struct.Struct("<8sI32s")
+
+# the payload is compressed JSON: the cache is a few thousand kanji with short lists of readings, so it is small and loaded in milliseconds,
+# while a memory-mapped layout would need its own string table and index for data which is only read once when a process starts
+
+
+def write_cache(path: str, fingerprint: bytes, data: dict) -> None:
+	"""
+	Writes a snapshot file. The file is replaced atomically, so readers never see a partial snapshot.
+	:param path: The file to write.
+	:param fingerprint: The sha256 digest describing the configuration the data is valid for.
+	:param data: The data to store. Must be serializable as JSON.
+	:return:
+	"""
+	assert len(fingerprint) == 32, "Expected a sha256 digest"
+
+	payload = zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf8"))
+
+	# a unique file next to the snapshot, so processes saving at the same time never write into the same file
+	with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(path)), prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False) as f:
+		tmppath = f.name
+		try:
+			f.write(_header.pack(_magic, _formatversion, fingerprint))
+			f.write(payload)
+		except BaseException:
+			f.close()
+			os.remove(tmppath)
+			raise
+
+	os.replace(tmppath, path)
+
+
+def read_cache(path: str, fingerprint: bytes):
+	"""
+	Reads a snapshot file.
+	:param path: The file to read.
+	:param fingerprint: The sha256 digest describing the current configuration.
+	:return: Returns the stored data or None, when the file is not a snapshot or was written for a different configuration.
+	"""
+	with open(path, "rb") as f:
+		header = f.read(_header.size)
+
+		if len(header) != _header.size:
+			return None
+
+		magic, version, filefingerprint = _header.unpack(header)
+
+		if magic != _magic or version != _formatversion or filefingerprint != fingerprint:
+			return None
+
+		payload = f.read()
+
+	try:
+		return json.loads(zlib.decompress(payload).decode("utf8"))
+	except (zlib.error, UnicodeDecodeError, ValueError):
+		return None
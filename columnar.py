@@ -0,0 +1,108 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+# requires numpy, which is only imported by the functions using it
+from typing import Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+	import numpy
+
+
+""" The ranges of code points which are kanji, like utils.is_kanji(). """
+_kanjiranges = ((0x3400, 0x4dbf), (0x4e00, 0x9fff), (0xf900, 0xfaff), (0x3005, 0x3005), (0x30f6, 0x30f6), (0x20000, 0x3134f))
+
+""" The ranges of code points which are Arabic digits, which can be read as numbers with a counter. """
+_digitranges = ((0x30, 0x39), (0xff10, 0xff19))
+
+""" The maximum number of code points screened at once, which limits the memory needed for long texts. """
+_maxscreenchars = 1 << 22
+
+
+def factorize(values: Sequence) -> tuple["numpy.ndarray", list]:
+	"""
+	Finds the unique values of a column.
+	:param values: The values of the column.
+	:return: Returns a tuple (codes, uniques), where uniques are the different values in order of their first occurrence and codes is the index into uniques for every value.
+	"""
+	import numpy
+
+	index = {}
+	setdefault = index.setdefault
+	codes = numpy.fromiter((setdefault(v, len(index)) for v in values), dtype=numpy.intp, count=len(values))
+
+	return codes, list(index)
+
+
+def screen(texts: list[str], digits: bool) -> "numpy.ndarray":
+	"""
+	Finds the texts which can get furigana, by checking all code points at once.
+	:param texts: The texts to check.
+	:param digits: When True, texts with Arabic digits can get furigana as well, as numbers with a counter.
+	:return: Returns a bool array which is True for every text with a kanji or digit.
+	"""
+	import numpy
+
+	result = numpy.zeros(len(texts), dtype=bool)
+	if len(texts) < 1:
+		return result
+
+	ranges = _kanjiranges + _digitranges if digits else _kanjiranges
+
+	# texts of similar length are screened together, so the padding of the fixed width array stays small
+	lengths = numpy.fromiter((len(t) for t in texts), dtype=numpy.intp, count=len(texts))
+	order = numpy.argsort(lengths, kind="stable")
+	sortedlengths = lengths[order]
+
+	start = 0
+	while start < len(order):
+		# as many texts as fit into the limit with the width of the longest one, which is the last one
+		end = min(len(order), start + max(1, _maxscreenchars // max(int(sortedlengths[start]), 1)))
+		while end > start + 1 and int(sortedlengths[end - 1]) * (end - start) > _maxscreenchars:
+			end = start + max(1, _maxscreenchars // int(sortedlengths[end - 1]))
+
+		rows = order[start:end]
+		width = int(lengths[rows[-1]])
+		if width > 0:
+			# the UCS-4 buffer of a fixed width unicode array has one code point per element
+			block = numpy.array([texts[i] for i in rows], dtype="<U" + str(width))
+			codepoints = block.view(numpy.uint32).reshape(len(rows), width)
+
+			found = numpy.zeros(codepoints.shape, dtype=bool)
+			for low, high in ranges:
+				found |= (codepoints >= low) & (codepoints <= high)
+
+			result[rows] = found.any(axis=1)
+
+		start = end
+
+	return result
+
+
+def group_rows(codes: "numpy.ndarray", count: int) -> tuple["numpy.ndarray", "numpy.ndarray"]:
+	"""
+	Groups the rows of a column by their unique value.
+	:param codes: The index of the unique value of every row, see factorize().
+	:param count: The number of unique values.
+	:return: Returns a tuple (rows, starts), where rows[starts[u]:starts[u + 1]] are the rows with the unique value u.
+	"""
+	import numpy
+
+	rows = numpy.argsort(codes, kind="stable")
+	starts = numpy.searchsorted(codes[rows], numpy.arange(count + 1))
+
+	return rows, starts
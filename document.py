@@ -0,0 +1,341 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import bisect
+import re
+import time
+from typing import TYPE_CHECKING
+
+from .problem import Problem, ProblemCallback
+
+if TYPE_CHECKING:
+	from .instance import Instance
+
+
+""" Matches a unit of a document: a sentence up to and including its final 。！？ or a line up to and including its new line. Only the last unit can end without one. """
+_unitpattern = re.compile(r"[^。！？\n]*[。！？\n]|[^。！？\n]+")
+
+""" The characters which end a unit. """
+_unitendings = "。！？\n"
+
+""" The number of characters compared at once when searching the changed part of a text. """
+_comparechunk = 4096
+
+
+class DocumentUnit:
+	"""
+	A sentence or line of a document with its processed result. Only used by Document.
+	"""
+	__slots__ = ("text", "hasfurigana", "segments", "problems", "rendered")
+
+	def __init__(self, text: str):
+		self.text = text
+		self.hasfurigana = False
+		self.segments: list[tuple[str, str, int]] = None
+		self.problems: list[Problem] = None
+		self.rendered: str = None
+
+
+class Document:
+	"""
+	Keeps the furigana of a whole document, which changes by small edits, e.g. in an editor.
+	The document is split into sentences and lines, which are only processed again when they were changed by an edit, so the time needed for an edit depends on the size of the edit and not the size of the document.
+	When the configuration of the instance changes, e.g. by add_wordreadings() or add_kanjireadings(), all units are processed again the next time the result is read.
+	A document must only be used by one thread at a time, but many documents can share the same instance.
+	"""
+	def __init__(self, instance: "Instance", text: str = "", userdata = None):
+		"""
+		Creates a document. Nothing is processed until the result is read, see process().
+		:param instance: The instance used to add furigana.
+		:param text: The text of the document.
+		:param userdata: This data is added to any problem which was found, see Instance.process().
+		"""
+		self.instance = instance
+		self.userdata = userdata
+
+		self._units: list[DocumentUnit] = []
+		self._starts: list[int] = []
+		self._length = 0
+
+		# the units which have to be processed
+		self._stale: set[DocumentUnit] = set()
+
+		# the rendered text of every unit, "" until it is rendered, the indexes of the units which are not rendered yet and the whole rendered text
+		self._pieces: list[str] = []
+		self._unrendered: set[int] = set()
+		self._rendered: str = None
+
+		# the number of processed units with furigana
+		self._furiganacount = 0
+
+		# the configuration and the tags the results were created with
+		self._fingerprint: bytes = None
+		self._tags: tuple[str, str] = None
+
+		self.edit(0, 0, text)
+
+	def __len__(self) -> int:
+		"""
+		:return: Returns the length of the text of the document.
+		"""
+		return self._length
+
+	@property
+	def text(self) -> str:
+		"""
+		:return: Returns the whole text of the document.
+		"""
+		return "".join(u.text for u in self._units)
+
+	def _unit_at(self, pos: int) -> int:
+		"""
+		Finds the unit containing a position. The end of the last unit belongs to it when it does not end a unit, so text added there is joined with it.
+		:param pos: The position in the document.
+		:return: Returns the index of the unit or the number of units, when text at 'pos' starts a new unit.
+		"""
+		i = bisect.bisect_right(self._starts, pos) - 1
+		if i < 0:
+			return 0
+
+		unit = self._units[i]
+		if pos >= self._starts[i] + len(unit.text) and unit.text[-1] in _unitendings:
+			return i + 1
+
+		return i
+
+	def edit(self, start: int, end: int, text: str) -> tuple[int, int]:
+		"""
+		Replaces a part of the document, like document.text[start:end] = text. Only the units touched by the edit are processed again.
+		:param start: The position of the first character replaced.
+		:param end: The position after the last character replaced. Use end == start to insert text.
+		:param text: The new text, which can be empty to delete text.
+		:return: Returns the part of the new text which has new units, as a tuple (start, end), e.g. for process_segments().
+		"""
+		assert 0 <= start <= end <= self._length, "The edit must be inside the document"
+
+		units = self._units
+		starts = self._starts
+
+		# the edited units, up to the unit containing 'end', so the units behind them stay complete
+		first = self._unit_at(start)
+		last = max(bisect.bisect_right(starts, end), first)
+
+		regionstart = starts[first] if first < len(units) else self._length
+		old = units[first:last]
+		oldtext = "".join(u.text for u in old)
+		newtext = oldtext[:start - regionstart] + text + oldtext[end - regionstart:]
+
+		# keep the results of units which did not change, e.g. the sentence behind the edit
+		reusable = {}
+		for u in old:
+			self._stale.discard(u)
+			if u.segments is not None and u.hasfurigana:
+				self._furiganacount -= 1
+			reusable.setdefault(u.text, u)
+
+		new = []
+		newstarts = []
+		pos = regionstart
+		for m in _unitpattern.finditer(newtext):
+			t = m.group()
+			u = reusable.pop(t, None)
+			if u is None:
+				u = DocumentUnit(t)
+
+			if u.segments is None:
+				self._stale.add(u)
+			elif u.hasfurigana:
+				self._furiganacount += 1
+
+			new.append(u)
+			newstarts.append(pos)
+			pos += len(t)
+
+		delta = len(newtext) - len(oldtext)
+
+		units[first:last] = new
+		starts[first:last] = newstarts
+		if delta != 0:
+			tail = first + len(new)
+			starts[tail:] = [s + delta for s in starts[tail:]]
+
+		self._length += delta
+
+		# the units behind the edit move, the new ones are rendered when the text is read
+		shift = len(new) - (last - first)
+		self._unrendered = {i if i < first else i + shift for i in self._unrendered if i < first or i >= last}
+		self._unrendered.update(first + k for k in range(len(new)) if new[k].rendered is None)
+		self._pieces[first:last] = [u.rendered if u.rendered is not None else "" for u in new]
+		self._rendered = None
+
+		return regionstart, regionstart + len(newtext)
+
+	def set_text(self, text: str) -> tuple[int, int]:
+		"""
+		Replaces the whole text of the document, e.g. when an editor only sends the whole text. Only the part which is different from the current text is edited, see edit().
+		:param text: The new text of the document.
+		:return: Returns the part of the new text which has new units, see edit().
+		"""
+		current = self.text
+		n = min(len(current), len(text))
+
+		# the length of the unchanged text at the beginning
+		prefix = 0
+		while prefix < n and current[prefix:prefix + _comparechunk] == text[prefix:prefix + _comparechunk]:
+			prefix += _comparechunk
+		prefix = min(prefix, n)
+		while prefix < n and current[prefix] == text[prefix]:
+			prefix += 1
+
+		# the length of the unchanged text at the end, which must not overlap the beginning
+		n -= prefix
+		suffix = 0
+		while suffix + _comparechunk <= n and current[len(current) - suffix - _comparechunk:len(current) - suffix] == text[len(text) - suffix - _comparechunk:len(text) - suffix]:
+			suffix += _comparechunk
+		while suffix < n and current[len(current) - suffix - 1] == text[len(text) - suffix - 1]:
+			suffix += 1
+
+		return self.edit(prefix, len(current) - suffix, text[prefix:len(text) - suffix])
+
+	def _update(self) -> None:
+		"""
+		Processes all units which changed since the last call, all in one batch.
+		"""
+		instance = self.instance
+
+		fingerprint = instance._config_fingerprint()
+		if fingerprint != self._fingerprint:
+			# the readings changed, so every unit can have different furigana now
+			self._fingerprint = fingerprint
+			self._furiganacount = 0
+			self._stale = set(self._units)
+			for u in self._units:
+				u.segments = None
+				u.rendered = None
+			self._unrendered = set(range(len(self._units)))
+
+		tags = (instance.opentag, instance.closetag)
+		if tags != self._tags:
+			self._tags = tags
+			for u in self._units:
+				u.rendered = None
+			self._unrendered = set(range(len(self._units)))
+
+		if len(self._stale) < 1:
+			return
+
+		# the stale units are new or were changed by the configuration, so they are not rendered yet
+		stale = list(self._stale)
+		self._stale = set()
+
+		t = time.perf_counter()
+		results = instance._process_many([u.text for u in stale], None if self.userdata is None else [self.userdata] * len(stale))
+
+		for u, (hasfurigana, segments, problems) in zip(stale, results):
+			u.hasfurigana = hasfurigana
+			u.segments = segments
+			u.problems = problems
+			u.rendered = None
+			if hasfurigana:
+				self._furiganacount += 1
+
+		if instance.stats is not None:
+			instance.stats.add_stage("document", time.perf_counter() - t)
+			instance.stats.add_count("document_units", len(stale))
+
+	def _range(self, start: int, end: int) -> range:
+		"""
+		:return: Returns the indexes of the units overlapping the part of the document from 'start' to 'end'.
+		"""
+		if end is None or end > self._length:
+			end = self._length
+
+		first = max(bisect.bisect_right(self._starts, start) - 1, 0)
+		last = bisect.bisect_left(self._starts, end) if end > start else first
+
+		return range(first, last)
+
+	@staticmethod
+	def _add_problems(problems: list[Problem], units: list[DocumentUnit]) -> None:
+		"""
+		Adds the problems of units to a list of problems, see Instance.process().
+		"""
+		if problems is None:
+			return
+
+		if callable(problems):
+			problems = ProblemCallback(problems)
+
+		for u in units:
+			if len(u.problems) > 0:
+				problems.extend(u.problems)
+
+	def process(self, problems: list[Problem] = None) -> tuple[bool, str]:
+		"""
+		Gets the document with furigana, processing the units which changed since the last call.
+		:param problems: Optional, the problems of the whole document are added here, see Instance.process().
+		:return: Returns a tuple (hasfurigana, processedtext), see Instance.process().
+		"""
+		self._update()
+
+		# only the units changed since the last call are rendered
+		if len(self._unrendered) > 0:
+			render = self.instance._render
+			units = self._units
+			pieces = self._pieces
+			for i in self._unrendered:
+				u = units[i]
+				u.rendered = render(u.segments)
+				pieces[i] = u.rendered
+
+			self._unrendered = set()
+			self._rendered = None
+
+		if self._rendered is None:
+			self._rendered = "".join(self._pieces)
+
+		self._add_problems(problems, self._units)
+
+		return self._furiganacount > 0, self._rendered
+
+	def process_segments(self, problems: list[Problem] = None, start: int = 0, end: int = None) -> tuple[bool, list[tuple[str, str, int]]]:
+		"""
+		Like process(), but returns the document as segments, see Instance.process_segments(). Only a part of the document can be requested, e.g. the part returned by edit().
+		:param problems: Optional, the problems of the returned units are added here, see Instance.process().
+		:param start: The position of the first character needed.
+		:param end: The position after the last character needed. By default, the end of the document.
+		:return: Returns a tuple (hasfurigana, segments) for the units overlapping the part, which can begin before 'start' and end after 'end'. The start of every segment is its position in the document.
+		"""
+		self._update()
+
+		units = self._units
+		starts = self._starts
+
+		hasfurigana = False
+		segments = []
+		indexes = self._range(start, end)
+		for i in indexes:
+			u = units[i]
+			hasfurigana = hasfurigana or u.hasfurigana
+
+			s = starts[i]
+			segments.extend((surface, reading, s + pos) for surface, reading, pos in u.segments)
+
+		self._add_problems(problems, [units[i] for i in indexes])
+
+		return hasfurigana, segments
@@ -56,23 +56,9 @@ if fixproblems:
 	maker.add_wordreadings(wordreadings)
 
 
-# read input lines
-with open("example_textfile_input.txt", "r", encoding="utf8") as f:
-	lines = f.readlines()
-
-
-# add furigana
+# add furigana, reading and writing the files line by line
 problems = []
-furiganalines = []
-for i in range(len(lines)):
-	hasfurigana, furiganatext = maker.process(lines[i], problems, "Line " + str(i+1))
-
-	furiganalines.append(furiganatext)
-
-
-# write output file
-with open("example_textfile_output.txt", "w", encoding="utf8") as f:
-	f.writelines(furiganalines)
+maker.process_file("example_textfile_input.txt", "example_textfile_output.txt", problems)
 
 
 # print problems
@@ -16,14 +16,28 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-# requires mecab-python3, unidic, pykakasi
-import os
-from typing import Sequence
-import pykakasi
+# requires pykakasi, optionally mecab-python3, unidic, jamdict and numpy
+import itertools
+import re
+import time
+from typing import Sequence, Iterable, Iterator, Callable, TYPE_CHECKING
 
+from .backends import Backends
+from .cachefile import write_cache, read_cache
+from .columnar import factorize, screen, group_rows
+from .document import Document
 from .instanceprv import InstancePrv, CachedReading
-from .problem import Problem
+from .markup import MarkupTokenizer
+from .problem import Problem, ProblemCallback
+from .rendering import render_ruby
+from .resultcache import ResultCache
+from .stats import Stats
 from .utils import is_kanji
+from .wordmatcher import WordMatcher
+
+if TYPE_CHECKING:
+	import numpy
+	import pykakasi
 
 
 class KanjiReading:
@@ -69,30 +83,68 @@ class WordReading:
 class Instance(InstancePrv):
 	"""
 	This class implements all the private functions for Instance.
+	An instance can be used by many threads at the same time, see process_many_threads(). Its configuration, e.g. add_wordreadings(), should only be changed while no texts are processed.
 	"""
-	def __init__(self, opentag: str, closetag: str, kakasi: pykakasi.kakasi, mecabtagger = None, jamdict = None):
+	def __init__(self, opentag: str, closetag: str, kakasi: "pykakasi.kakasi" = None, mecabtagger = None, jamdict = None, backends: Backends = None):
 		"""
-		Creates a new instance.
+		Creates a new instance. This is cheap, as the libraries are only created when they are needed for the first time.
 		:param opentag: The tag used to mark the beginning of a furigana block.
 		:param closetag: The tag used to mark the end of a furigana block.
-		:param kakasi: The main library used to generate the furigana readings and convert readings in general.
+		:param kakasi: The main library used to generate the furigana readings and convert readings in general. When None, it is created when needed.
 		:param mecabtagger: An optional MeCab.Tagger() which can be used to get additional readings.
 		:param jamdict: An optional Jamdict() which can be used to get additional readings.
+		:param backends: Optional, libraries shared with other instances. When given, 'kakasi', 'mecabtagger' and 'jamdict' are ignored.
 		"""
-		if mecabtagger:
-			import unidic
-			matrixpath = os.path.join(unidic.DICDIR, "matrix.bin")
-			if not os.path.isfile(matrixpath):
-				raise Exception("Could not find \"" + matrixpath + "\". Did you run \"python -m unidic download\"? Might require admin rights.")
-
 		InstancePrv.__init__(self)
 
-		self.mecab = mecabtagger
-		self.kakasi = kakasi
-		self.jam = jamdict
+		if backends is None:
+			backends = Backends(kakasi, mecabtagger, jamdict)
+
+		self.backends = backends
 		self.opentag = opentag
 		self.closetag = closetag
 
+	def create_view(self, opentag: str = None, closetag: str = None) -> "Instance":
+		"""
+		Creates a lightweight instance on top of this one, e.g. for every customer of a service.
+		The view shares everything expensive with this instance: the backends, the readings cache, the result cache, the stats and the executor.
+		It has its own tags and its own custom readings, which replace the readings of this instance without changing them. Readings added to this instance later are used by the view as well.
+		Creating a view does not copy any readings, so it is fast and needs very little memory.
+		:param opentag: Optional, the tag used to mark the beginning of a furigana block. By default, the tag of this instance.
+		:param closetag: Optional, the tag used to mark the end of a furigana block. By default, the tag of this instance.
+		:return: Returns the view.
+		"""
+		view = Instance(self.opentag if opentag is None else opentag, self.closetag if closetag is None else closetag, backends=self.backends)
+
+		# share the readings cache and the lookups in progress
+		view.readingscache = self.readingscache
+		view._cachelock = self._cachelock
+		view._pendingreadings = self._pendingreadings
+		view._readingindexes = self._readingindexes
+
+		view.resultcache = self.resultcache
+		view.stats = self.stats
+		view.executor = self.executor
+		view.segmenter = self.segmenter
+		view.counters = self.counters
+		view.maxalignments = self.maxalignments
+		view.protectedspans = self.protectedspans
+
+		view._parent = self
+		view._wordmatcher = WordMatcher(self._wordmatcher)
+		view._overlays = [{}] + self._overlays
+
+		return view
+
+	def create_document(self, text: str = "", userdata = None) -> Document:
+		"""
+		Creates a document, which keeps its furigana while it is changed by small edits, e.g. in an editor. Only the sentences and lines touched by an edit are processed again, see Document.
+		:param text: The text of the document.
+		:param userdata: This data is added to any problem which was found, see process().
+		:return: Returns the document.
+		"""
+		return Document(self, text, userdata)
+
 	def add_kanjireadings(self, additionalreadings: dict[str, KanjiReading]) -> None:
 		"""
 		Adds readings for individual kanjis.
@@ -117,7 +169,12 @@ class Instance(InstancePrv):
 
 					cached.append(CachedReading(k, h))
 
-			self._addtocache(kanji, cached)
+			# a view keeps its readings to itself, as the readings cache is shared
+			self._addtocache(kanji, cached, self._overlays[0] if self._parent is not None else None)
+			self._kanjireadings[kanji] = (list(reading.on), list(reading.kun))
+
+		self._readingsversion += 1
+		self._fingerprint = None
 
 	def add_wordreadings(self, customreadings: Sequence[WordReading]) -> None:
 		"""
@@ -129,25 +186,483 @@ class Instance(InstancePrv):
 			assert isinstance(reading, WordReading), "Expected WordReading type!"
 			word = "".join(reading.on)
 
-			repl = self.customreadings_opentag
+			# the segments of the word, with the start relative to the word
+			segments = []
+			start = 0
 			for i in range(len(reading.on)):
 				k = reading.on[i]
 				r = reading.kun[i]
 
-				if len(k) == 1 and is_kanji(k):
-					repl += k + self.opentag + r + self.closetag
-				else:
-					repl += k
-			repl += self.customreadings_closetag
+				segments.append((k, r if len(k) == 1 and is_kanji(k) else None, start))
+				start += len(k)
+
+			self.customreadings[word] = self._render(segments)
+			self._wordmatcher.add(word, segments)
+			self._wordreadings[word] = (list(reading.on), list(reading.kun))
+
+		self._fingerprint = None
+
+	def add_protectedspans(self, rules: dict[str, str]) -> None:
+		"""
+		Adds kinds of text which are kept as they are, without furigana, custom word readings or numbers. By default, these are "code" spans in backticks, "url", "email", "mention" and "hashtag".
+		All kinds are found together in a single pass over the text, before anything else is done.
+		:param rules: A regex for every kind of text, by name. A rule replaces the rule with the same name and None removes it. Earlier rules win when several match at the same position.
+		:return:
+		"""
+		spans = dict(self.protectedspans)
+		for name, pattern in rules.items():
+			if pattern is None:
+				spans.pop(name, None)
+			else:
+				re.compile(pattern)
+				spans[name] = pattern
+
+		# the rules are replaced and not changed, so other threads never see a regex for other rules
+		self.protectedspans = spans
+		self._fingerprint = None
+
+	def save_cache(self, path: str) -> None:
+		"""
+		Saves the readings cache and the custom word readings to a file, so another process can start with them.
+		:param path: The file to write.
+		:return:
+		"""
+		# other threads may add readings while we write
+		with self._cachelock:
+			readingscache = list(self.readingscache.items())
+
+		data = {
+			"readings": {kanji: [(r.katakana, r.hiragana) for r in readings] for kanji, readings in readingscache},
+			"wordreadings": list(self._wordreadings.values())
+		}
+
+		write_cache(path, self._cache_fingerprint(), data)
+
+	def load_cache(self, path: str) -> bool:
+		"""
+		Loads a file written by save_cache(). The file is rejected when it was written with different backend versions or different readings from add_kanjireadings().
+		:param path: The file to read.
+		:return: Returns True when the file was loaded and False when it was rejected.
+		"""
+		data = read_cache(path, self._cache_fingerprint())
+		if data is None:
+			return False
+
+		readings = data["readings"]
+		self._mergecache({kanji: [CachedReading(k, h) for k, h in readings[kanji]] for kanji in readings})
+		self._readingsversion += 1
+
+		self.add_wordreadings([WordReading(on, kun) for on, kun in data["wordreadings"]])
+
+		return True
+
+	def set_resultcache(self, resultcache: ResultCache) -> None:
+		"""
+		Sets a cache for processed texts, so texts processed before, even by another process, are not processed again.
+		The texts are stored together with a fingerprint of the custom readings and the backends, so changing any of them does not return outdated results. Instances with different tags share their results.
+		:param resultcache: The cache to use or None to disable caching.
+		:return:
+		"""
+		self.resultcache = resultcache
+
+	def set_stats(self, stats: Stats) -> None:
+		"""
+		Sets the object collecting timings and counts, like the time spent in every backend, cache hits and misses and fallbacks to furigana for a whole word.
+		Collecting stats is cheap, so it can be used in production. When no stats are set, almost nothing is done.
+		:param stats: The stats to collect into or None to disable collecting.
+		:return:
+		"""
+		self.stats = stats
+
+	def set_segmenter(self, segmenter: str) -> None:
+		"""
+		Sets the library splitting texts into words, which also gives the reading of every word.
+		"kakasi" is the default. "mecab" parses every line once with MeCab and uses the readings of its dictionary, which are more accurate. The dictionaries unidic, unidic-lite and ipadic are supported. Words without a reading in the dictionary are converted by kakasi.
+		:param segmenter: Either "kakasi" or "mecab". MeCab must be used by the backends.
+		:return:
+		"""
+		assert segmenter in ("kakasi", "mecab"), "Unknown segmenter"
+		assert segmenter != "mecab" or self.backends.usemecab, "MeCab is not used by the backends"
 
-			self.customreadings[word] = repl
+		self.segmenter = segmenter
+		self._fingerprint = None
+
+	def set_executor(self, executor) -> None:
+		"""
+		Sets the executor used by process_async(), process_many_async() and process_many_threads().
+		:param executor: A concurrent.futures.Executor or None to use the default executor of the event loop.
+		:return:
+		"""
+		self.executor = executor
+
+	def set_maxalignments(self, maxentries: int) -> None:
+		"""
+		Sets how many words are kept with their furigana and problems, so a word seen again needs no alignment of its readings.
+		The words are forgotten when the readings of a kanji change, e.g. by add_kanjireadings() or load_cache(). Views without kanji readings of their own share the words of their parent.
+		The least recently used words are removed first.
+		:param maxentries: The maximum number of words kept, or 0 to keep none.
+		:return:
+		"""
+		assert maxentries >= 0, "The number of words must not be negative"
+
+		self.maxalignments = maxentries
+		self._alignmemo = None
 
 	def process(self, text: str, problems: list[Problem], userdata = None) -> tuple[bool, str]:
 		"""
 		Takes a string and adds furigana to it.
 		:param text: The text you want to add furigana to it.
-		:param problems: Any problem found during the processing is added here.
+		:param problems: Any problem found during the processing is added here. Can be a list, any object with append() and extend() or a function called for every problem. When None, problems are not collected at all, which is faster.
 		:param userdata: This data is added to any problem which was found, allowing you to trackback where the text came from, e.g. line in file.
 		:return: Returns a tuple (hasfurigana, processedtext), where hasfurigana tells you if furigana has been added and processedtext is the resulting text.
 		"""
-		return self._process_text(text, problems, userdata)
+		hasfurigana, segments = self.process_segments(text, problems, userdata)
+
+		return hasfurigana, self._render(segments)
+
+	def process_segments(self, text: str, problems: list[Problem], userdata = None) -> tuple[bool, list[tuple[str, str, int]]]:
+		"""
+		Like process(), but returns the text as segments, so it does not have to be parsed again. Use render_tags() or render_ruby() to turn them into text.
+		:param text: The text you want to add furigana to it.
+		:param problems: Any problem found during the processing is added here, see process().
+		:param userdata: This data is added to any problem which was found, see process().
+		:return: Returns a tuple (hasfurigana, segments). Every segment is a tuple (text, reading, start), where reading is None for text without furigana and start is the position in 'text'. Numbers written with Arabic digits keep the digits as their text, like ('3', 'さん', 0). Only a number before a counter without a known reading is written with kanji, so it is read together with the counter, like ('二文字', 'ふたもじ', 0) for 2文字, and 0 before a counter is written as ゼロ.
+		"""
+		if callable(problems):
+			problems = ProblemCallback(problems)
+
+		if self.stats is None:
+			return self._process_text_cached(text, problems, userdata)
+
+		t = time.perf_counter()
+		result = self._process_text_cached(text, problems, userdata)
+		self.stats.add_stage("process", time.perf_counter() - t)
+
+		return result
+
+	def process_many(self, texts: Iterable[str], userdata: Iterable = None, collectproblems: bool = True) -> list[tuple[bool, str, list[Problem]]]:
+		"""
+		Takes many strings and adds furigana to them. This is faster than calling process() for every string, as identical strings are only processed once and kakasi converts all strings in one go.
+		:param texts: The texts you want to add furigana to.
+		:param userdata: Optional, the userdata for every text, see process(). Must have the same length as 'texts'.
+		:param collectproblems: When False, problems are not collected at all, which is faster. Every text gets an empty list of problems.
+		:return: Returns a list of tuples (hasfurigana, processedtext, problems), in the same order as 'texts'. The problems are the ones found for this text.
+		"""
+		return [(hasfurigana, self._render(segments), problems) for hasfurigana, segments, problems in self.process_many_segments(texts, userdata, collectproblems)]
+
+	def process_many_segments(self, texts: Iterable[str], userdata: Iterable = None, collectproblems: bool = True) -> list[tuple[bool, list[tuple[str, str, int]], list[Problem]]]:
+		"""
+		Like process_many(), but returns every text as segments, see process_segments().
+		:param texts: The texts you want to add furigana to.
+		:param userdata: Optional, the userdata for every text, see process().
+		:param collectproblems: When False, problems are not collected at all, see process_many().
+		:return: Returns a list of tuples (hasfurigana, segments, problems), in the same order as 'texts'. Identical texts share the same list of segments.
+		"""
+		texts = list(texts)
+		userdata = list(userdata) if userdata is not None else None
+
+		if self.stats is None:
+			return self._process_many(texts, userdata, collectproblems)
+
+		t = time.perf_counter()
+		results = self._process_many(texts, userdata, collectproblems)
+		self.stats.add_stage("process_many", time.perf_counter() - t)
+
+		return results
+
+	def process_many_threads(self, texts: Iterable[str], userdata: Iterable = None, workers: int = None, batchsize: int = 64, collectproblems: bool = True) -> list[tuple[bool, str, list[Problem]]]:
+		"""
+		Like process_many(), but the texts are split into batches, which are processed by a pool of threads at the same time, all sharing this instance and its readings cache.
+		This is faster with a free-threaded Python or backends which release the GIL. A kanji looked up by several threads at the same time is only looked up once.
+		:param texts: The texts you want to add furigana to.
+		:param userdata: Optional, the userdata for every text, see process().
+		:param workers: The number of threads, when no executor was set with set_executor(). By default, the number chosen by ThreadPoolExecutor.
+		:param batchsize: The number of texts passed to process_many() at once.
+		:param collectproblems: When False, problems are not collected at all, see process_many().
+		:return: Returns a list of tuples (hasfurigana, processedtext, problems), see process_many().
+		"""
+		from concurrent.futures import ThreadPoolExecutor
+
+		assert batchsize > 0, "Batches cannot be empty"
+
+		texts = list(texts)
+		userdata = list(userdata) if userdata is not None else None
+		assert userdata is None or len(userdata) == len(texts), "Expected userdata for every text"
+
+		if self.stats is not None:
+			t = time.perf_counter()
+
+		def run(executor) -> list[tuple[bool, str, list[Problem]]]:
+			futures = []
+			for i in range(0, len(texts), batchsize):
+				batchuserdata = userdata[i:i + batchsize] if userdata is not None else None
+				futures.append(executor.submit(self._process_many_text, texts[i:i + batchsize], batchuserdata, collectproblems))
+
+			batchresults = []
+			for future in futures:
+				batchresults.extend(future.result())
+
+			return batchresults
+
+		if self.executor is not None:
+			results = run(self.executor)
+		else:
+			with ThreadPoolExecutor(workers) as pool:
+				results = run(pool)
+
+		if self.stats is not None:
+			self.stats.add_stage("process_many_threads", time.perf_counter() - t)
+
+		return results
+
+	def process_column(self, values: Sequence[str], collectproblems: bool = True, batchsize: int = 1024) -> tuple["numpy.ndarray", "numpy.ndarray", dict[str, "numpy.ndarray"]]:
+		"""
+		Adds furigana to a column of a table, e.g. a pandas Series or a pyarrow array with millions of rows. Requires numpy.
+		Identical values are only processed once. Values without kanji are found by checking all of them at once with numpy and are returned as they are, without any further work.
+		:param values: The strings of the column. Values which are not strings, like None, are returned as they are.
+		:param collectproblems: When False, problems are not collected at all, which is faster.
+		:param batchsize: The number of different values passed to process_many() at once.
+		:return: Returns a tuple (output, hasfurigana, problems). 'output' is an object array with the processed text of every row and 'hasfurigana' a bool array.
+			'problems' is a table with the columns "row", "code", "kanji", "word", "kana" and "reading", each an array with an element for every problem, ordered by row, e.g. for pandas.DataFrame(problems).
+		"""
+		assert batchsize > 0, "Batches cannot be empty"
+
+		# only import this when a column is processed
+		import numpy
+
+		t = time.perf_counter()
+
+		# pyarrow arrays iterate over their own scalar objects
+		if hasattr(values, "to_pylist"):
+			values = values.to_pylist()
+
+		codes, uniques = factorize(values)
+
+		output = numpy.fromiter(uniques, dtype=object, count=len(uniques))
+		hasfurigana = numpy.zeros(len(uniques), dtype=bool)
+
+		# only the strings which can get furigana have to be processed
+		strings = [u for u in range(len(uniques)) if isinstance(uniques[u], str)]
+		mask = screen([uniques[u] for u in strings], self.counters is not None and len(self.counters) > 0)
+		todo = [strings[i] for i in numpy.flatnonzero(mask)]
+
+		uniqueproblems = {}
+		for b in range(0, len(todo), batchsize):
+			batch = todo[b:b + batchsize]
+
+			for u, (hasfuri, segments, problems) in zip(batch, self._process_many([uniques[u] for u in batch], None, collectproblems)):
+				output[u] = self._render(segments)
+				hasfurigana[u] = hasfuri
+				if len(problems) > 0:
+					uniqueproblems[u] = [p.astuple() for p in problems]
+
+		# the problems of a value belong to every row with this value
+		names = ("code", "kanji", "word", "kana", "reading")
+		problemrows = []
+		problemfields = []
+		if len(uniqueproblems) > 0:
+			rows, starts = group_rows(codes, len(uniques))
+			for u, fields in uniqueproblems.items():
+				urows = rows[starts[u]:starts[u + 1]]
+				for f in fields:
+					problemrows.append(urows)
+					problemfields.append(f)
+
+		counts = [len(r) for r in problemrows]
+		table = {"row": numpy.concatenate(problemrows) if len(problemrows) > 0 else numpy.zeros(0, dtype=numpy.intp)}
+		for i in range(len(names)):
+			table[names[i]] = numpy.repeat(numpy.array([f[i] for f in problemfields], dtype=object), counts)
+
+		order = numpy.argsort(table["row"], kind="stable")
+		for name in table:
+			table[name] = table[name][order]
+
+		result = output[codes], hasfurigana[codes], table
+
+		if self.stats is not None:
+			self.stats.add_stage("process_column", time.perf_counter() - t)
+
+		return result
+
+	def process_stream(self, lines: Iterable[str], problems = None, userdata: Callable[[int], object] = None, batchsize: int = 256) -> Iterator[tuple[bool, str]]:
+		"""
+		Takes lines one by one and adds furigana to them. Only 'batchsize' lines are kept in memory, so this works for inputs of any size.
+		:param lines: The lines you want to add furigana to, e.g. an open file.
+		:param problems: Any problem found is added here. Can be a list, any object with append() and extend() or a function called for every problem. When None, problems are not collected at all.
+		:param userdata: Optional, a function returning the userdata for the line with the given index. By default, the userdata is the line number, starting at 1.
+		:param batchsize: The number of lines passed to process_many() at once.
+		:return: Returns an iterator over tuples (hasfurigana, processedtext), in the same order as 'lines'.
+		"""
+		assert batchsize > 0, "Batches cannot be empty"
+
+		if callable(problems):
+			problems = ProblemCallback(problems)
+
+		lines = iter(lines)
+		start = 0
+		while True:
+			batch = list(itertools.islice(lines, batchsize))
+			if len(batch) < 1:
+				break
+
+			if userdata is not None:
+				batchuserdata = [userdata(start + i) for i in range(len(batch))]
+			else:
+				batchuserdata = range(start + 1, start + len(batch) + 1)
+
+			for hasfurigana, result, lineproblems in self.process_many(batch, batchuserdata, problems is not None):
+				if problems is not None and len(lineproblems) > 0:
+					problems.extend(lineproblems)
+
+				yield hasfurigana, result
+
+			start += len(batch)
+
+	def process_file(self, inputpath: str, outputpath: str, problems = None, encoding: str = "utf8", batchsize: int = 256) -> tuple[int, int]:
+		"""
+		Adds furigana to a text file. The file is read and written line by line, so it can be of any size.
+		:param inputpath: The text file to read.
+		:param outputpath: The text file to write.
+		:param problems: Any problem found is added here, see process_stream(). The userdata of a problem is the line number.
+		:param encoding: The encoding of both files.
+		:param batchsize: The number of lines processed at once.
+		:return: Returns a tuple (lines, furiganalines), where lines is the number of lines processed and furiganalines the number of lines furigana has been added to.
+		"""
+		lines = 0
+		furiganalines = 0
+
+		with open(inputpath, "r", encoding=encoding) as fin, open(outputpath, "w", encoding=encoding, buffering=1 << 16) as fout:
+			for hasfurigana, result in self.process_stream(fin, problems, None, batchsize):
+				fout.write(result)
+
+				lines += 1
+				if hasfurigana:
+					furiganalines += 1
+
+		return lines, furiganalines
+
+	def process_markup(self, chunks: Iterable[str], problems = None, parentheses: bool = False, skiptags: Sequence[str] = None, batchsize: int = 256) -> Iterator[str]:
+		"""
+		Adds furigana to HTML or XML, which is read in chunks, e.g. from a large web archive. Only the text nodes are annotated, every reading in a <ruby> element, and the markup is kept as it is.
+		The markup is not parsed into a DOM, only 'batchsize' text nodes and the markup between them are kept in memory, so this works for inputs of any size.
+		:param chunks: The HTML or XML, in parts of any size, e.g. read from a file.
+		:param problems: Any problem found is added here, see process_stream(). The userdata of a problem is the position of its text node in the input.
+		:param parentheses: When True, <rp> elements are added, see render_ruby().
+		:param skiptags: The elements whose content is not annotated. By default, only ruby. The content of script, style, title and textarea is never annotated.
+		:param batchsize: The number of text nodes passed to process_many() at once.
+		:return: Returns an iterator over the annotated parts of the input.
+		"""
+		assert batchsize > 0, "Batches cannot be empty"
+
+		if callable(problems):
+			problems = ProblemCallback(problems)
+
+		tokenizer = MarkupTokenizer(skiptags)
+		tokens = []
+		texts = []
+
+		def annotate() -> str:
+			t = time.perf_counter()
+
+			results = iter(self._process_many([text for text, _ in texts], [offset for _, offset in texts], problems is not None))
+
+			output = []
+			for token, istext, _ in tokens:
+				if not istext:
+					output.append(token)
+					continue
+
+				hasfurigana, segments, textproblems = next(results)
+				if problems is not None and len(textproblems) > 0:
+					problems.extend(textproblems)
+
+				output.append(render_ruby(segments, parentheses, False) if hasfurigana else token)
+
+			tokens.clear()
+			texts.clear()
+
+			if self.stats is not None:
+				self.stats.add_stage("process_markup", time.perf_counter() - t)
+
+			return "".join(output)
+
+		for chunk in itertools.chain(chunks, (None,)):
+			for token in tokenizer.feed(chunk) if chunk is not None else tokenizer.close():
+				tokens.append(token)
+				if token[1]:
+					texts.append((token[0], token[2]))
+
+			# markup without text nodes is passed on as well, so it is not collected forever
+			if len(texts) >= batchsize or len(tokens) >= 4 * batchsize or (chunk is None and len(tokens) > 0):
+				yield annotate()
+
+	def process_markup_file(self, inputpath: str, outputpath: str, problems = None, encoding: str = "utf8", parentheses: bool = False, skiptags: Sequence[str] = None) -> None:
+		"""
+		Adds furigana to an HTML or XML file, see process_markup(). The file is read and written in chunks, so it can be of any size.
+		:param inputpath: The file to read.
+		:param outputpath: The file to write.
+		:param problems: Any problem found is added here, see process_markup().
+		:param encoding: The encoding of both files.
+		:param parentheses: When True, <rp> elements are added, see render_ruby().
+		:param skiptags: The elements whose content is not annotated, see process_markup().
+		:return:
+		"""
+		# the new lines are kept as they are
+		with open(inputpath, "r", encoding=encoding, newline="") as fin, open(outputpath, "w", encoding=encoding, newline="", buffering=1 << 16) as fout:
+			for result in self.process_markup(iter(lambda: fin.read(1 << 16), ""), problems, parentheses, skiptags):
+				fout.write(result)
+
+	async def process_async(self, text: str, problems: list[Problem], userdata = None) -> tuple[bool, str]:
+		"""
+		Like process(), but runs in the executor, so the event loop is not blocked. See set_executor().
+		:param text: The text you want to add furigana to it.
+		:param problems: Any problem found during the processing is added here, see process().
+		:param userdata: This data is added to any problem which was found, see process().
+		:return: Returns a tuple (hasfurigana, processedtext), see process().
+		"""
+		import asyncio
+
+		loop = asyncio.get_running_loop()
+
+		# the problems are only added inside of the event loop
+		textproblems = [] if problems is not None else None
+		result = await loop.run_in_executor(self.executor, self.process, text, textproblems, userdata)
+
+		if problems is not None:
+			if callable(problems):
+				problems = ProblemCallback(problems)
+
+			problems.extend(textproblems)
+
+		return result
+
+	async def process_many_async(self, texts: Iterable[str], userdata: Iterable = None, batchsize: int = 64, collectproblems: bool = True) -> list[tuple[bool, str, list[Problem]]]:
+		"""
+		Like process_many(), but runs in the executor, so the event loop is not blocked. See set_executor().
+		The texts are split into batches, so large inputs do not occupy a single worker for long and batches can run at the same time.
+		:param texts: The texts you want to add furigana to.
+		:param userdata: Optional, the userdata for every text, see process().
+		:param batchsize: The number of texts passed to process_many() at once.
+		:param collectproblems: When False, problems are not collected at all, see process_many().
+		:return: Returns a list of tuples (hasfurigana, processedtext, problems), see process_many().
+		"""
+		import asyncio
+
+		assert batchsize > 0, "Batches cannot be empty"
+
+		loop = asyncio.get_running_loop()
+
+		texts = list(texts)
+		userdata = list(userdata) if userdata is not None else None
+		assert userdata is None or len(userdata) == len(texts), "Expected userdata for every text"
+
+		futures = []
+		for i in range(0, len(texts), batchsize):
+			batchuserdata = userdata[i:i + batchsize] if userdata is not None else None
+			futures.append(loop.run_in_executor(self.executor, self._process_many_text, texts[i:i + batchsize], batchuserdata, collectproblems))
+
+		results = []
+		for batch in await asyncio.gather(*futures):
+			results.extend(batch)
+
+		return results
@@ -17,36 +17,11 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 
-def katakana_vowels_init():
-	"""
-	Helper function which generates a dictionary where for ord(katakana), we get the katakana vowel. So ord(キ) provides 'イ'.
-	:return: the generated dictionary.
-	"""
-	result = {}
-
-	vowels = {
-		"ア": ("ア", "カ", "サ", "タ", "ナ", "ハ", "マ", "ヤ", "ラ", "ワ", "ガ", "ザ", "ダ", "バ", "パ", "ャ"),
-		"イ": ("イ", "キ", "シ", "チ", "ニ", "ヒ", "ミ", "リ", "ヰ", "ギ", "ジ", "ヂ", "ビ", "ピ"),
-		"ウ": ("ウ", "ク", "ス", "ツ", "ヌ", "フ", "ム", "ユ", "ル", "グ", "ズ", "ヅ", "ブ", "プ", "ュ"),
-		"エ": ("エ", "ケ", "セ", "テ", "ネ", "ヘ", "メ", "レ", "ヱ", "ゲ", "ゼ", "デ", "ベ", "ペ"),
-		"オ": ("オ", "コ", "ソ", "ト", "ノ", "ホ", "モ", "ヨ", "ロ", "ヲ", "ゴ", "ゾ", "ド", "ボ", "ポ", "ョ")
-	}
-
-	for v in vowels:
-		for k in vowels[v]:
-			result[ord(k)] = v
-
-	return result
-
-
 class InstanceData:
 	"""
 	This class provides some pre-generated data for InstancePrv.
 	"""
 
-	""" A dictionary where for ord(katakana), we get the katakana vowel. So ord(キ) provides 'イ'. """
-	_katakana_vowels = katakana_vowels_init()
-
 	""" Maps a variant of a hiragana wording to its base wording. """
 	_basehiragana = {
 		"が": "か", "ざ": "さ", "だ": "た", "ば": "は", "ぱ": "は",
@@ -56,5 +31,58 @@ class InstanceData:
 		"ご": "こ", "ぞ": "そ", "ど": "と", "ぼ": "ほ", "ぽ": "ほ"
 	}
 
+	""" The voiced variants of the first kana of a reading, when it follows another kanji (rendaku), like 国 くに in 島国 しまぐに. """
+	_rendaku = {
+		"カ": "ガ", "キ": "ギ", "ク": "グ", "ケ": "ゲ", "コ": "ゴ",
+		"サ": "ザ", "シ": "ジ", "ス": "ズ", "セ": "ゼ", "ソ": "ゾ",
+		"タ": "ダ", "チ": "ヂジ", "ツ": "ヅズ", "テ": "デ", "ト": "ド",
+		"ハ": "バパ", "ヒ": "ビピ", "フ": "ブプ", "ヘ": "ベペ", "ホ": "ボポ"
+	}
+
+	""" The last kana of a reading, which becomes a small ツ in front of another kanji (sokuon), like 学 がく in 学校 がっこう. """
+	_sokuonendings = ("ツ", "ク", "チ", "キ")
+
 	""" A list of most of the kanji numbers. Used to detect numbers. """
 	_kanjinumbers = ("一", "二", "三", "四", "五", "六", "七", "八", "九", "十", "零")
+
+	""" The character used to join texts for a single kakasi conversion. kakasi almost always keeps it as its own token. """
+	_batchseparator = "\u2029"
+
+	""" The longest text converted by a single call to kakasi, when many lines are joined. kakasi needs more time per character for longer texts. """
+	_maxbatchchars = 512
+
+	""" The output of kakasi.convert() for a new line. """
+	_newlineconv = {"orig": "\n", "hira": "", "kana": ""}
+
+	""" The default Japanese counters, which are used after numbers. Every instance gets its own list of them. """
+	_counters = ("つ", "個", "本", "枚", "匹", "頭", "羽", "冊", "台", "分", "日", "年", "回", "人", "月", "階", "歳",
+				 "円", "箇", "缶", "巻", "曲", "切", "口", "組", "件", "軒", "語", "校", "皿", "試", "品", "社", "種",
+				 "週", "周", "色", "席", "戦", "足", "束", "玉", "段", "着", "通", "粒", "点", "度", "杯", "泊", "箱",
+				 "発", "番", "便", "袋", "部", "歩", "名", "文", "問", "話", "ヶ")
+
+	""" The default protected spans, which are kept as they are, see Instance.add_protectedspans(). Earlier rules win when several match at the same position. Rules only start at the beginning of a run of their characters, so long runs are scanned in linear time.
+	URLs end at whitespace, like https://ja.wikipedia.org/wiki/化け猫, or at Japanese punctuation, as Japanese text often follows them without a space. The punctuation at their end and closing brackets which were not opened in the URL are not part of them.
+	Hashtags end at the first kanji, as Japanese text often follows them without a space and needs furigana. So the kanji of a hashtag get furigana, like #東京[とうきょう], and a hashtag of only kanji is not protected at all. """
+	_protectedspans = {
+		"code": r"`[^`\n]+`",
+		"url": r"(?<![A-Za-z0-9+.\-])[A-Za-z][A-Za-z0-9+.\-]*://(?:\([^\s()]*\)|（[^\s（）]*）|[^\s)）、。，．！？」』】〕])*(?<![.,:;!?'\"：；…\]}>])",
+		"email": r"(?<![A-Za-z0-9._%+\-])[A-Za-z0-9._%+\-]+@[A-Za-z0-9\-]+(?:\.[A-Za-z0-9\-]+)+",
+		"mention": r"(?<![A-Za-z0-9_.])@[A-Za-z0-9_]+",
+		"hashtag": r"(?<![&\w])[#＃][0-9A-Za-z_０-９Ａ-Ｚａ-ｚぁ-ゖァ-ヺー]+"
+	}
+
+	""" The field with the reading of a word as written, for the number of features of a MeCab dictionary: ipadic has 9, unidic-lite and other unidic 2 builds 26 and unidic 3 29 or more.
+	Unknown words have less features and no reading, and so do dictionaries with another layout, like the 17 features of older unidic builds. """
+	_mecabkanafields = {9: 7, 26: 17, 29: 20}
+
+	""" Dictionaries with more features than this have the layout of this number of features, see _mecabkanafields. """
+	_mecabmaxfields = 29
+
+	""" The number of lists of readings which are indexed, see InstancePrv._get_readingindex(). More than the kanji in common use, so the indexes are only removed when many lists were replaced. """
+	_maxreadingindexes = 50000
+
+	""" The number of words whose alignment is kept, see InstancePrv._align_word(). """
+	_maxalignments = 50000
+
+	""" The largest Arabic number written with kanji in front of a counter which has no known reading. """
+	_maxkanjinumber = 12
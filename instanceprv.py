@@ -16,9 +16,22 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import collections
+import hashlib
+import json
+import re
+import threading
+import time
+
 from .instancedata import InstanceData
+from .kana import kana2hira, hira2kana, rfind_longvowels
+from .numberreading import maxnumber, number_to_kanji, kanji_to_number, reading_segments, number_pattern
 from .problem import Problem
-from .utils import is_kanji, has_kanji
+from .rendering import render_tags
+from .stats import Stats
+from .backends import Backends
+from .utils import has_kanji, split_kanji
+from .wordmatcher import WordMatcher
 
 
 class CachedReading:
@@ -41,26 +54,91 @@ class InstancePrv(InstanceData):
 	Base class of Instance which implements all the private functions.
 	"""
 
+	""" The kinds of readings used by _align_readings(): a reading as found, a reading with rendaku and a reading with sokuon. """
+	_READING = 0
+	_RENDAKU = 1
+	_SOKUON = 2
+
 	def __init__(self):
 		"""
 		Creates some default values for members.
 		"""
-		self.mecab = None
-		self.kakasi = None
-		self.jam = None
+		self.backends: Backends = None
 		self.opentag: str = ""
 		self.closetag: str = ""
-		self.customreadings_opentag: str = "<"
-		self.customreadings_closetag: str = ">"
 		self.readingscache: dict[str, list[CachedReading]] = {}
 		self.customreadings: dict[str, str] = {}
-		self.counters = ["つ", "個", "本", "枚", "匹", "頭", "羽", "冊", "台", "分", "日", "年", "回", "人", "月", "階", "歳",
-						 "円", "箇", "缶", "巻", "曲", "切", "口", "組", "件", "軒", "語", "校", "皿", "試", "品", "社", "種",
-						 "週", "周", "色", "席", "戦", "足", "束", "玉", "段", "着", "通", "粒", "点", "度", "杯", "泊", "箱",
-						 "発", "番", "便", "袋", "部", "歩", "名", "文", "問", "話", "ヶ"]
-		self.counternumbers = ("ゼロ", "一", "二", "三", "四", "五", "六", "七", "八", "九", "十", "十一", "十二")
+		self._wordmatcher = WordMatcher()
+		self._kanjireadings: dict[str, tuple[list[str], list[str]]] = {}
+		self._wordreadings: dict[str, tuple[list[str], list[str]]] = {}
+		self._fingerprint = None
+		self._parentfingerprint = None
+		self._fingerprintcounters = None
+		self.resultcache = None
+		self.executor = None
+		self.stats: Stats = None
+		self.segmenter = "kakasi"
+		self._cachelock = threading.Lock()
+		self._pendingreadings: dict[str, threading.Event] = {}
+		self.counters = list(InstanceData._counters)
+
+		self._numberpattern = None
+
+		self.protectedspans = InstanceData._protectedspans
+		self._protectedpattern = None
+
+		# set for views, see Instance.create_view()
+		self._parent: InstancePrv = None
+
+		# the kanji readings of views, their own first, which replace the readings cache
+		self._overlays: list[dict[str, list[CachedReading]]] = []
+
+		# for every list of readings a tuple (readings, index), by the identity of the list, shared with the views like the readings cache, see _get_readingindex()
+		self._readingindexes: dict[int, tuple[list[CachedReading], dict]] = {}
+
+		# changed by everything which changes the readings of a kanji, see _readings_version()
+		self._readingsversion = 0
+
+		# the words aligned for a version of the kanji readings, as a tuple (version, words), see _alignments()
+		self._alignmemo: tuple[int, collections.OrderedDict] = None
+		self.maxalignments = InstanceData._maxalignments
+
+	@property
+	def counters(self):
+		"""
+		:return: Returns the counters read together with the number in front of them, every one a single character, or None to read no counters.
+		"""
+		return self._usedcounters
+
+	@counters.setter
+	def counters(self, counters) -> None:
+		"""
+		Sets the counters, which changes the processed text like every other change of the configuration.
+		:param counters: The counters, every one a single character, or None to read no counters.
+		"""
+		self._usedcounters = counters
+		self._fingerprint = None
+
+	@property
+	def kakasi(self):
+		"""
+		:return: Returns the pykakasi.kakasi() instance, which is created when used for the first time.
+		"""
+		return self.backends.kakasi
 
-		self._counterords = None
+	@property
+	def mecab(self):
+		"""
+		:return: Returns the MeCab.Tagger() instance or None. It is created when used for the first time.
+		"""
+		return self.backends.mecab
+
+	@property
+	def jam(self):
+		"""
+		:return: Returns the Jamdict() instance or None. It is created when used for the first time.
+		"""
+		return self.backends.jam
 
 	@staticmethod
 	def _has_reading_kana(readings: list[CachedReading], katakana: str) -> bool:
@@ -97,16 +175,76 @@ class InstancePrv(InstanceData):
 		:param katakana: The katakana of the complete word the kanji is part of. Only needed when using mecab.
 		:return: A list of readings for 'kanji'.
 		"""
-		if kanji in self.readingscache:
-			return self.readingscache[kanji]
+		for overlay in self._overlays:
+			readings = overlay.get(kanji)
+			if readings is not None:
+				return readings
+
+		readings = self.readingscache.get(kanji)
+		if readings is not None:
+			if self.stats is not None:
+				self.stats.add_count("cache_hits")
+
+			return readings
+
+		# when another thread is already looking up this kanji, wait for it instead
+		with self._cachelock:
+			readings = self.readingscache.get(kanji)
+			if readings is not None:
+				return readings
+
+			pending = self._pendingreadings.get(kanji)
+			if pending is None:
+				self._pendingreadings[kanji] = threading.Event()
+
+		if pending is not None:
+			pending.wait()
 
+			readings = self.readingscache.get(kanji)
+			if readings is not None:
+				if self.stats is not None:
+					self.stats.add_count("cache_coalesced")
+
+				return readings
+
+			# the other thread failed, so try it ourselves
+			return self._lookup_kanjireading(kanji, katakana)
+
+		try:
+			return self._lookup_kanjireading(kanji, katakana)
+		finally:
+			with self._cachelock:
+				pending = self._pendingreadings.pop(kanji)
+
+			pending.set()
+
+	def _lookup_kanjireading(self, kanji: str, katakana: str = None) -> list[CachedReading]:
+		"""
+		Looks up the readings for a kanji in all backends and adds them to the cache. See _get_kanjireading().
+		:param kanji: The kanji to find a reading for.
+		:param katakana: The katakana of the complete word the kanji is part of. Only needed when using mecab.
+		:return: A list of readings for 'kanji'.
+		"""
 		assert len(kanji) == 1, "Has to be a single kanji"
 
+		stats = self.stats
+		if stats is not None:
+			stats.add_count("cache_misses")
+
 		foundreadings = []
 
 		# check jamkit
 		if self.jam is not None:
-			data = self.jam.lookup(kanji, strict_lookup=True, lookup_ne=False)
+			# mecab and jamdict cannot be used by multiple threads at the same time
+			with self.backends.lock:
+				if stats is not None:
+					t = time.perf_counter()
+
+				data = self.jam.lookup(kanji, strict_lookup=True, lookup_ne=False)
+
+				if stats is not None:
+					stats.add_backend("jamdict", time.perf_counter() - t)
+
 			if len(data.chars) > 0:
 				assert len(data.chars) == 1
 				assert len(data.chars[0].rm_groups) == 1
@@ -136,25 +274,34 @@ class InstancePrv(InstanceData):
 		# check mecab
 		if self.mecab is not None:
 			assert katakana is not None, "When using mecab, we need the katakana to avoid using the reading of the complete word."
-			node = self.mecab.parseToNode(kanji + "一")  # this is a hack to get the Chinese reading
-			while node:
-				if len(node.surface) > 0:
-					sp = node.feature.split(",")
-					if len(sp) >= 7:
-						kana = sp[6]
+			with self.backends.lock:
+				if stats is not None:
+					t = time.perf_counter()
+
+				mecabreadings = []
+				node = self.mecab.parseToNode(kanji + "一")  # this is a hack to get the Chinese reading
+				while node:
+					if len(node.surface) > 0:
+						sp = node.feature.split(",")
+						if len(sp) >= 7:
+							mecabreadings.append(sp[6])
+
+						node = node.bnext
+					else:
+						node = node.next
 
-						# when the kana is the whole word, skip it
-						if len(kana) != len(katakana) and not InstancePrv._has_reading_kana(foundreadings, kana):
-							hira = self._kana2hira(kana)
+				if stats is not None:
+					stats.add_backend("mecab", time.perf_counter() - t)
 
-							foundreadings.append(CachedReading(kana, hira))
+			for kana in mecabreadings:
+				# when the kana is the whole word, skip it
+				if len(kana) != len(katakana) and not InstancePrv._has_reading_kana(foundreadings, kana):
+					hira = self._kana2hira(kana)
 
-					node = node.bnext
-				else:
-					node = node.next
+					foundreadings.append(CachedReading(kana, hira))
 
 		# check pykakasi
-		conv = self.kakasi.convert(kanji)
+		conv = self._kakasi_convert(kanji)
 		for c in conv:
 			kana = c["kana"]
 
@@ -165,16 +312,154 @@ class InstancePrv(InstanceData):
 
 		return self._addtocache(kanji, foundreadings)
 
-	def _find_reading(self, kanji: str, wordoriginal: str, wordkatakana: str, readings: list[str], problems: list[Problem], userdata) -> bool:
+	def _get_readingindex(self, foundreadings: list[CachedReading]) -> dict[str, list[tuple[str, str, int]]]:
+		"""
+		Gets the readings of a kanji together with their rendaku and sokuon variants, indexed by their first katakana, so only readings which can match are checked.
+		The index is created once for every list of readings and used by all views, which share the lists of the readings cache.
+		:param foundreadings: The readings of the kanji, see _get_kanjireading().
+		:return: Returns a dictionary where for every first katakana, there is a list of tuples (katakana, hiragana, variant), in the order of 'foundreadings', followed by the variants.
+			The variant is InstancePrv._READING, _RENDAKU or _SOKUON. Empty readings, which kakasi returns for unknown kanji, are stored with an empty key.
+		"""
+		indexes = self._readingindexes
+
+		# the entry keeps the list alive, so no other list can have the same identity
+		entry = indexes.get(id(foundreadings))
+		if entry is not None and entry[0] is foundreadings:
+			return entry[1]
+
+		index = {}
+		known = set()
+		for r in foundreadings:
+			if r.katakana not in known:
+				known.add(r.katakana)
+				index.setdefault(r.katakana[:1], []).append((r.katakana, r.hiragana, InstancePrv._READING))
+
+		# the variants only apply when no reading is written that way already
+		for r in foundreadings:
+			k = r.katakana
+			if len(k) < 1:
+				continue
+
+			variants = []
+			for voiced in InstanceData._rendaku.get(k[0], ""):
+				variants.append((voiced + k[1:], InstancePrv._RENDAKU))
+
+			if len(k) > 1 and k[-1] in InstanceData._sokuonendings:
+				variants.append((k[:-1] + "ッ", InstancePrv._SOKUON))
+
+			for v, variant in variants:
+				if v not in known:
+					known.add(v)
+					index.setdefault(v[0], []).append((v, self._kana2hira(v), variant))
+
+		# lists replaced in the readings cache or used by views which are gone are only removed here
+		if len(indexes) >= InstanceData._maxreadingindexes:
+			indexes.clear()
+
+		# the readings and the index are added together, so other threads never get an index for other readings
+		indexes[id(foundreadings)] = (foundreadings, index)
+
+		return index
+
+	@staticmethod
+	def _match_readings(indexes: list[dict[str, list[tuple[str, str, int]]]], katakana: str) -> list[str]:
+		"""
+		Matches the kanji one after another with the first reading the rest of the katakana starts with. Variants are not used.
+		When this works, it is the same alignment _align_readings() finds, only faster.
+		:param indexes: The output of _get_readingindex() for every kanji.
+		:param katakana: The katakana of all the kanji.
+		:return: Returns the hiragana for every kanji or None, when the readings do not match.
+		"""
+		hiragana = []
+		pos = 0
+		for index in indexes:
+			found = None
+
+			if pos < len(katakana):
+				for k, h, variant in index.get(katakana[pos], ()):
+					# the variants follow the readings
+					if variant != InstancePrv._READING:
+						break
+
+					if katakana.startswith(k, pos):
+						found = (k, h)
+						break
+
+			if found is None:
+				empty = index.get("")
+				if empty is None:
+					return None
+
+				found = empty[0][:2]
+
+			hiragana.append(found[1])
+			pos += len(found[0])
+
+		return hiragana if pos == len(katakana) else None
+
+	@staticmethod
+	def _align_readings(indexes: list[dict[str, list[tuple[str, str, int]]]], katakana: str, i: int, pos: int, memo: dict) -> tuple[int, list[str]]:
+		"""
+		Finds the readings of the kanji 'i' and all following ones, which together are exactly the rest of the katakana.
+		Every variant used costs one, so readings written like in the dictionary are preferred. From the alignments with the lowest cost, the one using the earliest readings is chosen.
+		:param indexes: The output of _get_readingindex() for every kanji.
+		:param katakana: The katakana of all the kanji.
+		:param i: The first kanji to align.
+		:param pos: The position in 'katakana' where the reading of kanji 'i' starts.
+		:param memo: The alignments found so far, for every (i, pos).
+		:return: Returns a tuple (cost, readings) or None, when there is no alignment.
+		"""
+		if i >= len(indexes):
+			return (0, []) if pos == len(katakana) else None
+
+		key = (i, pos)
+		if key in memo:
+			return memo[key]
+
+		index = indexes[i]
+		candidates = index.get(katakana[pos], ()) if pos < len(katakana) else ()
+
+		# empty readings are the shortest, so they are tried last
+		empty = index.get("")
+		if empty is not None:
+			candidates = list(candidates) + empty
+
+		best = None
+		last = len(indexes) - 1
+
+		for k, h, variant in candidates:
+			# rendaku only happens after and sokuon only in front of another kanji
+			if (variant == InstancePrv._RENDAKU and i == 0) or (variant == InstancePrv._SOKUON and i == last):
+				continue
+
+			if not katakana.startswith(k, pos):
+				continue
+
+			rest = InstancePrv._align_readings(indexes, katakana, i + 1, pos + len(k), memo)
+			if rest is None:
+				continue
+
+			cost = rest[0] + (0 if variant == InstancePrv._READING else 1)
+			if best is None or cost < best[0]:
+				best = (cost, [h] + rest[1])
+
+				if cost == 0:
+					break
+
+		memo[key] = best
+
+		return best
+
+	def _find_reading(self, kanji: str, wordoriginal: str, wordkatakana: str, readings: list[str], problems: list[Problem], userdata) -> int:
 		"""
 		Finds a reading for a kanji.
 		:param kanji: The kanji to find a reading for.
 		:param wordoriginal: The original text of the complete word.
 		:param wordkatakana: The katakana of the complete word the kanji is part of.
 		:param readings: The list of readings that have been found.
-		:param problems: The list of problems that occured.
+		:param problems: The list of problems that occured or None, when problems are not collected.
 		:param userdata: The user data added to found problems.
-		:return: Returns true when readings could be found.
+		:return: Returns the number of readings with rendaku or sokuon, e.g. 0 when every kanji has one of its readings, or -1 when no readings could be found.
 		"""
 		showproblem = True
 
@@ -184,43 +469,58 @@ class InstancePrv(InstanceData):
 
 		# check if this is a "saying"
 		if len(kanji) == 2 and kanji[1] == "々":
-			return False
+			return -1
 
 		# get all the readings for the kanji
-		katakanaleft = wordkatakana
-
+		allreadings = []
 		for k in kanji:
-			found = False
-
-			# check if we have an additional reading for this
 			foundreadings = self._get_kanjireading(k, wordkatakana)
 
 			# check if we found something
 			if len(foundreadings) < 1:
-				problems.append(Problem("Failed to find any reading for \"" + k + "\". Occurence: \"" + wordoriginal + "\".", k, userdata))
-				return False
+				if problems is not None:
+					problems.append(Problem(Problem.NO_READING, k, userdata, wordoriginal))
+				return -1
+
+			allreadings.append(foundreadings)
+
+		indexes = [self._get_readingindex(r) for r in allreadings]
+
+		# most words work with the first matching reading of every kanji, which is also the best alignment
+		hiragana = InstancePrv._match_readings(indexes, wordkatakana)
+		if hiragana is not None:
+			readings.extend(hiragana)
+			return 0
+
+		if self.stats is not None:
+			self.stats.add_count("alignment_searches")
+
+		# align all readings at once, so an early reading which does not work out can be replaced
+		alignment = InstancePrv._align_readings(indexes, wordkatakana, 0, 0, {})
+		if alignment is not None:
+			cost, hiragana = alignment
+
+			readings.extend(hiragana)
+			return cost
+
+		if problems is None:
+			return -1
+
+		# report where matching the readings in order fails, which is the same problem for the same word
+		katakanaleft = wordkatakana
 
-			# try to match the kanji with the reading
-			for r in foundreadings:
+		for i in range(len(kanji)):
+			for r in allreadings[i]:
 				if katakanaleft.startswith(r.katakana):
-					found = True
-					readings.append(r.hiragana)
 					katakanaleft = katakanaleft[len(r.katakana):]
 					break
-
-			# when one kanji fails we have to abort
-			if not found:
+			else:
 				if showproblem:
-					problems.append(Problem("Could not match kanji \"" + k + "\" to kana \"" + katakanaleft + "\". Occurence: \"" + wordoriginal + "\".", k, userdata))
-				return False
-
-		# check if all of the reading was "consumed"
-		if len(katakanaleft) > 0:
-			problems.append(Problem("Matched all kanji of \"" + kanji + "\" to \"" + wordkatakana + "\" but \"" + katakanaleft + "\" was left over. Occurence: \"" + wordoriginal + "\".", kanji, userdata))
-			return False
+					problems.append(Problem(Problem.NO_MATCH, kanji[i], userdata, wordoriginal, katakanaleft))
+				return -1
 
-		assert len(readings) > 0, "There should be readings here"
-		return True
+		problems.append(Problem(Problem.LEFTOVER, kanji, userdata, wordoriginal, katakanaleft, wordkatakana))
+		return -1
 
 	@staticmethod
 	def _split_kanji(kanji: str) -> list[tuple[str, bool]]:
@@ -229,30 +529,7 @@ class InstancePrv(InstanceData):
 		:param kanji: The text to split.
 		:return: Returns a list where 'text' was split into parts of (text, iskanji).
 		"""
-		result = []
-
-		start = 0
-		waskanji = is_kanji(kanji[0])
-
-		i = 1
-		while i < len(kanji):
-			k = kanji[i]
-			iskanji = is_kanji(k)
-
-			if waskanji != iskanji:
-				kk = kanji[start:i]
-				result.append((kk, waskanji))
-
-				start = i
-				waskanji = iskanji
-
-			i += 1
-
-		if start < len(kanji):
-			kk = kanji[start:]
-			result.append((kk, waskanji))
-
-		return result
+		return split_kanji(kanji)
 
 	@staticmethod
 	def _split_katakana(hiraganasplit: list[tuple[str, bool]], katakana: str) -> list[tuple[str, bool]]:
@@ -321,6 +598,15 @@ class InstancePrv(InstanceData):
 				text = katakana
 				pos = katakana.rfind(t, 0, endfind)
 
+			# handle the case that a long vowel written with 'ー' was converted to a vowel character, which keeps the length
+			if pos < 0 and "ー" in t:
+				text = hiragana
+				pos = rfind_longvowels(hiragana, kana2hira(t), endfind)
+
+				if pos < 0:
+					text = katakana
+					pos = rfind_longvowels(katakana, hira2kana(t), endfind)
+
 			assert pos >= 0, "Failed to find hiragana"
 
 			start = pos + len(t)
@@ -349,167 +635,446 @@ class InstancePrv(InstanceData):
 
 		return result
 
-	def _kana2hira(self, kana: str) -> str:
+	@staticmethod
+	def _kana2hira(kana: str) -> str:
 		"""
 		Converts katakana to hiragana.
 		:param kana: The katakana to convert.
 		:return: Returns the hiragana translation.
 		"""
-		conv = self.kakasi.convert(kana)
-
-		hira = ""
-		for c in conv:
-			hira += c["hira"]
-
-		assert len(kana) == len(hira), "Expected both to be the same length"
-
-		return hira
+		return kana2hira(kana)
 
-	def _hira2kana(self, hira: str) -> str:
+	@staticmethod
+	def _hira2kana(hira: str) -> str:
 		"""
 		Converts hiragana to katakana.
 		:param hira: The hiragana to convert.
 		:return: Returns the katakana translation.
 		"""
-		conv = self.kakasi.convert(hira)
-
-		kana = ""
-		for c in conv:
-			kana += c["kana"]
-
-		assert len(kana) == len(hira), "Expected both to be the same length"
-
-		return kana
+		return hira2kana(hira)
 
-	def _addtocache(self, kanji: str, cachedreadings: list[CachedReading]) -> list[CachedReading]:
+	def _addtocache(self, kanji: str, cachedreadings: list[CachedReading], cache: dict[str, list[CachedReading]] = None) -> list[CachedReading]:
 		"""
 		Adds a reading to the cache. The main use of this function is sorting the readings before adding them. This is very important!!
 		:param kanji: The kanji to add readings for.
 		:param cachedreadings: The list of readings.
+		:param cache: Optional, the dictionary to add the readings to. By default, this is the readings cache.
 		:return: Returns 'cachedreadings', but sorted by length.
 		"""
 		sort = sorted(cachedreadings, key=lambda x: len(x.katakana), reverse=True)
 
-		self.readingscache[kanji] = sort
+		if cache is None:
+			cache = self.readingscache
+
+		# other threads may copy the cache at the same time, see save_cache()
+		with self._cachelock:
+			cache[kanji] = sort
 
 		return sort
 
+	def _mergecache(self, readingscache: dict[str, list[CachedReading]]) -> None:
+		"""
+		Adds the readings of another cache, for all kanji which are not cached yet.
+		:param readingscache: The cache to add. The readings must already be sorted, see _addtocache().
+		:return:
+		"""
+		with self._cachelock:
+			for kanji in readingscache:
+				if kanji not in self.readingscache:
+					self.readingscache[kanji] = readingscache[kanji]
+
 	@staticmethod
-	def _fix_longvowels(original: str, katakana: str) -> str:
+	def _package_version(name: str) -> str:
 		"""
-		Replaces hiragana long vowels, written in katakana, with 'ー'.
-		:param original: The original text we check for 'ー'.
-		:param katakana: The katakana where 'ー' has been replaced with vowel characters.
-		:return: Returns 'katakana' but with long vowels written with 'ー'.
+		Gets the version of an installed package.
+		:param name: The name of the package.
+		:return: The version or an empty string, when the package is not installed.
 		"""
-		# when the original string uses a 'ー' character, it is lost during the conversion to katakana, so we restore it
-		pos = original.find("ー")
+		# importing this is slow, so only do it when needed
+		import importlib.metadata
 
-		while pos > 0:
-			# determine the vowel which is represented
-			vowel = original[pos - 1:pos]
-			vowel_ord = ord(vowel)
+		try:
+			return importlib.metadata.version(name)
+		except importlib.metadata.PackageNotFoundError:
+			return ""
 
-			if vowel_ord in InstancePrv._katakana_vowels:
-				vowel2 = InstancePrv._katakana_vowels[vowel_ord]
+	def _backend_versions(self) -> dict[str, str]:
+		"""
+		Gets the versions of all the backends used, as they decide which readings are found.
+		:return: A dictionary with the version for every package used.
+		"""
+		packages = ["pykakasi"]
+
+		if self.backends.usemecab:
+			packages += ["mecab-python3", "unidic"]
+
+		if self.backends.usejamdict:
+			packages += ["jamdict", "jamdict-data"]
+
+		return {p: InstancePrv._package_version(p) for p in packages}
 
-				# find the occurence and replace it
-				katakana = katakana.replace(vowel + vowel2, vowel + "ー")
+	def _cache_fingerprint(self) -> bytes:
+		"""
+		Creates a fingerprint for everything the readings cache depends on.
+		:return: Returns a sha256 digest.
+		"""
+		data = {
+			"backends": self._backend_versions(),
+			"kanjireadings": sorted(self._kanjireadings.items()),
+			"parent": self._parent._cache_fingerprint().hex() if self._parent is not None else None
+		}
 
-			pos = original.find("ー", pos + 1)
+		return hashlib.sha256(json.dumps(data, ensure_ascii=False).encode("utf8")).digest()
 
-		return katakana
+	def _config_fingerprint(self) -> bytes:
+		"""
+		Creates a fingerprint for everything the processed text depends on. It is created once and reset by all functions changing the configuration.
+		The segments stored in the result cache do not depend on the tags, so instances with different tags share their results.
+		:return: Returns a sha256 digest.
+		"""
+		# a view changes, when its parent changes
+		parentfingerprint = self._parent._config_fingerprint() if self._parent is not None else None
+
+		# the counters are a list, which can also be changed in place
+		counters = tuple(self.counters) if self.counters is not None else None
+
+		if self._fingerprint is None or parentfingerprint != self._parentfingerprint or counters != self._fingerprintcounters:
+			data = {
+				"readings": self._cache_fingerprint().hex(),
+				"parent": parentfingerprint.hex() if parentfingerprint is not None else None,
+				"wordreadings": sorted(self._wordreadings.items()),
+				"counters": list(counters) if counters is not None else None,
+				"segmenter": self.segmenter,
+				"protectedspans": list(self.protectedspans.items()),
+				"resultformat": 3
+			}
+
+			self._fingerprint = hashlib.sha256(json.dumps(data, ensure_ascii=False).encode("utf8")).digest()
+			self._parentfingerprint = parentfingerprint
+			self._fingerprintcounters = counters
+
+		return self._fingerprint
+
+	def _resultcache_key(self, text: str) -> bytes:
+		"""
+		Creates the key used to store a text in the result cache.
+		:param text: The text to process.
+		:return: Returns a sha256 digest.
+		"""
+		return hashlib.sha256(self._config_fingerprint() + text.encode("utf8")).digest()
 
 	@staticmethod
-	def _split_custreadtags(text: str, opentag: str, closetag: str) -> list[tuple[str, bool]]:
+	def _protected_pattern(rules: dict[str, str]) -> "re.Pattern":
 		"""
-		Splits a text based on the word readings that have been applied.
-		:param text: The text that has word readings in it.
-		:param opentag: The tag marking a word reading beginning.
-		:param closetag: The tag to marking a word reading end.
-		:return: Returns a list where 'text' was split into parts of (text, iswordreading).
+		Creates a regex finding every protected span, see Instance.add_protectedspans().
+		:param rules: The regex of every kind of span, by name. Earlier rules win when several match at the same position.
+		:return: The compiled regex or None, when there are no rules.
 		"""
-		result = []
+		if len(rules) < 1:
+			return None
 
-		start = 0
-		while True:
-			pos = text.find(opentag, start)
-			if pos < 0:
-				break
+		return re.compile("|".join("(?:" + r + ")" for r in rules.values()))
+
+	def _split_protected(self, text: str) -> list[tuple[str, list, int, list]]:
+		"""
+		Finds the spans which must be kept as they are, like URLs, in a single pass.
+		:param text: The text to search.
+		:return: Returns a list where 'text' was split into parts of (text, segments, offset, positions), see _split_text(). Every protected span is a part which is done.
+		"""
+		# the rules and their regex are replaced together, like the counters in _split_numbers()
+		compiled = self._protectedpattern
+		if compiled is None or compiled[0] is not self.protectedspans:
+			compiled = (self.protectedspans, InstancePrv._protected_pattern(self.protectedspans))
+			self._protectedpattern = compiled
 
-			pos2 = text.find(closetag, pos)
-			assert pos2 > pos, "Missing close tag"
+		if compiled[1] is None:
+			return [(text, None, 0, None)]
 
-			if start < pos:
-				# add the previous text
-				t = text[start:pos]
-				result.append((t, False))
+		result = []
+		start = 0
+		for m in compiled[1].finditer(text):
+			a, b = m.span()
+			if a == b:
+				continue
 
-			# add this text
-			t2 = text[pos + 1:pos2]
-			result.append((t2, True))
+			if start < a:
+				result.append((text[start:a], None, start, None))
 
-			start = pos2 + 1
+			span = m.group()
+			result.append((span, [(span, None, a)], a, None))
+			start = b
 
-		# add remaining text
-		if start < len(text):
-			t = text[start:]
-			result.append((t, False))
+		if start < len(text) or len(result) < 1:
+			result.append((text[start:], None, start, None))
 
 		return result
 
+	def _kakasi_convert(self, text: str) -> list[dict]:
+		"""
+		Calls kakasi.convert() and records how long it took, when collecting stats.
+		:param text: The text to convert.
+		:return: Returns the output of kakasi.convert().
+		"""
+		if self.stats is None:
+			return self.kakasi.convert(text)
+
+		t = time.perf_counter()
+		conv = self.kakasi.convert(text)
+		self.stats.add_backend("kakasi", time.perf_counter() - t)
+
+		return conv
+
 	@staticmethod
-	def _split_urls(textparts: list[tuple[str, bool]]) -> list[tuple[str, bool]]:
-		i = 0
-		while i < len(textparts):
-			t, iscust = textparts[i]
+	def _mecab_reading(feature: str) -> str:
+		"""
+		Gets the reading of a word from its MeCab features.
+		:param feature: The comma separated features of a MeCab node.
+		:return: Returns the reading in katakana or None, when the dictionary has no reading for the word.
+		"""
+		sp = feature.split(",")
+
+		# the layout of the features depends on the dictionary, which is known from their number
+		index = InstanceData._mecabkanafields.get(min(len(sp), InstanceData._mecabmaxfields))
+		if index is None:
+			return None
+
+		kana = sp[index]
+		if len(kana) < 1 or kana == "*":
+			return None
+
+		return kana
+
+	def _mecab_convert(self, text: str) -> list[dict]:
+		"""
+		Splits a text into words with a single call to MeCab and gets their readings, in the format of kakasi.convert().
+		Words MeCab has no reading for are converted by kakasi.
+		:param text: The text to convert, without new lines.
+		:return: Returns a list of dictionaries with "orig", "hira" and "kana", like kakasi.convert().
+		"""
+		stats = self.stats
+
+		# mecab and jamdict cannot be used by multiple threads at the same time
+		with self.backends.lock:
+			if stats is not None:
+				t = time.perf_counter()
+
+			words = []
+			node = self.mecab.parseToNode(text)
+			while node:
+				if len(node.surface) > 0:
+					words.append((node.surface, node.feature))
 
-			if iscust:
-				i += 1
+				node = node.next
+
+			if stats is not None:
+				stats.add_backend("mecab_sentence", time.perf_counter() - t)
+
+		result = []
+		pos = 0
+		for surface, feature in words:
+			# MeCab skips white space, which we have to keep
+			start = text.find(surface, pos)
+			if start < 0:
+				return self._kakasi_convert(text)
+
+			if start > pos:
+				gap = text[pos:start]
+				result.append({"orig": gap, "hira": gap, "kana": gap})
+
+			pos = start + len(surface)
+
+			if not has_kanji(surface):
+				result.append({"orig": surface, "hira": surface, "kana": surface})
 				continue
 
-			pos = t.find("://")
-			if pos < 0:
-				i += 1
+			kana = InstancePrv._mecab_reading(feature)
+			if kana is None:
+				if stats is not None:
+					stats.add_count("segmenter_fallbacks")
+
+				result.extend(self._kakasi_convert(surface))
 				continue
 
-			# find start
-			a = pos - 1
-			while a >= 0 and not t[a].isspace():
-				a -= 1
+			result.append({"orig": surface, "hira": self._kana2hira(kana), "kana": kana})
+
+		if pos < len(text):
+			rest = text[pos:]
+			result.append({"orig": rest, "hira": rest, "kana": rest})
+
+		return result
+
+	def _convert_lines(self, lines: list[str]) -> list[list[dict]]:
+		"""
+		Converts many lines with kakasi, joining them into a few calls to kakasi.
+		:param lines: The lines to convert, without new lines.
+		:return: Returns the output of kakasi.convert() for each line in 'lines'.
+		"""
+		assert self.kakasi is not None, "An kakasi instance is required."
 
-			# find end
-			b = pos + 3
-			while b < len(t) and not t[b].isspace():
-				b += 1
+		sep = InstancePrv._batchseparator
 
-			prefix = t[:a+1]
-			url = t[a+1:b]
-			postfix = t[b:]
+		convs = [None] * len(lines)
 
-			# adjust the textparts
-			textparts[i] = (prefix, False)
-			textparts.insert(i + 1, (url, True))
-			textparts.insert(i + 2, (postfix, False))
+		# lines containing the separator cannot be batched
+		# kakasi needs more time per character for longer texts, so only short lines are joined, up to a few hundred characters
+		batch = []
+		size = 0
+		for i in range(len(lines)):
+			line = lines[i]
+			if sep in line or len(line) >= InstancePrv._maxbatchchars:
+				continue
 
-			i += 2
+			if size + len(line) > InstancePrv._maxbatchchars:
+				self._convert_batch(lines, batch, convs)
+				batch = []
+				size = 0
 
-		return textparts
+			batch.append(i)
+			size += len(line) + 1
+
+		self._convert_batch(lines, batch, convs)
+
+		# convert anything which could not be batched individually
+		for i in range(len(lines)):
+			if convs[i] is None:
+				convs[i] = self._kakasi_convert(lines[i])
+
+		return convs
 
-	def _process_textpart(self, text: str, problems: list[Problem], userdata) -> tuple[bool, str]:
+	def _convert_batch(self, lines: list[str], batch: list[int], convs: list[list[dict]]) -> None:
+		"""
+		Converts some lines with a single call to kakasi.
+		:param lines: All lines, without new lines.
+		:param batch: The indexes of the lines to convert. None of them can contain the separator.
+		:param convs: The output of kakasi.convert() is stored here for every line which came out unchanged.
+		"""
+		sep = InstancePrv._batchseparator
+
+		if len(batch) > 1:
+			conv = self._kakasi_convert(sep.join(lines[i] for i in batch))
+
+			# split the words at the separator again
+			groups = [[]]
+			for c in conv:
+				orig = c["orig"]
+
+				if orig == sep:
+					groups.append([])
+				elif sep not in orig:
+					groups[-1].append(c)
+				else:
+					# kakasi merged the separator with a word, so split the word as well
+					sorig = orig.split(sep)
+					shira = c["hira"].split(sep)
+					skana = c["kana"].split(sep)
+					if len(shira) != len(sorig) or len(skana) != len(sorig):
+						groups = None
+						break
+
+					for i in range(len(sorig)):
+						if i > 0:
+							groups.append([])
+
+						if len(sorig[i]) > 0:
+							groups[-1].append({"orig": sorig[i], "hira": shira[i], "kana": skana[i]})
+
+			# only use the words of lines which came out unchanged
+			if groups is not None and len(groups) == len(batch):
+				for i in range(len(batch)):
+					line = lines[batch[i]]
+					group = groups[i]
+
+					if "".join(c["orig"] for c in group) == line:
+						convs[batch[i]] = group
+
+	def _convert_many(self, texts: list[str]) -> list[list[dict]]:
+		"""
+		Splits many texts into words with the segmenter, see Instance.set_segmenter(). kakasi converts all of them with a single call.
+		:param texts: The texts to convert.
+		:return: Returns the output of kakasi.convert() for each text in 'texts', or the same format when using MeCab.
+		"""
+		# kakasi repeats the previous word after a new line, so we handle new lines ourselves
+		# the layout of a text has the index of every converted line, -1 for a new line and lines without kanji as they are
+		lines = []
+		layouts = []
+		for text in texts:
+			layout = []
+			textlines = text.split("\n")
+			for j in range(len(textlines)):
+				line = textlines[j]
+
+				if j > 0:
+					layout.append(-1)
+
+				if len(line) < 1:
+					continue
+
+				# a line without kanji has nothing to read, so it does not need the segmenter
+				if not has_kanji(line):
+					layout.append(line)
+					continue
+
+				layout.append(len(lines))
+				lines.append(line)
+
+			layouts.append(layout)
+
+		# with MeCab, every line is parsed once, which is a sentence in most texts
+		if self.segmenter == "mecab":
+			convs = [self._mecab_convert(line) for line in lines]
+		else:
+			convs = self._convert_lines(lines)
+
+		# put the texts back together
+		result = []
+		for layout in layouts:
+			conv = []
+			for i in layout:
+				if isinstance(i, str):
+					conv.append({"orig": i, "hira": i, "kana": i})
+				elif i < 0:
+					conv.append(InstancePrv._newlineconv)
+				else:
+					conv.extend(convs[i])
+
+			result.append(conv)
+
+		return result
+
+	def _process_textpart(self, text: str, problems: list[Problem], userdata, conv: list[dict] = None, offset: int = 0) -> tuple[bool, list[tuple[str, str, int]]]:
 		"""
 		Adds furigana to a given text. The difference to _process_text() is that _process_text() applies custom word readings.
 		:param text: The text to add furigana to.
-		:param problems: The problems that have been found.
+		:param problems: The problems that have been found or None, when problems are not collected.
 		:param userdata: The user data added to every problem found.
-		:return: Returns a tuple (hasfurigana, text). When no furigana has been added, 'hasfurigana' is False.
+		:param conv: Optional, the output of kakasi.convert() for 'text', when it was already converted.
+		:param offset: The position of 'text' in the whole text, added to the start of every segment.
+		:return: Returns a tuple (hasfurigana, segments), see Instance.process_segments(). When no furigana has been added, 'hasfurigana' is False.
 		"""
+		# text without kanji is returned as it is, without calling any backend
+		if conv is None and not has_kanji(text):
+			return False, [(text, None, offset)] if len(text) > 0 else []
+
 		assert self.kakasi is not None, "An kakasi instance is required."
 
-		result = ""
+		stats = self.stats
+		if stats is not None:
+			tstart = time.perf_counter()
+
+		segments = []
 		hasfurigana = False
-		conv = self.kakasi.convert(text)
 
+		if conv is None:
+			conv = self._convert_many([text])[0]
+
+		memo = self._alignments()
+		maxentries = self.maxalignments
+		lock = self._cachelock
+
+		# text without a reading is merged into the previous segment, so plain text is a single segment
+		plain = ""
+		plainstart = offset
+		pos = offset
 		for c in conv:
 			orig = c["orig"]
 			hira = c["hira"]
@@ -517,156 +1082,553 @@ class InstancePrv(InstanceData):
 
 			assert len(hira) == len(kana), "Expected both to be the same length"
 
+			start = pos
+			pos += len(orig)
+
 			# handle new lines
 			if orig.endswith("\n"):
-				result += orig
+				if len(plain) < 1:
+					plainstart = start
+				plain += orig
 				continue
 
 			# handle the case of an untranslated kanji
 			if len(hira) < 1:
-				problems.append(Problem("Failed to translate '" + orig + "'.", orig, userdata))
+				if problems is not None:
+					problems.append(Problem(Problem.NOT_TRANSLATED, orig, userdata, orig))
 				continue
 
 			# ignore any conversion other than kanji
 			if not has_kanji(orig) or orig == hira:
-				result += orig
+				if len(plain) < 1:
+					plainstart = start
+				plain += orig
 				continue
 
 			hasfurigana = True
 
-			# find the kanji blocks
-			split_kanjis = InstancePrv._split_kanji(orig)
+			# the same word always gets the same readings, until the readings of a kanji change
+			key = (orig, hira, kana)
+			with lock:
+				entry = memo.get(key)
+				if entry is not None:
+					memo.move_to_end(key)
 
-			if len(split_kanjis) > 1:
-				kana = InstancePrv._fix_longvowels(orig, kana)
-
-				split_hira = InstancePrv._split_hiragana(split_kanjis, hira, kana)
-				split_kana = InstancePrv._split_katakana(split_hira, kana)
+			if entry is not None:
+				if stats is not None:
+					stats.add_count("alignment_hits")
 			else:
-				assert split_kanjis[0][1], "This must be a kanji element"
-				split_hira = [(hira, True)]
-				split_kana = [(kana, True)]
+				# the lock is not held, as finding the readings uses it as well
+				entry = self._align_word(orig, hira, kana)
+
+				if maxentries > 0:
+					with lock:
+						memo[key] = entry
+						while len(memo) > maxentries:
+							memo.popitem(last=False)
+
+			blocks, wordproblems, fallbacks, variants = entry
+
+			for kanji, reading, blockstart in blocks:
+				if reading is None:
+					if len(plain) < 1:
+						plainstart = start + blockstart
+					plain += kanji
+					continue
+
+				if len(plain) > 0:
+					segments.append((plain, None, plainstart))
+					plain = ""
+
+				segments.append((kanji, reading, start + blockstart))
+
+			if problems is not None:
+				for fields in wordproblems:
+					problems.append(Problem.fromtuple(fields, userdata))
+
+			if stats is not None:
+				# only a block of several kanji is a fallback, a single kanji gets the same furigana anyway
+				if fallbacks > 0:
+					stats.add_count("fallbacks", fallbacks)
+				if variants > 0:
+					stats.add_count("reading_variants", variants)
+
+		if len(plain) > 0:
+			segments.append((plain, None, plainstart))
+
+		if stats is not None:
+			stats.add_stage("textpart", time.perf_counter() - tstart)
+
+		return hasfurigana, segments
+
+	def _readings_version(self) -> int:
+		"""
+		Gets a number which changes whenever the readings of a kanji change for this instance, e.g. by add_kanjireadings() on it or any of its parents.
+		:return: Returns the sum of the versions of this instance and its parents, which only grow.
+		"""
+		version = self._readingsversion
+
+		parent = self._parent
+		while parent is not None:
+			version += parent._readingsversion
+			parent = parent._parent
+
+		return version
+
+	def _alignments(self) -> "collections.OrderedDict":
+		"""
+		Gets the words aligned by _align_word(), which are only valid for the current readings of the kanji, see _readings_version().
+		Views without kanji readings of their own find the same readings as their parent, so they use the words of their parent.
+		:return: Returns an OrderedDict with an entry for every word (orig, hira, kana), the least recently used first. Must only be changed while holding the readings lock.
+		"""
+		owner = self
+		while owner._parent is not None and len(owner._overlays[0]) < 1:
+			owner = owner._parent
+
+		version = owner._readings_version()
 
-			# for each kanji block, try to match the individual hiragana
-			s = ""
+		# replaced together, so other threads never see the words of other readings
+		memo = owner._alignmemo
+		if memo is None or memo[0] != version:
+			with self._cachelock:
+				memo = owner._alignmemo
+				if memo is None or memo[0] != version:
+					memo = (version, collections.OrderedDict())
+					owner._alignmemo = memo
+
+		return memo[1]
+
+	def _align_word(self, orig: str, hira: str, kana: str) -> tuple[list[tuple[str, str, int]], list[tuple], int, int]:
+		"""
+		Splits a word converted by kakasi into blocks of kanji and finds the reading of every kanji.
+		:param orig: The original text of the word.
+		:param hira: The reading of the word in hiragana.
+		:param kana: The reading of the word in katakana.
+		:return: Returns a tuple (blocks, problems, fallbacks, variants), which can be used again for the same word.
+			Every block is a tuple (text, reading, start), where reading is None for text without kanji and start is the position in the word.
+			The problems are tuples, see Problem.astuple(). 'fallbacks' and 'variants' are the counts for the stats, see Stats.
+		"""
+		stats = self.stats
+		if stats is not None:
+			t = time.perf_counter()
+
+		# find the kanji blocks
+		split_kanjis = InstancePrv._split_kanji(orig)
+
+		if len(split_kanjis) > 1:
+			split_hira = InstancePrv._split_hiragana(split_kanjis, hira, kana)
+			split_kana = InstancePrv._split_katakana(split_hira, kana)
+		else:
+			assert split_kanjis[0][1], "This must be a kanji element"
+			split_hira = [(hira, True)]
+			split_kana = [(kana, True)]
+
+		if stats is not None:
+			stats.add_stage("align", time.perf_counter() - t)
+
+		# the problems are always collected, as the result is used by callers collecting them
+		problems = []
+		blocks = []
+		fallbacks = 0
+		variants = 0
+
+		# for each kanji block, try to match the individual hiragana
+		start = 0
+		for i in range(len(split_kanjis)):
+			kanji = split_kanjis[i][0]
+			iskanji = split_kanjis[i][1]
+			hiragana = split_hira[i][0]
+			katakana = split_kana[i][0]
+
+			blockstart = start
+			start += len(kanji)
+
+			if not iskanji:
+				blocks.append((kanji, None, blockstart))
+				continue
+
+			cost = -1
 			readings = []
-			for i in range(len(split_kanjis)):
-				kanji = split_kanjis[i][0]
-				iskanji = split_kanjis[i][1]
-				hiragana = split_hira[i][0]
-				katakana = split_kana[i][0]
-
-				matchedkana = False
-
-				# check if matching needs to happen
-				if iskanji:
-					if len(katakana) > 1:
-						readings = []
-						matchedkana = self._find_reading(kanji, orig, katakana, readings, problems, userdata)
-
-					if matchedkana:
-						for k in range(len(kanji)):
-							s += kanji[k] + self.opentag + readings[k] + self.closetag
-					else:
-						s += kanji + self.opentag + hiragana + self.closetag
 
+			# check if matching needs to happen
+			if len(katakana) > 1:
+				if stats is not None:
+					t = time.perf_counter()
+
+				cost = self._find_reading(kanji, orig, katakana, readings, problems, None)
+
+				if stats is not None:
+					stats.add_stage("find_reading", time.perf_counter() - t)
+
+			if cost >= 0:
+				for k in range(len(kanji)):
+					blocks.append((kanji[k], readings[k], blockstart + k))
+
+				if cost > 0:
+					variants += 1
+			else:
+				blocks.append((kanji, hiragana, blockstart))
+
+				if len(kanji) > 1:
+					fallbacks += 1
+
+		return blocks, [p.astuple() for p in problems], fallbacks, variants
+
+	def _render(self, segments: list[tuple[str, str, int]]) -> str:
+		"""
+		Renders segments with the tags of this instance.
+		:param segments: The segments, see Instance.process_segments().
+		:return: The text with the readings between the tags.
+		"""
+		# because of our format, the text cannot contain the tags, but segments and other formats can
+		assert not any(self.opentag in s or self.closetag in s for s, r, _ in segments if r is None), "We have to use a different syntax"
+
+		return render_tags(segments, self.opentag, self.closetag)
+
+	def _split_numbers(self, text: str, offset: int = 0) -> list[tuple[str, list, int, list]]:
+		"""
+		Finds numbers with a counter, like 3本, and kanji numbers, like 三百, and creates the segments of their readings, so they do not need kakasi.
+		Small Arabic numbers with a counter which has no known reading are written with kanji instead, like 2文字 as 二文字, so kakasi can read them together with the text around them.
+		:param text: The text to search.
+		:param offset: The position of 'text' in the whole text.
+		:return: Returns a list where 'text' was split into parts of (text, segments, offset, positions), see _split_text().
+		"""
+		# compile the regex once, as the counters can be changed after the instance was created
+		# the counters and their regex are replaced together, so other threads never see a regex for other counters
+		# the counters are compared by value, as the list can be changed in place
+		counters = tuple(self.counters)
+		compiled = self._numberpattern
+		if compiled is None or compiled[0] != counters:
+			compiled = (counters, number_pattern(counters))
+			self._numberpattern = compiled
+
+		result = []
+
+		# the text for kakasi so far, as (text, offset, isconverted), see _plain_part()
+		plain = []
+
+		start = 0
+		for m in compiled[1].finditer(text):
+			arabic, counter, kanjinumber, kanjicounter = m.groups()
+
+			if arabic is not None:
+				n = int(arabic)
+
+				# this was done before the numbers got readings
+				if n == 0:
+					converted = "ゼロ"
+				elif n > maxnumber:
+					continue
 				else:
-					s += kanji
+					segments = reading_segments(n, counter)
+					converted = None
 
-			result += s
+					if segments is None:
+						# kakasi reads larger numbers written with kanji as words, like 五十六 as いそろく
+						if n > InstanceData._maxkanjinumber:
+							continue
 
-		return hasfurigana, result
+						converted = number_to_kanji(n)
 
-	@staticmethod
-	def _extractdigit(text: str, index: int) -> int:
-		i = index
-		while i >= 0:
-			chord = ord(text[i])
-			isdigit = 48 <= chord <= 57
-			if not isdigit:
-				break
+				plain.append((text[start:m.start()], offset + start, False))
+
+				if converted is not None:
+					# kakasi reads the number together with the counter and the text around it, like 二文字 as ふたもじ
+					plain.append((converted, offset + m.start(), True))
+					plain.append((counter, offset + m.start(2), False))
+					start = m.end()
+					continue
+
+				InstancePrv._append_plain(result, plain)
+
+				# the Arabic digits are kept as they are and get the reading of the whole number
+				last = len(segments) - 1
+				if segments[last][0] == counter:
+					done = [(arabic, "".join(r for s, r in segments[:last]), offset + m.start()), (counter, segments[last][1], offset + m.start(2))]
+				else:
+					# the counter is read together with the number, like 20日 as はつか
+					done = [(m.group(), "".join(r for s, r in segments), offset + m.start())]
+
+				result.append((m.group(), done, offset + m.start(), None))
+				start = m.end()
+				continue
+
+			n = kanji_to_number(kanjinumber)
+			if n is None:
+				continue
+
+			segments = reading_segments(n, kanjicounter)
 
-			i -= 1
+			# let kakasi read it as a word
+			if segments is None:
+				continue
 
-		return index - i
+			plain.append((text[start:m.start()], offset + start, False))
+			InstancePrv._append_plain(result, plain)
 
-	def _handle_counters(self, text: str) -> str:
-		# cache ords for performance
-		if self._counterords is None:
-			self._counterords = [ord(c) for c in self.counters]
+			# kanji numbers are written the same way, so the segments follow the text
+			pos = offset + m.start()
+			done = []
+			for s, r in segments:
+				done.append((s, r, pos))
+				pos += len(s)
 
-		# search for counters
-		s = text
-		i = 1  # skip first
-		while i < len(s):
-			# check for counter
-			ch = ord(s[i])
-			if ch in self._counterords:
-				# get digit length
-				dlen = InstancePrv._extractdigit(s, i - 1)
-				if dlen > 0:
-					digit = s[i-dlen:i]
+			result.append((m.group(), done, offset + m.start(), None))
+			start = m.end()
 
-					try:
-						num = int(digit)
+		plain.append((text[start:], offset + start, False))
+		InstancePrv._append_plain(result, plain)
+
+		return result
 
-						if num < len(self.counternumbers):
-							newdigit = self.counternumbers[num]
+	@staticmethod
+	def _append_plain(result: list[tuple[str, list, int, list]], plain: list[tuple[str, int, bool]]) -> None:
+		"""
+		Joins the text for kakasi into a part, when there is any, and starts over.
+		:param result: The parts, see _split_text(), where the part is appended.
+		:param plain: The pieces of the text as (text, offset, isconverted). A converted piece was written differently in the input, like a number written with kanji. Is cleared.
+		:return:
+		"""
+		t = "".join(p[0] for p in plain)
 
-							s = s[:i-dlen] + newdigit + s[i:]
-					except:
-						pass
+		if len(t) > 0:
+			positions = None
+			if any(p[2] for p in plain):
+				# every character of a converted piece is at the start of the piece in the input
+				positions = []
+				for s, pos, isconverted in plain:
+					positions.extend([pos] * len(s) if isconverted else range(pos, pos + len(s)))
 
-			i += 1
+			result.append((t, None, plain[0][1], positions))
 
-		return s
+		plain.clear()
 
-	def _process_text(self, text: str, problems: list[Problem], userdata) -> tuple[bool, str]:
+	def _split_text(self, text: str) -> list[tuple[str, list, int, list]]:
 		"""
-		Adds furigana to a given text. The difference to _process_textpart() is that _process_textpart() does not apply custom word readings.
+		Applies everything to a text which does not need kakasi, like custom word readings.
 		:param text: The text to add furigana to.
-		:param problems: The problems that have been found.
-		:param userdata: The user data added to every problem found.
-		:return: Returns a tuple (hasfurigana, text). When no furigana has been added, 'hasfurigana' is False.
+		:return: Returns a list where 'text' was split into parts of (text, segments, offset, positions). Parts with segments are done and must not be processed any further.
+			The offset is the position of the part in 'text'. When a number was written with kanji, the text of the part differs from 'text' and the positions are the position in 'text' of every character of the part, otherwise they are None.
 		"""
-		# because of our format, the text cannot contain brackets
-		assert self.opentag not in text and self.closetag not in text, "We have to use a different syntax"
-		assert self.customreadings_opentag not in text and self.customreadings_closetag not in text, "We have to use a different tag for custom readings"
+		stats = self.stats
+		if stats is not None:
+			t0 = time.perf_counter()
 
-		# handle arabic number with Japanese counter
+		# find the spans which are kept as they are, so nothing else has to look at them
+		protectedparts = self._split_protected(text)
+
+		if stats is not None:
+			t1 = time.perf_counter()
+
+		# find custom readings, which only need the offset of the word
+		textparts = []
+		for part in protectedparts:
+			if part[1] is not None:
+				textparts.append(part)
+				continue
+
+			pos = part[2]
+			for t, r in self._wordmatcher.split(part[0]):
+				if r is None:
+					textparts.append((t, None, pos, None))
+				else:
+					textparts.append((t, [(s, reading, pos + o) for s, reading, o in r], pos, None))
+
+				pos += len(t)
+
+		if stats is not None:
+			t2 = time.perf_counter()
+
+		# handle numbers, with or without a Japanese counter
 		if self.counters is not None and len(self.counters) > 0:
-			text = self._handle_counters(text)
+			numberparts = []
+			for part in textparts:
+				if part[1] is not None:
+					numberparts.append(part)
+				else:
+					numberparts.extend(self._split_numbers(part[0], part[2]))
 
-		# try to find custom readings
-		hasfurigana = False
-		text2 = text
-		for kanji in self.customreadings:
-			reading = self.customreadings[kanji]
+			textparts = numberparts
 
-			t = text2.replace(kanji, reading)
+		if stats is not None:
+			t3 = time.perf_counter()
 
-			if len(t) != len(text2):
-				hasfurigana = True
+			stats.add_stage("protectedspans", t1 - t0)
+			stats.add_stage("wordreadings", t2 - t1)
+			stats.add_stage("counters", t3 - t2)
 
-			text2 = t
+		return textparts
 
-		textparts = InstancePrv._split_custreadtags(text2, self.customreadings_opentag, self.customreadings_closetag)
+	def _process_textparts(self, textparts: list[tuple[str, list, int, list]], problems: list[Problem], userdata, convs: list[list[dict]] = None) -> tuple[bool, list[tuple[str, str, int]]]:
+		"""
+		Adds furigana to the output of _split_text().
+		:param textparts: The output of _split_text().
+		:param problems: The problems that have been found or None, when problems are not collected.
+		:param userdata: The user data added to every problem found.
+		:param convs: Optional, the output of kakasi.convert() for every text part, when they were already converted.
+		:return: Returns a tuple (hasfurigana, segments), see Instance.process_segments(). When no furigana has been added, 'hasfurigana' is False.
+		"""
+		hasfurigana = False
+		segments = []
+		for i in range(len(textparts)):
+			t, done, offset, positions = textparts[i]
 
-		textparts = InstancePrv._split_urls(textparts)
+			if done is not None:
+				segments.extend(done)
 
-		textparts2 = []
-		for t, iscust in textparts:
-			if iscust:
-				textparts2.append(t)
-				hasfurigana = True
+				# protected spans are done, but have no furigana
+				if not hasfurigana:
+					hasfurigana = any(r is not None for _, r, _ in done)
 			else:
-				hasfuri, result = self._process_textpart(t, problems, userdata)
+				conv = convs[i] if convs is not None else None
 
-				textparts2.append(result)
+				if positions is None:
+					hasfuri, result = self._process_textpart(t, problems, userdata, conv, offset)
+				else:
+					# a number written with kanji, every segment starts where its first character was in the input
+					hasfuri, result = self._process_textpart(t, problems, userdata, conv, 0)
+					result = [(s, r, positions[start]) for s, r, start in result]
+
+				segments.extend(result)
 
 				if hasfuri:
 					hasfurigana = True
 
-		tfinal = "".join(textparts2)
+		return hasfurigana, segments
+
+	def _process_text(self, text: str, problems: list[Problem], userdata) -> tuple[bool, list[tuple[str, str, int]]]:
+		"""
+		Adds furigana to a given text. The difference to _process_textpart() is that _process_textpart() does not apply custom word readings.
+		:param text: The text to add furigana to.
+		:param problems: The problems that have been found or None, when problems are not collected.
+		:param userdata: The user data added to every problem found.
+		:return: Returns a tuple (hasfurigana, segments), see Instance.process_segments(). When no furigana has been added, 'hasfurigana' is False.
+		"""
+		textparts = self._split_text(text)
+
+		return self._process_textparts(textparts, problems, userdata)
+
+	def _process_text_cached(self, text: str, problems: list[Problem], userdata) -> tuple[bool, list[tuple[str, str, int]]]:
+		"""
+		Like _process_text() but uses the result cache, when there is one.
+		:param text: The text to add furigana to.
+		:param problems: The problems that have been found or None, when problems are not collected.
+		:param userdata: The user data added to every problem found.
+		:return: Returns a tuple (hasfurigana, segments), see Instance.process_segments(). When no furigana has been added, 'hasfurigana' is False.
+		"""
+		if self.resultcache is None:
+			return self._process_text(text, problems, userdata)
+
+		key = self._resultcache_key(text)
 
-		return hasfurigana, tfinal
+		cached = self.resultcache.get(key)
+		if cached is not None:
+			hasfurigana, segments, cachedproblems = cached
+			if problems is not None:
+				for fields in cachedproblems:
+					problems.append(Problem.fromtuple(fields, userdata))
+
+			return hasfurigana, segments
+
+		# the problems are always collected, as the cache is shared with callers collecting them
+		textproblems = []
+		hasfurigana, segments = self._process_text(text, textproblems, userdata)
+
+		self.resultcache.put(key, hasfurigana, segments, [p.astuple() for p in textproblems])
+
+		if problems is not None:
+			problems.extend(textproblems)
+
+		return hasfurigana, segments
+
+	def _process_many(self, texts: list[str], userdata: list, collectproblems: bool = True) -> list[tuple[bool, list[tuple[str, str, int]], list[Problem]]]:
+		"""
+		Adds furigana to many texts. Identical texts are only processed once and all texts are converted by kakasi in one batch.
+		:param texts: The texts to add furigana to.
+		:param userdata: The user data for every text or None.
+		:param collectproblems: When False, no problems are collected and every text gets an empty list of problems.
+		:return: Returns a list of tuples (hasfurigana, segments, problems) for every text in 'texts'. Identical texts share the same list of segments.
+		"""
+		assert userdata is None or len(userdata) == len(texts), "Expected userdata for every text"
+
+		# find the unique texts
+		uniqueindex = {}
+		unique = []
+		for i in range(len(texts)):
+			t = texts[i]
+			if t not in uniqueindex:
+				uniqueindex[t] = len(unique)
+				unique.append(i)
+
+		# use the results which are already cached
+		uniqueresults = [None] * len(unique)
+		keys = None
+		if self.resultcache is not None:
+			keys = [self._resultcache_key(texts[i]) for i in unique]
+
+			for u in range(len(unique)):
+				cached = self.resultcache.get(keys[u])
+				if cached is not None:
+					hasfurigana, segments, cachedproblems = cached
+					ud = userdata[unique[u]] if userdata is not None else None
+
+					uniqueresults[u] = (hasfurigana, segments, [Problem.fromtuple(fields, ud) for fields in cachedproblems] if collectproblems else [])
+
+		todo = [u for u in range(len(unique)) if uniqueresults[u] is None]
+
+		# split all texts and convert all text parts in one go
+		splits = [self._split_text(texts[unique[u]]) for u in todo]
+
+		convtexts = []
+		for textparts in splits:
+			for t, done, _, _ in textparts:
+				if done is None:
+					convtexts.append(t)
+
+		convs = self._convert_many(convtexts)
+
+		# process the unique texts
+		c = 0
+		for j in range(len(todo)):
+			u = todo[j]
+			textparts = splits[j]
+			textconvs = []
+			for t, done, _, _ in textparts:
+				if done is not None:
+					textconvs.append(None)
+				else:
+					textconvs.append(convs[c])
+					c += 1
+
+			# the result cache always needs the problems
+			problems = [] if collectproblems or keys is not None else None
+			hasfurigana, segments = self._process_textparts(textparts, problems, userdata[unique[u]] if userdata is not None else None, textconvs)
+
+			if keys is not None:
+				self.resultcache.put(keys[u], hasfurigana, segments, [p.astuple() for p in problems])
+
+			uniqueresults[u] = (hasfurigana, segments, problems if collectproblems else [])
+
+		# create the result for every text, which only needs new problems for duplicates
+		results = []
+		for i in range(len(texts)):
+			u = uniqueindex[texts[i]]
+			hasfurigana, segments, problems = uniqueresults[u]
+
+			if unique[u] != i and len(problems) > 0:
+				ud = userdata[i] if userdata is not None else None
+				problems = [Problem.fromtuple(p.astuple(), ud) for p in problems]
+
+			results.append((hasfurigana, segments, problems))
+
+		return results
+
+	def _process_many_text(self, texts: list[str], userdata: list, collectproblems: bool = True) -> list[tuple[bool, str, list[Problem]]]:
+		"""
+		Like _process_many(), but renders the segments with the tags of this instance.
+		:param texts: The texts to add furigana to.
+		:param userdata: The user data for every text or None.
+		:param collectproblems: When False, no problems are collected and every text gets an empty list of problems.
+		:return: Returns a list of tuples (hasfurigana, text, problems) for every text in 'texts'.
+		"""
+		return [(hasfurigana, self._render(segments), problems) for hasfurigana, segments, problems in self._process_many(texts, userdata, collectproblems)]
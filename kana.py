@@ -0,0 +1,125 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+def _kana_tables_init() -> tuple[dict[int, int], dict[int, int]]:
+	"""
+	Helper function which generates the tables for str.translate() to convert between hiragana and katakana.
+	Covers all kana from 'ぁ' to 'ゖ', including small kana and 'ゔ'. Other characters, like 'ー', are kept.
+	:return: Returns a tuple (hira2kana, kana2hira).
+	"""
+	hira2kana = {}
+	kana2hira = {}
+
+	for h in range(ord("ぁ"), ord("ゖ") + 1):
+		k = h + ord("ァ") - ord("ぁ")
+
+		hira2kana[h] = k
+		kana2hira[k] = h
+
+	return hira2kana, kana2hira
+
+
+def _vowels_init() -> dict[int, str]:
+	"""
+	Helper function which generates a dictionary where for ord(kana), we get the katakana vowel. So ord(キ) and ord(き) provide 'イ'.
+	:return: the generated dictionary.
+	"""
+	result = {}
+
+	vowels = {
+		"ア": ("ア", "カ", "サ", "タ", "ナ", "ハ", "マ", "ヤ", "ラ", "ワ", "ガ", "ザ", "ダ", "バ", "パ", "ャ"),
+		"イ": ("イ", "キ", "シ", "チ", "ニ", "ヒ", "ミ", "リ", "ヰ", "ギ", "ジ", "ヂ", "ビ", "ピ"),
+		"ウ": ("ウ", "ク", "ス", "ツ", "ヌ", "フ", "ム", "ユ", "ル", "グ", "ズ", "ヅ", "ブ", "プ", "ュ", "ヴ"),
+		"エ": ("エ", "ケ", "セ", "テ", "ネ", "ヘ", "メ", "レ", "ヱ", "ゲ", "ゼ", "デ", "ベ", "ペ"),
+		"オ": ("オ", "コ", "ソ", "ト", "ノ", "ホ", "モ", "ヨ", "ロ", "ヲ", "ゴ", "ゾ", "ド", "ボ", "ポ", "ョ")
+	}
+
+	for v in vowels:
+		for k in vowels[v]:
+			result[ord(k)] = v
+			result[ord(k) - ord("ァ") + ord("ぁ")] = v
+
+	return result
+
+
+""" The tables for str.translate() to convert between hiragana and katakana. """
+_hira2kana, _kana2hira = _kana_tables_init()
+
+""" A dictionary where for ord(kana), we get the katakana vowel. So ord(キ) provides 'イ'. """
+_vowels = _vowels_init()
+
+
+def hira2kana(hira: str) -> str:
+	"""
+	Converts hiragana to katakana. Any other character is kept.
+	:param hira: The hiragana to convert.
+	:return: Returns the katakana translation, which has the same length as 'hira'.
+	"""
+	return hira.translate(_hira2kana)
+
+
+def kana2hira(kana: str) -> str:
+	"""
+	Converts katakana to hiragana. Any other character is kept.
+	:param kana: The katakana to convert.
+	:return: Returns the hiragana translation, which has the same length as 'kana'.
+	"""
+	return kana.translate(_kana2hira)
+
+
+def expand_longvowels(kana: str) -> str:
+	"""
+	Writes every long vowel written with 'ー' with the vowel character instead, in the same script as the kana in front of it. So 'らーめん' becomes 'らあめん' and 'ラーメン' becomes 'ラアメン'.
+	A reading can use either form, so a text is searched in a reading with both. Every 'ー' is replaced by exactly one character.
+	:param kana: The hiragana or katakana to convert.
+	:return: Returns 'kana' with the vowel characters, which has the same length as 'kana'.
+	"""
+	if "ー" not in kana:
+		return kana
+
+	result = list(kana)
+	for i in range(1, len(result)):
+		if result[i] != "ー":
+			continue
+
+		# a 'ー' after a 'ー' repeats the vowel, which was already replaced
+		vowel = _vowels.get(ord(result[i - 1]))
+		if vowel is not None:
+			result[i] = vowel if result[i - 1] >= "ァ" else vowel.translate(_kana2hira)
+
+	return "".join(result)
+
+
+def rfind_longvowels(reading: str, text: str, end: int) -> int:
+	"""
+	Finds the last occurrence of a text with long vowels written with 'ー' in a reading which writes them with vowel characters, see expand_longvowels().
+	A 'ー' at the start of 'text' repeats the vowel of the character in front of the occurrence, e.g. of the reading of a kanji.
+	:param reading: The reading to search, in the same script as 'text'.
+	:param text: The text to find.
+	:param end: The occurrence must end before this position.
+	:return: Returns the position of the occurrence or -1, when there is none. The occurrence has the same length as 'text'.
+	"""
+	if not text.startswith("ー"):
+		return reading.rfind(expand_longvowels(text), 0, end)
+
+	for pos in range(end - len(text), 0, -1):
+		if expand_longvowels(reading[pos - 1] + text)[1:] == reading[pos:pos + len(text)]:
+			return pos
+
+	return -1
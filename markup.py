@@ -0,0 +1,202 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import re
+from typing import Sequence
+
+
+""" Matches markup: a comment, a CDATA section, a declaration or processing instruction, or a start or end tag with the name of the element in group 1. """
+_markuppattern = re.compile(r"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<[!?][^>]*>|</?([A-Za-z][^\s/>]*)(?:\"[^\"]*\"|'[^']*'|[^'\">])*>", re.S)
+
+""" The elements which contain raw text, which ends at the first end tag. It is never annotated, as it is not parsed for markup. """
+_rawtextelements = ("script", "style", "title", "textarea")
+
+""" The elements which are not annotated by default, in addition to the raw text elements. """
+_defaultskiptags = ("ruby",)
+
+""" The longest markup kept back while waiting for its end. Longer markup is treated as text, so a stray '<' does not buffer the whole input. """
+_maxmarkup = 1 << 16
+
+""" The longest text node kept back while waiting for the next markup. Longer text nodes are split after a new line or a 。. """
+_maxtext = 1 << 16
+
+
+class MarkupTokenizer:
+	"""
+	Splits HTML or XML, given in chunks of any size, into markup and text nodes without building a DOM, so inputs of any size can be annotated.
+	The input is not changed, every character is part of exactly one token, so joining all tokens gives the input again.
+	"""
+	def __init__(self, skiptags: Sequence[str] = None):
+		"""
+		Creates a tokenizer.
+		:param skiptags: The elements whose content is not annotated. By default, only ruby. The content of script, style, title and textarea is never annotated.
+		"""
+		self.skiptags = frozenset(t.lower() for t in (_defaultskiptags if skiptags is None else skiptags))
+
+		self._buffer = ""
+		self._offset = 0
+
+		# where to continue searching for markup in the buffer
+		self._scan = 0
+
+		# the element being skipped and how often it is nested, or the end of a raw text element
+		self._skipname: str = None
+		self._skipdepth = 0
+		self._rawend: "re.Pattern" = None
+
+	def feed(self, chunk: str) -> list[tuple[str, bool, int]]:
+		"""
+		Adds the next part of the input.
+		:param chunk: The text, which can end anywhere, even inside of markup.
+		:return: Returns the tokens which are complete, as tuples (text, istext, offset). 'istext' is True for a text node to annotate and offset is the position in the input.
+		"""
+		self._buffer += chunk
+
+		return self._tokenize(False)
+
+	def close(self) -> list[tuple[str, bool, int]]:
+		"""
+		Ends the input.
+		:return: Returns the remaining tokens, see feed(). Incomplete markup at the end is returned as text.
+		"""
+		return self._tokenize(True)
+
+	def _could_be_markup(self, buf: str, lt: int) -> bool:
+		"""
+		Checks if a '<' which starts no markup yet can start markup when more input arrives.
+		"""
+		if len(buf) - lt >= _maxmarkup:
+			return False
+
+		if lt + 1 >= len(buf):
+			return True
+
+		c = buf[lt + 1]
+
+		return c == "/" or c == "!" or c == "?" or ("A" <= c <= "Z") or ("a" <= c <= "z")
+
+	def _tokenize(self, final: bool) -> list[tuple[str, bool, int]]:
+		"""
+		Splits the buffer into tokens and keeps the incomplete rest.
+		:param final: True when there is no more input.
+		:return: Returns the tokens, see feed().
+		"""
+		buf = self._buffer
+		offset = self._offset
+		tokens = []
+
+		# the start of the next token
+		pos = 0
+		while pos < len(buf):
+			# raw text is passed on as it is until its end tag
+			if self._rawend is not None:
+				m = self._rawend.search(buf, pos)
+				if m is None:
+					end = len(buf)
+					if not final:
+						# the end tag can begin at the last '<'
+						lt = buf.rfind("<", pos)
+						if lt >= 0 and len(buf) - lt < _maxmarkup:
+							end = lt
+
+					if end > pos:
+						tokens.append((buf[pos:end], False, offset + pos))
+					pos = end
+					break
+
+				if m.start() > pos:
+					tokens.append((buf[pos:m.start()], False, offset + pos))
+
+				tokens.append((m.group(), False, offset + m.start()))
+				pos = m.end()
+				self._scan = pos
+				self._rawend = None
+				continue
+
+			lt = buf.find("<", max(self._scan, pos))
+			if lt < 0:
+				end = len(buf)
+				if not final:
+					if end - pos <= _maxtext:
+						self._scan = end
+						break
+
+					# split a long text node, preferably where a line or sentence ends
+					cut = max(buf.rfind("\n", pos), buf.rfind("。", pos))
+					if cut >= pos:
+						end = cut + 1
+
+				tokens.append((buf[pos:end], self._skipname is None, offset + pos))
+				pos = end
+				continue
+
+			# comments and CDATA sections must not end at the first '>'
+			if not final and ((buf.startswith("<!--", lt) and buf.find("-->", lt + 4) < 0) or (buf.startswith("<![CDATA[", lt) and buf.find("]]>", lt + 9) < 0)):
+				if len(buf) - lt < _maxmarkup:
+					self._scan = lt
+					break
+
+			m = _markuppattern.match(buf, lt)
+			if m is None:
+				if not final and self._could_be_markup(buf, lt):
+					self._scan = lt
+					break
+
+				# a '<' which is just text
+				self._scan = lt + 1
+				continue
+
+			if lt > pos:
+				tokens.append((buf[pos:lt], self._skipname is None, offset + pos))
+
+			markup = m.group()
+			tokens.append((markup, False, offset + lt))
+			pos = m.end()
+			self._scan = pos
+
+			name = m.group(1)
+			if name is not None and not markup.endswith("/>"):
+				self._enter_or_leave(name.lower(), markup[1] == "/")
+
+		self._buffer = buf[pos:]
+		self._offset = offset + pos
+		self._scan = max(self._scan - pos, 0)
+
+		return tokens
+
+	def _enter_or_leave(self, name: str, isend: bool) -> None:
+		"""
+		Tracks the elements whose content is skipped.
+		:param name: The name of the element in lower case.
+		:param isend: True for an end tag.
+		"""
+		# raw text can never contain markup, even when it is skipped anyway
+		if not isend and name in _rawtextelements:
+			self._rawend = re.compile("</" + re.escape(name) + r"\s*>", re.I)
+			return
+
+		if self._skipname is not None:
+			if name == self._skipname:
+				self._skipdepth += -1 if isend else 1
+				if self._skipdepth < 1:
+					self._skipname = None
+			return
+
+		if not isend and name in self.skiptags:
+			self._skipname = name
+			self._skipdepth = 1
@@ -0,0 +1,299 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import re
+
+from .utils import _kanjichars
+
+
+""" The kanji of the digits 1 to 9. """
+_digits = ("", "一", "二", "三", "四", "五", "六", "七", "八", "九")
+
+""" The readings of the digits 1 to 9. """
+_digitreadings = ("", "いち", "に", "さん", "よん", "ご", "ろく", "なな", "はち", "きゅう")
+
+""" The value of every digit kanji. """
+_digitvalues = {_digits[i]: i for i in range(1, 10)}
+
+""" The units inside of a group of four digits, as (kanji, value, reading). """
+_smallunits = (("千", 1000, "せん"), ("百", 100, "ひゃく"), ("十", 10, "じゅう"))
+
+""" The units of the groups of four digits, as (kanji, value, reading). """
+_largeunits = (("兆", 10 ** 12, "ちょう"), ("億", 10 ** 8, "おく"), ("万", 10 ** 4, "まん"))
+
+""" The value of every unit kanji. """
+_unitvalues = {k: v for k, v, r in _smallunits + _largeunits}
+
+""" The largest number which can be written with the units above. """
+maxnumber = 10 ** 16 - 1
+
+""" Readings which change when a unit follows a digit, as {(digit, unit): (digit reading, unit reading)}. """
+_unitchanges = {
+	("三", "百"): ("さん", "びゃく"), ("六", "百"): ("ろっ", "ぴゃく"), ("八", "百"): ("はっ", "ぴゃく"),
+	("三", "千"): ("さん", "ぜん"), ("八", "千"): ("はっ", "せん"),
+	("一", "兆"): ("いっ", "ちょう"), ("八", "兆"): ("はっ", "ちょう"), ("十", "兆"): ("じゅっ", "ちょう")
+}
+
+""" Used as the number reading of a change, when the last kana of the number becomes a small 'っ'. """
+_SOKUON = "っ"
+
+""" Changes the first kana of a counter, when it follows a small 'っ' or 'ん'. """
+_handakuten = {"は": "ぱ", "ひ": "ぴ", "ふ": "ぷ", "へ": "ぺ", "ほ": "ぽ"}
+_dakuten = {"は": "ば", "ひ": "び", "ふ": "ぶ", "へ": "べ", "ほ": "ぼ"}
+
+
+def _counters_init() -> dict[str, tuple]:
+	"""
+	Helper function which generates the readings of the counters.
+	Each counter has a reading and the changes of the readings depending on how the number ends, which is either the last digit or the last unit.
+	:return: A dictionary where for every counter, we get a tuple (reading, changes, exact). changes is {digit or unit: (number reading, counter reading)}, where None keeps a reading.
+		exact is {number: segments} for numbers with an irregular reading, where the segments None mean that the number cannot be read without context.
+	"""
+	def h(reading: str, extra: dict = None) -> dict:
+		# counters starting with a h-sound, like 本 in いっぽん, さんぼん
+		p = _handakuten[reading[0]] + reading[1:]
+		b = _dakuten[reading[0]] + reading[1:]
+		changes = {1: (_SOKUON, p), 6: (_SOKUON, p), 8: (_SOKUON, p), "十": (_SOKUON, p), "百": (_SOKUON, p), 3: (None, b), "千": (None, b), "万": (None, b)}
+		changes.update(extra or {})
+		return changes
+
+	def k(extra: dict = None) -> dict:
+		# counters starting with a k-sound, like 個 in いっこ, ろっこ
+		changes = {1: (_SOKUON, None), 6: (_SOKUON, None), 8: (_SOKUON, None), "十": (_SOKUON, None), "百": (_SOKUON, None)}
+		changes.update(extra or {})
+		return changes
+
+	def st(extra: dict = None) -> dict:
+		# counters starting with a s-sound or t-sound, like 冊 in いっさつ, はっさつ
+		changes = {1: (_SOKUON, None), 8: (_SOKUON, None), "十": (_SOKUON, None)}
+		changes.update(extra or {})
+		return changes
+
+	yo = {4: ("よ", None)}
+
+	result = {
+		"個": ("こ", k(), None), "回": ("かい", k(), None), "階": ("かい", k({3: (None, "がい")}), None), "箇": ("か", k(), None),
+		"缶": ("かん", k(), None), "巻": ("かん", k(), None), "曲": ("きょく", k(), None), "件": ("けん", k(), None),
+		"軒": ("けん", k({3: (None, "げん")}), None), "校": ("こう", k(), None),
+
+		"本": ("ほん", h("ほん"), None), "匹": ("ひき", h("ひき"), None), "杯": ("はい", h("はい"), None),
+		"分": ("ふん", h("ふん", {3: (None, "ぷん"), 4: (None, "ぷん"), "千": (None, "ぷん"), "万": (None, "ぷん")}), None),
+		"泊": ("はく", h("はく", {3: (None, "ぱく"), 4: (None, "ぱく")}), None),
+		"発": ("はつ", h("はつ", {3: (None, "ぱつ")}), None), "歩": ("ほ", h("ほ", {3: (None, "ぽ")}), None),
+
+		"冊": ("さつ", st(), None), "歳": ("さい", st(), None), "社": ("しゃ", st(), None), "種": ("しゅ", st(), None),
+		"週": ("しゅう", st(), None), "周": ("しゅう", st(), None), "席": ("せき", st(), None), "戦": ("せん", st(), None),
+		"足": ("そく", st({3: (None, "ぞく")}), None), "束": ("そく", st({3: (None, "ぞく")}), None),
+		"頭": ("とう", st(), None), "着": ("ちゃく", st(), None), "通": ("つう", st(), None), "点": ("てん", st(), None),
+
+		"枚": ("まい", {}, None), "台": ("だい", {}, None), "語": ("ご", {}, None), "段": ("だん", {}, None), "度": ("ど", {}, None),
+		"番": ("ばん", {}, None), "便": ("びん", {}, None), "部": ("ぶ", {}, None), "名": ("めい", {}, None), "問": ("もん", {}, None),
+		"話": ("わ", {}, None), "年": ("ねん", yo, None), "円": ("えん", yo, None),
+		"月": ("がつ", {4: ("し", None), 7: ("しち", None), 9: ("く", None)}, None),
+
+		"人": ("にん", yo, {1: [("一", "ひと"), ("人", "り")], 2: [("二", "ふた"), ("人", "り")]}),
+
+		# 1日 is either ついたち or いちにち
+		"日": ("にち", {9: ("く", None)}, {
+			1: None, 2: [("二", "ふつ"), ("日", "か")], 3: [("三", "みっ"), ("日", "か")], 4: [("四", "よっ"), ("日", "か")],
+			5: [("五", "いつ"), ("日", "か")], 6: [("六", "むい"), ("日", "か")], 7: [("七", "なの"), ("日", "か")],
+			8: [("八", "よう"), ("日", "か")], 9: [("九", "ここの"), ("日", "か")], 10: [("十", "とお"), ("日", "か")],
+			14: [("十", "じゅう"), ("四", "よっ"), ("日", "か")], 20: [("二十日", "はつか")],
+			24: [("二", "に"), ("十", "じゅう"), ("四", "よっ"), ("日", "か")]
+		}),
+
+		# only the native numbers are used with つ
+		"つ": (None, {}, {
+			1: [("一", "ひと"), ("つ", None)], 2: [("二", "ふた"), ("つ", None)], 3: [("三", "みっ"), ("つ", None)],
+			4: [("四", "よっ"), ("つ", None)], 5: [("五", "いつ"), ("つ", None)], 6: [("六", "むっ"), ("つ", None)],
+			7: [("七", "なな"), ("つ", None)], 8: [("八", "やっ"), ("つ", None)], 9: [("九", "ここの"), ("つ", None)]
+		})
+	}
+
+	return result
+
+
+""" The readings of the counters, see _counters_init(). """
+_counterreadings = _counters_init()
+
+""" All characters used to write kanji numbers. """
+kanjinumberchars = "".join(_digits) + "".join(_unitvalues)
+
+
+def _append_unit(segments: list[list[str]], kanji: str, reading: str) -> None:
+	"""
+	Adds a unit to the segments of a number, changing the reading of the digit in front of it when needed.
+	:param segments: The segments of the number so far.
+	:param kanji: The kanji of the unit.
+	:param reading: The reading of the unit.
+	:return:
+	"""
+	if len(segments) > 0:
+		change = _unitchanges.get((segments[-1][0], kanji))
+		if change is not None:
+			segments[-1][1], reading = change
+
+	segments.append([kanji, reading])
+
+
+def _number_segments(n: int) -> list[list[str]]:
+	"""
+	Splits a number into its kanji, with the reading of every kanji.
+	:param n: The number, from 1 to maxnumber.
+	:return: A list of [kanji, reading].
+	"""
+	assert 0 < n <= maxnumber, "Number cannot be written with kanji"
+
+	segments = []
+	for largekanji, largevalue, largereading in _largeunits + ((None, 1, None),):
+		group = n // largevalue % 10000
+		if group == 0:
+			continue
+
+		for kanji, value, reading in _smallunits:
+			d = group // value % 10
+			if d == 0:
+				continue
+
+			# 1 is not written in front of small units
+			if d > 1:
+				segments.append([_digits[d], _digitreadings[d]])
+
+			_append_unit(segments, kanji, reading)
+
+		d = group % 10
+		if d > 0:
+			segments.append([_digits[d], _digitreadings[d]])
+
+		if largekanji is not None:
+			_append_unit(segments, largekanji, largereading)
+
+	return segments
+
+
+def number_to_kanji(n: int) -> str:
+	"""
+	Writes a number with kanji, like 300 as 三百.
+	:param n: The number, from 1 to maxnumber.
+	:return: The kanji for the number.
+	"""
+	return "".join(kanji for kanji, reading in _number_segments(n))
+
+
+def kanji_to_number(text: str):
+	"""
+	Reads a number written with kanji, like 三百. Only accepts numbers written the way number_to_kanji() writes them.
+	:param text: The kanji of the number.
+	:return: Returns the number or None, when 'text' is not a number.
+	"""
+	total = 0
+	group = 0
+	digit = 0
+	for ch in text:
+		value = _digitvalues.get(ch)
+		if value is not None:
+			if digit > 0:
+				return None
+
+			digit = value
+			continue
+
+		value = _unitvalues.get(ch)
+		if value is None:
+			return None
+
+		if value < 10000:
+			group += (digit if digit > 0 else 1) * value
+		else:
+			group += digit
+			if group == 0:
+				return None
+
+			total += group * value
+			group = 0
+
+		digit = 0
+
+	total += group + digit
+
+	# this rejects anything written differently, like 二〇二二 or 一百
+	if total < 1 or total > maxnumber or number_to_kanji(total) != text:
+		return None
+
+	return total
+
+
+def reading_segments(n: int, counter: str = None):
+	"""
+	Gets the reading of a number, optionally followed by a counter, like 3本 as 三[さん]本[ぼん].
+	:param n: The number, from 1 to maxnumber.
+	:param counter: Optional, the counter following the number.
+	:return: Returns a list of tuples (text, reading) or None, when the counter is unknown or the reading depends on the context. The reading of kana is None.
+	"""
+	segments = _number_segments(n)
+
+	if counter is None:
+		return [tuple(s) for s in segments]
+
+	spec = _counterreadings.get(counter)
+	if spec is None:
+		return None
+
+	reading, changes, exact = spec
+
+	if exact is not None and n in exact:
+		return exact[n]
+
+	if reading is None:
+		return None
+
+	# the reading changes depending on how the number ends
+	last = segments[-1]
+	key = _digitvalues.get(last[0], last[0])
+
+	change = changes.get(key)
+	if change is not None:
+		numberreading, counterreading = change
+
+		if numberreading == _SOKUON:
+			last[1] = last[1][:-1] + _SOKUON
+		elif numberreading is not None:
+			last[1] = numberreading
+
+		if counterreading is not None:
+			reading = counterreading
+
+	segments.append([counter, reading])
+
+	return [tuple(s) for s in segments]
+
+
+def number_pattern(counters) -> "re.Pattern":
+	"""
+	Creates a regex finding numbers in a text. Arabic numbers are only found in front of a counter.
+	Kanji numbers must have at least two kanji and cannot be part of a word, so they must not follow a kanji or be followed by a kanji other than a counter.
+	:param counters: The counters, every one a single character.
+	:return: The compiled regex. The groups are (arabic, counter, kanjinumber, kanjicounter).
+	"""
+	counterclass = "[" + "".join(re.escape(c) for c in counters) + "]"
+	kanjiclass = "[" + _kanjichars + "]"
+
+	arabic = "(?<![0-9０-９.,．，])([0-9０-９]+)(" + counterclass + ")"
+	kanji = "(?<!" + kanjiclass + ")([" + kanjinumberchars + "]{2,})(?:(" + counterclass + ")|(?!" + kanjiclass + "))"
+
+	return re.compile(arabic + "|" + kanji)
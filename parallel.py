@@ -0,0 +1,211 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import itertools
+import multiprocessing
+import os
+import threading
+from typing import Sequence, Iterable, Iterator
+
+from .backends import Backends
+from .instance import Instance, KanjiReading, WordReading
+from .instanceprv import CachedReading
+from .problem import Problem
+
+
+class InstanceConfig:
+	"""
+	Describes how to create an Instance, so every worker process can create its own one.
+	"""
+	def __init__(self, opentag: str, closetag: str, kanjireadings: dict[str, KanjiReading] = None, wordreadings: Sequence[WordReading] = None, usemecab: bool = False, usejamdict: bool = False, segmenter: str = "kakasi", protectedspans: dict[str, str] = None):
+		"""
+		Creates a new configuration. See Instance for the details.
+		:param opentag: The tag used to mark the beginning of a furigana block.
+		:param closetag: The tag used to mark the end of a furigana block.
+		:param kanjireadings: Optional, the readings passed to Instance.add_kanjireadings().
+		:param wordreadings: Optional, the readings passed to Instance.add_wordreadings().
+		:param usemecab: When True, every worker creates a MeCab.Tagger().
+		:param usejamdict: When True, every worker creates a Jamdict().
+		:param segmenter: The segmenter passed to Instance.set_segmenter().
+		:param protectedspans: Optional, the rules passed to Instance.add_protectedspans().
+		"""
+		self.opentag = opentag
+		self.closetag = closetag
+		self.kanjireadings = kanjireadings
+		self.wordreadings = wordreadings
+		self.usemecab = usemecab
+		self.usejamdict = usejamdict
+		self.segmenter = segmenter
+		self.protectedspans = protectedspans
+
+	def create(self) -> Instance:
+		"""
+		Creates the instance described by this configuration.
+		:return: The new instance.
+		"""
+		maker = Instance(self.opentag, self.closetag, backends=Backends(usemecab=self.usemecab, usejamdict=self.usejamdict))
+
+		maker.set_segmenter(self.segmenter)
+
+		if self.kanjireadings:
+			maker.add_kanjireadings(self.kanjireadings)
+
+		if self.wordreadings:
+			maker.add_wordreadings(self.wordreadings)
+
+		if self.protectedspans:
+			maker.add_protectedspans(self.protectedspans)
+
+		return maker
+
+
+""" The instance used by the current worker process. """
+_worker_instance = None
+
+""" The number of entries of the log of found readings the current worker process has merged, see iter_corpus(). """
+_worker_logposition = 0
+
+
+def _init_worker(instance_config, readingscache: dict[str, list[CachedReading]]) -> None:
+	"""
+	Creates the instance of a worker process.
+	:param instance_config: See process_corpus().
+	:param readingscache: Readings known when the pool was started.
+	:return:
+	"""
+	global _worker_instance, _worker_logposition
+
+	if isinstance(instance_config, InstanceConfig):
+		_worker_instance = instance_config.create()
+	else:
+		_worker_instance = instance_config()
+
+	_worker_instance._mergecache(readingscache)
+	_worker_logposition = 0
+
+
+def _process_chunk(task: tuple[list[str], list, int, list[tuple[str, list[CachedReading]]]]) -> tuple[list[tuple[bool, str, list[Problem]]], dict[str, list[CachedReading]], int, int]:
+	"""
+	Processes a chunk of texts inside of a worker process.
+	:param task: A tuple (texts, userdata, logstart, logentries), where logentries is the part of the log of readings found by all workers which starts at logstart.
+	:return: Returns a tuple (results, newreadings, pid, logposition), where newreadings contains the readings this worker found while processing the chunk and logposition is the part of the log this worker has merged.
+	"""
+	global _worker_logposition
+
+	texts, userdata, logstart, logentries = task
+
+	maker = _worker_instance
+
+	# only the entries this worker has not seen yet
+	skip = max(_worker_logposition - logstart, 0)
+	if skip < len(logentries):
+		maker._mergecache(dict(logentries[skip:]))
+	_worker_logposition = max(_worker_logposition, logstart + len(logentries))
+
+	# new readings are always added at the end of the cache
+	known = len(maker.readingscache)
+
+	results = maker.process_many(texts, userdata)
+
+	newreadings = {}
+	for kanji in itertools.islice(maker.readingscache, known, None):
+		newreadings[kanji] = maker.readingscache[kanji]
+
+	return results, newreadings, os.getpid(), _worker_logposition
+
+
+def iter_corpus(texts: Iterable[str], instance_config, workers: int = None, userdata: Iterable = None, chunksize: int = 256, readingscache: dict[str, list[CachedReading]] = None) -> Iterator[tuple[bool, str, list[Problem]]]:
+	"""
+	Like process_corpus() but returns the results one by one, so the corpus never has to be in memory as a whole.
+	:return: Returns an iterator over tuples (hasfurigana, processedtext, problems), in the same order as 'texts'.
+	"""
+	assert chunksize > 0, "Chunks cannot be empty"
+
+	if workers is None:
+		workers = os.cpu_count() or 1
+
+	if readingscache is None:
+		readingscache = {}
+
+	texts = iter(texts)
+	userdata = iter(userdata) if userdata is not None else None
+
+	# the readings found by the workers, in the order they arrived, and how much of it every worker has merged
+	log: list[tuple[str, list[CachedReading]]] = []
+	logpositions: dict[int, int] = {}
+
+	# the chunks being processed, so the corpus is read as fast as it is processed and new chunks get recent readings
+	window = threading.Semaphore(workers * 2)
+	stop = threading.Event()
+
+	def tasks():
+		"""
+		Creates the tasks while the pool sends them, each with the part of the log the workers may not have seen.
+		"""
+		while True:
+			while not window.acquire(timeout=0.1):
+				if stop.is_set():
+					return
+			if stop.is_set():
+				return
+
+			chunk = list(itertools.islice(texts, chunksize))
+			if len(chunk) < 1:
+				return
+
+			chunkuserdata = None
+			if userdata is not None:
+				chunkuserdata = list(itertools.islice(userdata, len(chunk)))
+				assert len(chunkuserdata) == len(chunk), "Expected userdata for every text"
+
+			# any worker can get the task, so it starts where the worker which is furthest behind stopped
+			positions = list(logpositions.values())
+			logstart = min(positions) if len(positions) >= workers else 0
+
+			yield chunk, chunkuserdata, logstart, log[logstart:]
+
+	with multiprocessing.Pool(workers, _init_worker, (instance_config, dict(readingscache))) as pool:
+		try:
+			for results, newreadings, pid, logposition in pool.imap(_process_chunk, tasks()):
+				logpositions[pid] = logposition
+
+				for kanji in newreadings:
+					if kanji not in readingscache:
+						readingscache[kanji] = newreadings[kanji]
+						log.append((kanji, newreadings[kanji]))
+
+				window.release()
+
+				yield from results
+		finally:
+			# the pool waits for the thread creating the tasks when it is closed
+			stop.set()
+
+
+def process_corpus(texts: Iterable[str], instance_config, workers: int = None, userdata: Iterable = None, chunksize: int = 256, readingscache: dict[str, list[CachedReading]] = None) -> list[tuple[bool, str, list[Problem]]]:
+	"""
+	Adds furigana to many texts, using a pool of worker processes. Readings found by one worker are shared with the other workers.
+	:param texts: The texts you want to add furigana to.
+	:param instance_config: An InstanceConfig, or a picklable function which creates the Instance for a worker.
+	:param workers: The number of worker processes. Uses one per CPU by default.
+	:param userdata: Optional, the userdata for every text, see Instance.process().
+	:param chunksize: The number of texts sent to a worker at once.
+	:param readingscache: Optional, readings which are already known, e.g. Instance.readingscache. All readings found by the workers are added to it.
+	:return: Returns a list of tuples (hasfurigana, processedtext, problems), in the same order as 'texts'. The problems are the ones found for this text.
+	"""
+	return list(iter_corpus(texts, instance_config, workers, userdata, chunksize, readingscache))
@@ -22,31 +22,141 @@ import sys
 class Problem:
 	"""
 	Represents a problem found while processing text. See Instance.process().
+	Only the fields are stored, the description is created when it is read, so collecting many problems is cheap.
 	"""
-	def __init__(self, description: str, kanji: str, userdata):
+
+	""" No backend knows any reading for the kanji. """
+	NO_READING = "no_reading"
+
+	""" None of the readings of the kanji matches the kana of the word. """
+	NO_MATCH = "no_match"
+
+	""" All kanji of the word were matched, but some kana was left over. """
+	LEFTOVER = "leftover"
+
+	""" kakasi could not translate a word. """
+	NOT_TRANSLATED = "not_translated"
+
+	""" The descriptions for every problem code, formatted with the fields of the problem. """
+	_descriptions = {
+		NO_READING: "Failed to find any reading for \"{kanji}\". Occurence: \"{word}\".",
+		NO_MATCH: "Could not match kanji \"{kanji}\" to kana \"{kana}\". Occurence: \"{word}\".",
+		LEFTOVER: "Matched all kanji of \"{kanji}\" to \"{reading}\" but \"{kana}\" was left over. Occurence: \"{word}\".",
+		NOT_TRANSLATED: "Failed to translate '{kanji}'."
+	}
+
+	__slots__ = ("code", "kanji", "word", "kana", "reading", "userdata")
+
+	def __init__(self, code: str, kanji: str, userdata, word: str = None, kana: str = None, reading: str = None):
 		"""
 		Creates a new problem object. Only created by the Instance and not the user.
-		:param description: A text describing the problem.
+		:param code: The kind of problem, e.g. Problem.NO_MATCH.
 		:param kanji: The kanji the problem is related to. Can be None.
 		:param userdata: The userdata given as an argument to Instance.process().
+		:param word: The word the kanji is part of.
+		:param kana: The kana which could not be matched or was left over.
+		:param reading: The reading of the whole word in katakana.
 		"""
-		self.description = description
+		self.code = code
 		self.kanji = kanji
+		self.word = word
+		self.kana = kana
+		self.reading = reading
 		self.userdata = userdata
 
+	@property
+	def description(self) -> str:
+		"""
+		:return: Returns a text describing the problem.
+		"""
+		return Problem._descriptions[self.code].format(kanji=self.kanji, word=self.word, kana=self.kana, reading=self.reading)
+
+	def __repr__(self) -> str:
+		return "Problem(" + self.code + ", " + repr(self.kanji) + ", " + repr(self.userdata) + ")"
+
+	def astuple(self) -> tuple:
+		"""
+		Gets the fields of the problem without the userdata, e.g. to store them.
+		:return: Returns a tuple (code, kanji, word, kana, reading).
+		"""
+		return self.code, self.kanji, self.word, self.kana, self.reading
+
+	@staticmethod
+	def fromtuple(fields, userdata) -> "Problem":
+		"""
+		Creates a problem from the output of astuple().
+		:param fields: The fields of the problem.
+		:param userdata: The userdata of the new problem.
+		:return: The new problem.
+		"""
+		code, kanji, word, kana, reading = fields
+
+		return Problem(code, kanji, userdata, word, kana, reading)
+
+
+class ProblemCallback:
+	"""
+	Passes every problem to a function, instead of collecting them in a list. Can be used everywhere a list of problems is expected.
+	"""
+	def __init__(self, callback):
+		"""
+		Creates a new callback.
+		:param callback: The function called with every problem found.
+		"""
+		self.callback = callback
+
+	def append(self, problem: Problem) -> None:
+		"""
+		Passes a problem to the callback.
+		:param problem: The problem found.
+		:return:
+		"""
+		self.callback(problem)
+
+	def extend(self, problems: list[Problem]) -> None:
+		"""
+		Passes several problems to the callback.
+		:param problems: The problems found.
+		:return:
+		"""
+		for p in problems:
+			self.callback(p)
+
 
 class Problems:
 	"""
-	Helper class for functions to print problems.
+	Helper class for functions to print problems. Every function accepts a list of problems or a ProblemStore, which is much faster for many problems.
 	"""
+	@staticmethod
+	def _print_stored(stored: list[tuple[Problem, int, list]]) -> None:
+		"""
+		Prints the problems returned by ProblemStore.query().
+		:param stored: The problems to print.
+		:return:
+		"""
+		for p, count, samples in stored:
+			text = p.description + " (" + str(count) + "x)"
+
+			if p.userdata is not None:
+				print(str(p.userdata) + ": " + text)
+			else:
+				print(text)
+
 	@staticmethod
 	def print_all(problems: list[Problem], limit: int = 100000) -> None:
 		"""
 		Prints all found problems on the screen.
-		:param problems: The list of problems after calling Instance.process().
+		:param problems: The list of problems after calling Instance.process() or a ProblemStore.
 		:param limit: Limit the number of problems listed.
 		:return:
 		"""
+		from .problemstore import ProblemStore
+
+		if isinstance(problems, ProblemStore):
+			Problems._print_stored(problems.query(limit=limit))
+			print("Found " + str(len(problems)) + " problems...")
+			return
+
 		for i in range(min(limit, len(problems))):
 			p = problems[i]
 			if p.userdata is not None:
@@ -59,18 +169,23 @@ class Problems:
 	def print_kanjiproblems_list(problems: list[Problem]) -> list[str]:
 		"""
 		Prints all problems found for each kanji with a problem. Sorted by the number of problems.
-		:param problems: The list of problems after calling Instance.process().
+		:param problems: The list of problems after calling Instance.process() or a ProblemStore.
 		:return: The list of kanjis with problems, sorted by the number of problems.
 		"""
-		counted = {}
-		for p in problems:
-			if p.kanji is not None:
-				if p.kanji in counted:
-					counted[p.kanji] += 1
-				else:
-					counted[p.kanji] = 1
+		from .problemstore import ProblemStore
 
-		sort = sorted(counted.items(), key=lambda x: x[1], reverse=True)
+		if isinstance(problems, ProblemStore):
+			sort = problems.kanji_counts()
+		else:
+			counted = {}
+			for p in problems:
+				if p.kanji is not None:
+					if p.kanji in counted:
+						counted[p.kanji] += 1
+					else:
+						counted[p.kanji] = 1
+
+			sort = sorted(counted.items(), key=lambda x: x[1], reverse=True)
 
 		sys.stdout.write("Issues: ")
 		for k, n in sort:
@@ -83,11 +198,17 @@ class Problems:
 	def print_kanjiproblems(problems: list[Problem], kanji: str, limit: int = 10) -> None:
 		"""
 		Prints all problems for a specific kanji.
-		:param problems: The list of problems after calling Instance.process().
+		:param problems: The list of problems after calling Instance.process() or a ProblemStore.
 		:param kanji: The kanji to print problems for.
 		:param limit: Limit the number of problems being printed.
 		:return:
 		"""
+		from .problemstore import ProblemStore
+
+		if isinstance(problems, ProblemStore):
+			Problems._print_stored(problems.query(kanji=kanji, limit=limit))
+			return
+
 		i = 0
 		for p in problems:
 			if p.kanji == kanji:
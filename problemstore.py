@@ -0,0 +1,264 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import threading
+
+from .problem import Problem
+
+
+class ProblemStore:
+	"""
+	Collects problems like a list, but stores identical problems only once, with the number of occurrences and a few samples of their userdata.
+	The problems are kept in a SQLite database with indexes by kanji and by problem code, so they can be queried quickly after processing a large corpus.
+	Can be used everywhere a list of problems is expected.
+	"""
+	def __init__(self, path: str = ":memory:", maxsamples: int = 5, buffersize: int = 10000):
+		"""
+		Opens or creates a store.
+		:param path: The database file. By default, the store is kept in memory.
+		:param maxsamples: The maximum number of userdata samples kept for every problem.
+		:param buffersize: The number of different problems collected in memory before they are written to the database.
+		"""
+		assert buffersize > 0, "The buffer must be able to store something"
+
+		# only import this when a store is used
+		import sqlite3
+
+		self.maxsamples = maxsamples
+		self.buffersize = buffersize
+
+		# the problems not written to the database yet. For every problem a list [count, samples].
+		self._pending: dict[tuple, list] = {}
+
+		self._lock = threading.Lock()
+		self._db = sqlite3.connect(path, check_same_thread=False)
+		self._db.execute("CREATE TABLE IF NOT EXISTS problems (code TEXT, kanji TEXT, word TEXT, kana TEXT, reading TEXT, count INTEGER, samples TEXT, PRIMARY KEY (code, kanji, word, kana, reading))")
+		self._db.execute("CREATE INDEX IF NOT EXISTS problems_kanji ON problems (kanji, count)")
+		self._db.execute("CREATE INDEX IF NOT EXISTS problems_code ON problems (code, count)")
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+
+	def __len__(self) -> int:
+		"""
+		:return: Returns the number of problems added, counting every occurrence.
+		"""
+		with self._lock:
+			self._flush()
+			return self._db.execute("SELECT COALESCE(SUM(count), 0) FROM problems").fetchone()[0]
+
+	def append(self, problem: Problem) -> None:
+		"""
+		Adds a problem.
+		:param problem: The problem found.
+		:return:
+		"""
+		key = problem.astuple()
+
+		with self._lock:
+			entry = self._pending.get(key)
+			if entry is None:
+				self._pending[key] = [1, [problem.userdata]]
+
+				if len(self._pending) >= self.buffersize:
+					self._flush()
+			else:
+				entry[0] += 1
+				if len(entry[1]) < self.maxsamples:
+					entry[1].append(problem.userdata)
+
+	def extend(self, problems: list[Problem]) -> None:
+		"""
+		Adds several problems.
+		:param problems: The problems found.
+		:return:
+		"""
+		for p in problems:
+			self.append(p)
+
+	@staticmethod
+	def _tokey(fields: tuple) -> tuple:
+		"""
+		Converts the fields of a problem into the columns of the database, as SQLite does not consider NULL values equal in a primary key.
+		:param fields: The output of Problem.astuple().
+		:return: The fields, with None replaced by an empty string.
+		"""
+		return tuple("" if f is None else f for f in fields)
+
+	@staticmethod
+	def _fromkey(columns) -> tuple:
+		"""
+		The reverse of _tokey().
+		:param columns: The columns of the database.
+		:return: The fields of the problem.
+		"""
+		return tuple(None if c == "" else c for c in columns)
+
+	def _flush(self) -> None:
+		"""
+		Writes the problems collected in memory to the database. The lock must be held.
+		:return:
+		"""
+		if len(self._pending) < 1:
+			return
+
+		for fields, (count, samples) in self._pending.items():
+			key = ProblemStore._tokey(fields)
+
+			row = self._db.execute("SELECT count, samples FROM problems WHERE code = ? AND kanji = ? AND word = ? AND kana = ? AND reading = ?", key).fetchone()
+			if row is not None:
+				count += row[0]
+				samples = (json.loads(row[1]) + samples)[:self.maxsamples]
+
+			self._db.execute("INSERT OR REPLACE INTO problems VALUES (?, ?, ?, ?, ?, ?, ?)", key + (count, json.dumps(samples, ensure_ascii=False, default=str)))
+
+		self._db.commit()
+		self._pending.clear()
+
+	def flush(self) -> None:
+		"""
+		Writes all problems to the database.
+		:return:
+		"""
+		with self._lock:
+			self._flush()
+
+	def _select(self, where: str, args: tuple, limit: int) -> list[tuple[Problem, int, list]]:
+		"""
+		Gets problems from the database, the most frequent ones first.
+		:param where: The condition used to select the problems.
+		:param args: The arguments of the condition.
+		:param limit: The maximum number of problems returned or None.
+		:return: See query().
+		"""
+		sql = "SELECT code, kanji, word, kana, reading, count, samples FROM problems" + where + " ORDER BY count DESC"
+		if limit is not None:
+			sql += " LIMIT " + str(int(limit))
+
+		with self._lock:
+			self._flush()
+			rows = self._db.execute(sql, args).fetchall()
+
+		result = []
+		for row in rows:
+			samples = json.loads(row[6])
+			problem = Problem.fromtuple(ProblemStore._fromkey(row[:5]), samples[0] if len(samples) > 0 else None)
+
+			result.append((problem, row[5], samples))
+
+		return result
+
+	def query(self, kanji: str = None, code: str = None, limit: int = None) -> list[tuple[Problem, int, list]]:
+		"""
+		Gets the problems for a kanji or of a problem code, the most frequent ones first.
+		:param kanji: Optional, only get the problems related to this kanji.
+		:param code: Optional, only get the problems with this code, e.g. Problem.NO_MATCH.
+		:param limit: Optional, the maximum number of problems returned.
+		:return: Returns a list of tuples (problem, count, samples), where samples is a list of the userdata of some occurrences. The userdata of the problem is the first sample.
+		"""
+		conditions = []
+		args = []
+
+		if kanji is not None:
+			conditions.append("kanji = ?")
+			args.append(kanji)
+
+		if code is not None:
+			conditions.append("code = ?")
+			args.append(code)
+
+		where = " WHERE " + " AND ".join(conditions) if len(conditions) > 0 else ""
+
+		return self._select(where, tuple(args), limit)
+
+	def kanji_counts(self) -> list[tuple[str, int]]:
+		"""
+		Counts the problems for every kanji.
+		:return: Returns a list of tuples (kanji, count), the kanji with the most problems first.
+		"""
+		with self._lock:
+			self._flush()
+			rows = self._db.execute("SELECT kanji, SUM(count) AS n FROM problems WHERE kanji != '' GROUP BY kanji ORDER BY n DESC").fetchall()
+
+		return [(k, n) for k, n in rows]
+
+	def code_counts(self) -> dict[str, int]:
+		"""
+		Counts the problems for every problem code.
+		:return: Returns a dictionary with the number of problems for every code.
+		"""
+		with self._lock:
+			self._flush()
+			rows = self._db.execute("SELECT code, SUM(count) FROM problems GROUP BY code").fetchall()
+
+		return {c: n for c, n in rows}
+
+	def export_jsonl(self, path: str) -> None:
+		"""
+		Writes all problems to a file, one JSON object per line, the most frequent ones first.
+		:param path: The file to write.
+		:return:
+		"""
+		with open(path, "w", encoding="utf8") as f:
+			for problem, count, samples in self.query():
+				data = {
+					"code": problem.code, "kanji": problem.kanji, "word": problem.word, "kana": problem.kana, "reading": problem.reading,
+					"description": problem.description, "count": count, "samples": samples
+				}
+
+				f.write(json.dumps(data, ensure_ascii=False, default=str) + "\n")
+
+	def export_sqlite(self, path: str) -> None:
+		"""
+		Copies all problems into another SQLite database, which can be opened again with ProblemStore(path).
+		:param path: The database file to write.
+		:return:
+		"""
+		import sqlite3
+
+		with self._lock:
+			self._flush()
+
+			target = sqlite3.connect(path)
+			try:
+				self._db.backup(target)
+			finally:
+				target.close()
+
+	def clear(self) -> None:
+		"""
+		Removes all problems.
+		:return:
+		"""
+		with self._lock:
+			self._pending.clear()
+			self._db.execute("DELETE FROM problems")
+			self._db.commit()
+
+	def close(self) -> None:
+		"""
+		Writes all problems and closes the database.
+		:return:
+		"""
+		with self._lock:
+			self._flush()
+			self._db.close()
@@ -0,0 +1,51 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import html
+
+
+def render_tags(segments: list[tuple[str, str, int]], opentag: str, closetag: str) -> str:
+	"""
+	Renders segments in the format of Instance.process(), with the reading between the tags after its text, like 漢[かん]字[じ].
+	:param segments: The segments returned by Instance.process_segments().
+	:param opentag: The tag written in front of a reading.
+	:param closetag: The tag written after a reading.
+	:return: Returns the rendered text.
+	"""
+	return "".join(s if r is None else s + opentag + r + closetag for s, r, _ in segments)
+
+
+def render_ruby(segments: list[tuple[str, str, int]], parentheses: bool = False, escapetext: bool = True) -> str:
+	"""
+	Renders segments as HTML, every reading in a <ruby> element, like <ruby>漢<rt>かん</rt></ruby>. The text is escaped.
+	:param segments: The segments returned by Instance.process_segments().
+	:param parentheses: When True, <rp> elements are added, so browsers without ruby support show the reading in parentheses.
+	:param escapetext: When False, the text without furigana is not escaped, because it already is HTML, e.g. a text node of a document.
+	:return: Returns the HTML.
+	"""
+	escape = html.escape
+
+	if parentheses:
+		ruby = "<ruby>{0}<rp>(</rp><rt>{1}</rt><rp>)</rp></ruby>"
+	else:
+		ruby = "<ruby>{0}<rt>{1}</rt></ruby>"
+
+	if not escapetext:
+		return "".join(s if r is None else ruby.format(escape(s, False), escape(r, False)) for s, r, _ in segments)
+
+	return "".join(escape(s, False) if r is None else ruby.format(escape(s, False), escape(r, False)) for s, r, _ in segments)
@@ -0,0 +1,157 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import threading
+
+
+class ResultCache:
+	"""
+	A persistent cache for processed texts, stored in a SQLite database. See Instance.set_resultcache().
+	When the cache is full, the entries which have not been used for the longest time are removed.
+	"""
+	def __init__(self, path: str, maxentries: int = 1000000, commitinterval: int = 1000):
+		"""
+		Opens or creates a cache.
+		:param path: The database file. Use ":memory:" for a cache which is not stored.
+		:param maxentries: The maximum number of texts stored.
+		:param commitinterval: The number of changes after which they are written to the database. Call flush() to write them earlier.
+		"""
+		assert maxentries > 0, "The cache must be able to store something"
+
+		# only import this when a cache is used
+		import sqlite3
+
+		self.maxentries = maxentries
+		self.commitinterval = commitinterval
+		self.hits = 0
+		self.misses = 0
+
+		self._lock = threading.Lock()
+		self._db = sqlite3.connect(path, check_same_thread=False)
+		self._db.execute("CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, hasfurigana INTEGER, text TEXT, problems TEXT, used INTEGER)")
+		self._db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+
+		self._count = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+		self._clock = self._db.execute("SELECT COALESCE(MAX(used), 0) FROM results").fetchone()[0]
+		self._changes = 0
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+
+	def __len__(self) -> int:
+		"""
+		:return: Returns the number of texts stored.
+		"""
+		return self._count
+
+	def _changed(self) -> None:
+		"""
+		Counts a change and commits, when enough changes have been made.
+		:return:
+		"""
+		self._changes += 1
+		if self._changes >= self.commitinterval:
+			self._db.commit()
+			self._changes = 0
+
+	def get(self, key: bytes):
+		"""
+		Gets a stored result.
+		:param key: The key of the text, see InstancePrv._resultcache_key().
+		:return: Returns a tuple (hasfurigana, segments, problems) or None, when the text is not stored. The segments are the ones of Instance.process_segments() and the problems are the tuples created by Problem.astuple().
+		"""
+		with self._lock:
+			row = self._db.execute("SELECT hasfurigana, text, problems FROM results WHERE key = ?", (key,)).fetchone()
+
+			if row is None:
+				self.misses += 1
+				return None
+
+			self.hits += 1
+
+			self._clock += 1
+			self._db.execute("UPDATE results SET used = ? WHERE key = ?", (self._clock, key))
+			self._changed()
+
+		return bool(row[0]), [tuple(s) for s in json.loads(row[1])], [tuple(p) for p in json.loads(row[2])]
+
+	def put(self, key: bytes, hasfurigana: bool, segments: list[tuple[str, str, int]], problems: list[tuple]) -> None:
+		"""
+		Stores a result.
+		:param key: The key of the text, see InstancePrv._resultcache_key().
+		:param hasfurigana: The first result of Instance.process_segments().
+		:param segments: The second result of Instance.process_segments(), so any output format can be rendered from it.
+		:param problems: The problems found as tuples created by Problem.astuple().
+		:return:
+		"""
+		with self._lock:
+			exists = self._db.execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone() is not None
+
+			self._clock += 1
+			self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", (key, int(hasfurigana), json.dumps(segments, ensure_ascii=False), json.dumps(problems, ensure_ascii=False), self._clock))
+
+			if not exists:
+				self._count += 1
+
+			# remove the oldest tenth of the entries, so this does not happen for every new entry
+			if self._count > self.maxentries:
+				remove = self._count - self.maxentries + self.maxentries // 10
+				self._db.execute("DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used LIMIT ?)", (remove,))
+				self._count = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+			self._changed()
+
+	def stats(self) -> dict[str, int]:
+		"""
+		Gets the statistics of the cache.
+		:return: Returns a dictionary with the number of "hits", "misses" and "entries".
+		"""
+		return {"hits": self.hits, "misses": self.misses, "entries": self._count}
+
+	def clear(self) -> None:
+		"""
+		Removes all stored results.
+		:return:
+		"""
+		with self._lock:
+			self._db.execute("DELETE FROM results")
+			self._db.commit()
+			self._count = 0
+			self._changes = 0
+
+	def flush(self) -> None:
+		"""
+		Writes all changes to the database.
+		:return:
+		"""
+		with self._lock:
+			self._db.commit()
+			self._changes = 0
+
+	def close(self) -> None:
+		"""
+		Writes all changes and closes the database.
+		:return:
+		"""
+		with self._lock:
+			self._db.commit()
+			self._db.close()
@@ -0,0 +1,143 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import threading
+from typing import Callable
+
+
+class Stats:
+	"""
+	Collects timings and counts while processing texts. See Instance.set_stats().
+	Timings are recorded for the processing stages, like "counters" or "find_reading", and for every call to a backend, like "kakasi" or "jamdict".
+	Counts are recorded for events, like "cache_hits", "cache_misses" and "fallbacks", where a whole word got one block of furigana.
+	"""
+	def __init__(self):
+		"""
+		Creates empty statistics.
+		"""
+		self._lock = threading.Lock()
+		self._hooks: list[Callable[[str, str, float], None]] = []
+
+		# for every name a list [calls, total seconds, max seconds]
+		self._stages: dict[str, list] = {}
+		self._backends: dict[str, list] = {}
+		self._counts: dict[str, int] = {}
+
+	def add_hook(self, hook: Callable[[str, str, float], None]) -> None:
+		"""
+		Adds a function which is called for everything recorded, e.g. to forward it to a metrics system.
+		:param hook: Called with (kind, name, value), where kind is "stage", "backend" or "count" and value is the duration in seconds or the number counted.
+		:return:
+		"""
+		self._hooks.append(hook)
+
+	def remove_hook(self, hook: Callable[[str, str, float], None]) -> None:
+		"""
+		Removes a function added with add_hook().
+		:param hook: The function to remove.
+		:return:
+		"""
+		self._hooks.remove(hook)
+
+	@staticmethod
+	def _add_time(timings: dict[str, list], name: str, seconds: float) -> None:
+		"""
+		Adds a duration to the timings of a stage or backend. The lock must be held.
+		:param timings: Either the stages or the backends.
+		:param name: The name of the stage or backend.
+		:param seconds: The duration.
+		:return:
+		"""
+		t = timings.get(name)
+		if t is None:
+			timings[name] = [1, seconds, seconds]
+		else:
+			t[0] += 1
+			t[1] += seconds
+			if seconds > t[2]:
+				t[2] = seconds
+
+	def add_stage(self, name: str, seconds: float) -> None:
+		"""
+		Records the duration of a processing stage.
+		:param name: The name of the stage.
+		:param seconds: The duration.
+		:return:
+		"""
+		with self._lock:
+			Stats._add_time(self._stages, name, seconds)
+
+		for hook in self._hooks:
+			hook("stage", name, seconds)
+
+	def add_backend(self, name: str, seconds: float) -> None:
+		"""
+		Records the duration of a call to a backend.
+		:param name: The name of the backend.
+		:param seconds: The duration.
+		:return:
+		"""
+		with self._lock:
+			Stats._add_time(self._backends, name, seconds)
+
+		for hook in self._hooks:
+			hook("backend", name, seconds)
+
+	def add_count(self, name: str, n: int = 1) -> None:
+		"""
+		Counts an event.
+		:param name: The name of the event.
+		:param n: The number of events.
+		:return:
+		"""
+		with self._lock:
+			self._counts[name] = self._counts.get(name, 0) + n
+
+		for hook in self._hooks:
+			hook("count", name, n)
+
+	@staticmethod
+	def _snapshot_timings(timings: dict[str, list]) -> dict[str, dict[str, float]]:
+		"""
+		Copies the timings of the stages or backends. The lock must be held.
+		:param timings: Either the stages or the backends.
+		:return: For every name a dictionary with "calls", "total", "mean" and "max", all durations in seconds.
+		"""
+		return {name: {"calls": t[0], "total": t[1], "mean": t[1] / t[0], "max": t[2]} for name, t in timings.items()}
+
+	def snapshot(self) -> dict[str, dict]:
+		"""
+		Gets a copy of everything recorded so far.
+		:return: Returns a dictionary with "stages" and "backends", see _snapshot_timings(), and "counts", with the number for every event.
+		"""
+		with self._lock:
+			return {
+				"stages": Stats._snapshot_timings(self._stages),
+				"backends": Stats._snapshot_timings(self._backends),
+				"counts": dict(self._counts)
+			}
+
+	def reset(self) -> None:
+		"""
+		Removes everything recorded so far. The hooks are kept.
+		:return:
+		"""
+		with self._lock:
+			self._stages.clear()
+			self._backends.clear()
+			self._counts.clear()
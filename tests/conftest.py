@@ -0,0 +1,16 @@
+"""
+furiganamaker tests
+Copyright (C) 2022  Daniel Kollmann
+
+Use of this source code is governed by an MIT-style
+license that can be found in the LICENSE file or at
+https://opensource.org/licenses/MIT.
+"""
+
+# run with "python -m pytest tests" from the directory containing the furiganamaker package
+import os
+import sys
+
+# hack only for the tests, like in the benchmarks
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
@@ -0,0 +1,48 @@
+"""
+furiganamaker tests
+Copyright (C) 2022  Daniel Kollmann
+
+Use of this source code is governed by an MIT-style
+license that can be found in the LICENSE file or at
+https://opensource.org/licenses/MIT.
+"""
+
+from furiganamaker.instanceprv import InstancePrv
+from furiganamaker.kana import kana2hira, hira2kana, expand_longvowels, rfind_longvowels
+
+
+def test_convert_scripts():
+	assert hira2kana("ぁゔゖーabc") == "ァヴヶーabc"
+	assert kana2hira("ァヴヶーabc") == "ぁゔゖーabc"
+
+
+def test_expand_longvowels():
+	assert expand_longvowels("らーめん") == "らあめん"
+	assert expand_longvowels("ラーメン") == "ラアメン"
+	assert expand_longvowels("すげーー") == "すげええ"
+
+	# without a kana in front, the vowel is unknown
+	assert expand_longvowels("ー漢ー") == "ー漢ー"
+
+
+def test_rfind_longvowels():
+	assert rfind_longvowels("つめたあい", "たーい", 5) == 2
+	assert rfind_longvowels("ながあい", "ーい", 4) == 2
+	assert rfind_longvowels("ながいい", "ーい", 4) == -1
+
+
+def test_split_hiragana_longvowels():
+	# the reading writes the long vowel with a vowel character
+	assert InstancePrv._split_hiragana([("冷", True), ("たーい", False)], "つめたあい", "ツメタアイ") == [("つめ", True), ("たーい", False)]
+
+	# the long vowel repeats the vowel of the reading of the kanji in front of it
+	assert InstancePrv._split_hiragana([("長", True), ("ーい", False), ("話", True)], "ながあいはなし", "ナガアイハナシ") == [("なが", True), ("ーい", False), ("はなし", True)]
+
+	# the same kana and vowel in the reading of a kanji are not changed
+	assert InstancePrv._split_hiragana([("朝", True), ("さーん", False)], "さあさあん", "サアサアン") == [("さあ", True), ("さーん", False)]
+
+
+def test_split_hiragana_different_lengths():
+	# the kanji have longer readings than the text, and the long vowel is kept by the reading
+	assert InstancePrv._split_hiragana([("長", True), ("ーい", False), ("話", True)], "ながーいはなし", "ナガーイハナシ") == [("なが", True), ("ーい", False), ("はなし", True)]
+	assert InstancePrv._split_hiragana([("一", True), ("ー", False)], "いちー", "イチー") == [("いち", True), ("ー", False)]
@@ -0,0 +1,43 @@
+"""
+furiganamaker tests
+Copyright (C) 2022  Daniel Kollmann
+
+Use of this source code is governed by an MIT-style
+license that can be found in the LICENSE file or at
+https://opensource.org/licenses/MIT.
+"""
+
+import pytest
+
+import furiganamaker
+
+
+@pytest.mark.parametrize("text, expected", [
+	("2文字", "二文字[ふたもじ]"),
+	("2試合", "二試合[にしあい]"),
+	("3ヶ月", "三ヶ月[さんかげつ]"),
+	("5切れ", "五[ご]切[き]れ"),
+	("今日は2文字だけ", "今日[こんにち]は二文字[ふたもじ]だけ"),
+])
+def test_counter_without_reading(text, expected):
+	maker = furiganamaker.Instance("[", "]")
+
+	# the number is written with kanji and kakasi reads it together with the counter
+	assert maker.process(text, None)[1] == expected
+
+
+def test_counter_without_reading_positions():
+	maker = furiganamaker.Instance("[", "]")
+
+	hasfurigana, segments = maker.process_segments("今日は2文字だけ", None)
+
+	# the segments start where their first character was in the input
+	assert ("二文字", "ふたもじ", 3) in segments
+	assert ("だけ", None, 6) in segments
+
+
+def test_counter_with_reading():
+	maker = furiganamaker.Instance("[", "]")
+
+	assert maker.process("3人", None)[1] == "3[さん]人[にん]"
+	assert maker.process_segments("100円", None)[1] == [("100", "ひゃく", 0), ("円", "えん", 3)]
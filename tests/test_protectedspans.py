@@ -0,0 +1,75 @@
+"""
+furiganamaker tests
+Copyright (C) 2022  Daniel Kollmann
+
+Use of this source code is governed by an MIT-style
+license that can be found in the LICENSE file or at
+https://opensource.org/licenses/MIT.
+"""
+
+import furiganamaker
+
+
+def test_hashtag_followed_by_japanese():
+	maker = furiganamaker.Instance("[", "]")
+
+	hasfurigana, segments = maker.process_segments("#タグ漢字の説明", None)
+
+	# only the tag is protected, the text after it gets furigana
+	assert hasfurigana
+	assert segments[0] == ("#タグ", None, 0)
+	assert segments[1][0].startswith("漢") and segments[1][1] is not None
+
+
+def test_hashtag_ends_at_kanji():
+	maker = furiganamaker.Instance("[", "]")
+
+	# the kanji could be the text after the tag, so they always get furigana
+	assert maker.process("#東京 に行く", None)[1] == "#東京[とうきょう] に行[い]く"
+	assert maker.process("#タグ東京", None)[1] == "#タグ東京[とうきょう]"
+
+
+def test_hashtag_ascii():
+	maker = furiganamaker.Instance("[", "]")
+
+	hasfurigana, segments = maker.process_segments("#python_3を勉強", None)
+
+	assert hasfurigana
+	assert segments[0] == ("#python_3を", None, 0)
+
+
+def test_url_with_japanese_path():
+	maker = furiganamaker.Instance("[", "]")
+
+	# the whole URL is protected up to the whitespace
+	assert maker.process("https://ja.wikipedia.org/wiki/化け猫 を見る", None)[1] == "https://ja.wikipedia.org/wiki/化け猫 を見[み]る"
+	assert maker.process("http://x.jp/a(東京)", None)[1] == "http://x.jp/a(東京)"
+
+
+def test_url_without_trailing_punctuation():
+	maker = furiganamaker.Instance("[", "]")
+
+	hasfurigana, segments = maker.process_segments("(http://x.jp/東京)を見る", None)
+	assert ("http://x.jp/東京", None, 1) in segments
+
+	hasfurigana, segments = maker.process_segments("https://x.jp/a, 次", None)
+	assert ("https://x.jp/a", None, 0) in segments
+
+	# Japanese punctuation ends the URL, as the text goes on without a space
+	hasfurigana, segments = maker.process_segments("https://x.jp/東京。次に", None)
+	assert ("https://x.jp/東京", None, 0) in segments
+	assert ("次", "つぎ", 16) in segments
+
+
+def test_protected_span_wins_over_word_reading():
+	maker = furiganamaker.Instance("[", "]")
+	maker.add_protectedspans({"name": "田太郎"})
+	maker.add_wordreadings([furiganamaker.WordReading(("山", "田"), ("やま", "だ"))])
+
+	# the word reading overlaps the protected span, which is kept as it is
+	hasfurigana, segments = maker.process_segments("山田太郎です", None)
+	assert ("田太郎", None, 1) in segments
+
+	# without the span, the word reading is used
+	hasfurigana, segments = maker.process_segments("山田さん", None)
+	assert ("田", "だ", 1) in segments
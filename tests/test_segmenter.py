@@ -0,0 +1,45 @@
+"""
+furiganamaker tests
+Copyright (C) 2022  Daniel Kollmann
+
+Use of this source code is governed by an MIT-style
+license that can be found in the LICENSE file or at
+https://opensource.org/licenses/MIT.
+"""
+
+import pytest
+
+import furiganamaker
+from furiganamaker.instanceprv import InstancePrv
+
+import stubs
+
+
+def test_mecab_reading_layouts():
+	kana = "トウキョウ"
+	assert InstancePrv._mecab_reading(stubs._feature("東京", kana)) == kana
+	assert InstancePrv._mecab_reading(stubs._feature_lite("東京", kana)) == kana
+	assert InstancePrv._mecab_reading("名詞,固有名詞,地域,一般,*,*,東京,トウキョウ,トーキョー") == kana
+
+	# an inflected verb, where the reading of the base form is different
+	assert InstancePrv._mecab_reading("動詞,非自立可能,*,*,五段-カ行,連用形-促音便,イク,行く,行っ,イッ,行く,イク,和,*,*,*,*,*,*,用,イッ,イク,イッ,イク,0,C2,M4@1,717,2595") == "イッ"
+	assert InstancePrv._mecab_reading("動詞,非自立可能,*,*,五段-カ行,連用形-促音便,イク,行く,行っ,イッ,行く,イク,和,*,*,*,*,イッ,イク,イッ,イク,*,*,0,C2,M4@1") == "イッ"
+	assert InstancePrv._mecab_reading("動詞,自立,*,*,五段・カ行促音便,連用タ接続,行く,イッ,イッ") == "イッ"
+
+	# unknown words have no reading
+	assert InstancePrv._mecab_reading("名詞,普通名詞,一般,*,*,*") is None
+
+
+@pytest.mark.parametrize("layout", ["unidic", "unidic-lite"])
+def test_segmenter_layouts(layout: str):
+	stats = furiganamaker.Stats()
+
+	maker = furiganamaker.Instance("[", "]", backends=furiganamaker.Backends(mecabtagger=stubs.StubTagger(layout), jamdict=stubs.StubJamdict()))
+	maker.set_segmenter("mecab")
+	maker.set_stats(stats)
+
+	hasfurigana, text = maker.process("東京の学校に行きました。", None)
+
+	assert hasfurigana
+	assert "東[とう]京[きょう]" in text
+	assert stats.snapshot()["counts"].get("segmenter_fallbacks", 0) == 0
@@ -16,6 +16,20 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import re
+
+""" The characters which are kanji, for a regular expression: the CJK unified ideographs with all extensions, the compatibility ideographs, 々 and ヶ. """
+_kanjichars = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3005\u30f6\U00020000-\U0003134f"
+
+""" Matches a kanji. """
+_kanjipattern = re.compile("[" + _kanjichars + "]")
+
+""" Matches a character which is not a kanji. """
+_nonkanjipattern = re.compile("[^" + _kanjichars + "]")
+
+""" Matches a block of kanji or a block without kanji. """
+_kanjiblockpattern = re.compile("[" + _kanjichars + "]+|[^" + _kanjichars + "]+")
+
 
 def is_kanji(ch: str) -> bool:
 	"""
@@ -27,7 +41,14 @@ def is_kanji(ch: str) -> bool:
 
 	n = ord(ch)
 
-	return (19968 <= n <= 40959) or n == 12293 or n == 12534
+	# a range check is faster than a regular expression for a single character
+	if n < 0x3400:
+		return n == 0x3005 or n == 0x30f6
+	if n <= 0x9fff:
+		return n >= 0x4e00 or n <= 0x4dbf
+	if n < 0x20000:
+		return 0xf900 <= n <= 0xfaff
+	return n <= 0x3134f
 
 
 def has_kanji(text: str) -> bool:
@@ -36,11 +57,7 @@ def has_kanji(text: str) -> bool:
 	:param text: The text to check.
 	:return: Returns True when any of the characters in 'text' is a kanji.
 	"""
-	for c in text:
-		if is_kanji(c):
-			return True
-
-	return False
+	return _kanjipattern.search(text) is not None
 
 
 def all_kanji(text: str) -> bool:
@@ -49,8 +66,13 @@ def all_kanji(text: str) -> bool:
 	:param text: The text to check.
 	:return: Returns True when all of the characters in 'text' are kanji.
 	"""
-	for c in text:
-		if not is_kanji(c):
-			return False
+	return _nonkanjipattern.search(text) is None
+
 
-	return True
+def split_kanji(text: str) -> list[tuple[str, bool]]:
+	"""
+	Splits a string into blocks of kanji and blocks without kanji.
+	:param text: The text to split.
+	:return: Returns a list where 'text' was split into parts of (text, iskanji).
+	"""
+	return [(m.group(), is_kanji(m.group()[0])) for m in _kanjiblockpattern.finditer(text)]
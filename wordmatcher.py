@@ -0,0 +1,193 @@
+"""
+furiganamaker
+Copyright (C) 2022  Daniel Kollmann
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import re
+
+
+class WordMatcher:
+	"""
+	A trie of words, used to find all custom word readings in a text with a single scan.
+	When several words overlap, the word starting first wins and from these the longest one.
+	A matcher can be put on top of a parent matcher, which is used without copying it. Words in the matcher replace the same words in the parent.
+	"""
+
+	""" The key used inside a trie node to store the value of a word ending at this node. Characters are never empty. """
+	_VALUE = ""
+
+	def __init__(self, parent: "WordMatcher" = None):
+		"""
+		Creates an empty matcher.
+		:param parent: Optional, a matcher whose words are found as well. Words added to the parent later are found too.
+		"""
+		self._root: dict = {}
+		self._count = 0
+		self._version = 0
+		self._parent = parent
+		self._firstchars = None
+
+	def __len__(self) -> int:
+		"""
+		:return: Returns the number of words in the matcher, without the words of the parent.
+		"""
+		return self._count
+
+	def add(self, word: str, value) -> None:
+		"""
+		Adds a word to the matcher. Adding the same word again replaces its value.
+		:param word: The word to search for.
+		:param value: The value returned when the word was found. Cannot be None.
+		:return:
+		"""
+		assert len(word) > 0, "Cannot add an empty word"
+		assert value is not None, "None is used for text without a word"
+
+		node = self._root
+		for ch in word:
+			child = node.get(ch)
+			if child is None:
+				child = {}
+				node[ch] = child
+			node = child
+
+		if WordMatcher._VALUE not in node:
+			self._count += 1
+
+		node[WordMatcher._VALUE] = value
+
+		# the first characters changed, so the regex has to be compiled again
+		self._version += 1
+
+	def _layers(self) -> list["WordMatcher"]:
+		"""
+		Gets the matchers containing words, this one first and then its parents.
+		:return: The list of matchers.
+		"""
+		layers = []
+		matcher = self
+		while matcher is not None:
+			if matcher._count > 0:
+				layers.append(matcher)
+			matcher = matcher._parent
+
+		return layers
+
+	def _get_firstchars(self, layers: list["WordMatcher"]):
+		"""
+		Gets a compiled regex matching every character a word can start with. Used to skip text quickly.
+		:param layers: The output of _layers().
+		:return: The compiled regex.
+		"""
+		# the regex depends on the words of the parents as well
+		key = tuple((id(m), m._version) for m in layers)
+
+		# the key and the regex are replaced together, so threads splitting at the same time never see a regex for other words
+		firstchars = self._firstchars
+		if firstchars is None or firstchars[0] != key:
+			chars = set()
+			for m in layers:
+				chars.update(ch for ch in list(m._root) if ch != WordMatcher._VALUE)
+
+			firstchars = (key, re.compile("[" + "".join(re.escape(ch) for ch in sorted(chars)) + "]"))
+			self._firstchars = firstchars
+
+		return firstchars[1]
+
+	def split(self, text: str) -> list[tuple[str, object]]:
+		"""
+		Splits a text into the words found and the text in between.
+		:param text: The text to search.
+		:return: Returns a list where 'text' was split into parts of (text, value). For text which is not a word, value is None.
+		"""
+		layers = self._layers() if self._parent is not None or self._count < 1 else [self]
+		if len(layers) < 1:
+			return [(text, None)] if len(text) > 0 else []
+
+		result = []
+		roots = [m._root for m in layers]
+		root = roots[0] if len(roots) == 1 else None
+		firstchars = self._get_firstchars(layers)
+		n = len(text)
+
+		start = 0
+		i = 0
+		while True:
+			m = firstchars.search(text, i)
+			if m is None:
+				break
+
+			i = m.start()
+
+			# walk the trie as far as possible and remember the longest word
+			end = -1
+			value = None
+
+			j = i + 1
+			if root is not None:
+				node = root[text[i]]
+				while True:
+					v = node.get(WordMatcher._VALUE)
+					if v is not None:
+						end = j
+						value = v
+
+					if j >= n:
+						break
+
+					node = node.get(text[j])
+					if node is None:
+						break
+
+					j += 1
+			else:
+				# walk all tries at once, the first one with a word ending here has the value
+				ch = text[i]
+				nodes = [r[ch] for r in roots if ch in r]
+				while True:
+					for node in nodes:
+						v = node.get(WordMatcher._VALUE)
+						if v is not None:
+							end = j
+							value = v
+							break
+
+					if j >= n:
+						break
+
+					ch = text[j]
+					nodes = [node[ch] for node in nodes if ch in node]
+					if len(nodes) < 1:
+						break
+
+					j += 1
+
+			if end < 0:
+				i += 1
+				continue
+
+			if start < i:
+				result.append((text[start:i], None))
+
+			result.append((text[i:end], value))
+
+			start = end
+			i = end
+
+		if start < n:
+			result.append((text[start:], None))
+
+		return result